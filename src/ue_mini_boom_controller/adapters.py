@@ -0,0 +1,212 @@
+"""Bluetooth adapter enumeration and link balancing across adapters.
+
+Hosts with several USB dongles can hold more simultaneous links than one
+adapter allows. AdapterPool learns the adapters and which adapter knows each
+speaker from BlueZ object paths (/org/bluez/hciN/dev_XX_...), and picks the
+adapter with the fewest links for each new RFCOMM connection. Link keys are
+stored per adapter, so a paired speaker is only ever routed to an adapter it is
+paired with.
+"""
+
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from pathlib import Path
+from typing import NamedTuple
+
+from . import dbus
+
+# How long an adapter/speaker snapshot is trusted before it is re-read.
+DEFAULT_REFRESH = 30.0
+
+# The kernel lists each adapter as hciN and each of its ACL links as hciN:HANDLE.
+_SYSFS_BLUETOOTH = Path("/sys/class/bluetooth")
+
+
+class Adapter(NamedTuple):
+    """One local Bluetooth controller."""
+
+    name: str  # e.g. "hci0"
+    address: str
+    path: str
+    powered: bool = True
+
+
+def parse_adapters(objects: dict[str, dict[str, dict]]) -> list[Adapter]:
+    """Adapters from a GetManagedObjects result, sorted by name."""
+    adapters = []
+    for path, interfaces in objects.items():
+        props = interfaces.get("org.bluez.Adapter1")
+        if props is None or "Address" not in props:
+            continue
+        name = path.rsplit("/", 1)[-1]
+        adapters.append(
+            Adapter(name, props["Address"].upper(), path, bool(props.get("Powered", True)))
+        )
+    return sorted(adapters)
+
+
+def parse_speaker_adapters(
+    objects: dict[str, dict[str, dict]], paired_only: bool = False
+) -> dict[str, list[str]]:
+    """Map each device MAC to the adapters BlueZ knows it on, paired ones first."""
+    known: dict[str, list[tuple[bool, str]]] = {}
+    for path, interfaces in objects.items():
+        props = interfaces.get("org.bluez.Device1")
+        if props is None or "Address" not in props:
+            continue
+        if paired_only and not props.get("Paired"):
+            continue
+        adapter = (props.get("Adapter") or path.rsplit("/", 1)[0]).rsplit("/", 1)[-1]
+        known.setdefault(props["Address"].upper(), []).append((not props.get("Paired"), adapter))
+    return {mac: [name for _, name in sorted(entries)] for mac, entries in known.items()}
+
+
+def _connected_counts(objects: dict[str, dict[str, dict]]) -> Counter:
+    counts = Counter()
+    for path, interfaces in objects.items():
+        props = interfaces.get("org.bluez.Device1")
+        if props is not None and props.get("Connected"):
+            counts[(props.get("Adapter") or path.rsplit("/", 1)[0]).rsplit("/", 1)[-1]] += 1
+    return counts
+
+
+def sysfs_link_counts(root: Path | None = None) -> Counter | None:
+    """Current ACL link count per adapter from sysfs, or None where sysfs has no Bluetooth."""
+    root = _SYSFS_BLUETOOTH if root is None else root
+    try:
+        entries = [entry.name for entry in root.iterdir()]
+    except OSError:
+        return None
+    counts = Counter({name: 0 for name in entries if ":" not in name})
+    for name in entries:
+        if ":" in name:
+            counts[name.split(":", 1)[0]] += 1
+    return counts
+
+
+def local_adapter_names() -> list[str]:
+    """Adapter names from sysfs, for use without D-Bus; ["hci0"] if sysfs has none."""
+    counts = sysfs_link_counts()
+    return sorted(counts) if counts else ["hci0"]
+
+
+class AdapterPool:
+    """The host's adapters and their link counts, for placing new connections.
+
+    Link counts come from sysfs when available (live) and otherwise from the
+    Connected flags in the last BlueZ snapshot. Connects this process has in
+    flight are added on top, so a burst of simultaneous connects spreads out.
+    """
+
+    def __init__(self, refresh_interval: float = DEFAULT_REFRESH):
+        self.refresh_interval = refresh_interval
+        self._adapters: dict[str, Adapter] = {}
+        self._speakers: dict[str, list[str]] = {}
+        self._paired: dict[str, list[str]] = {}
+        self._connected: Counter = Counter()
+        self._in_flight: Counter = Counter()
+        self._refreshed_at = None
+        self._lock = threading.Lock()
+
+    def refresh(self, objects: dict[str, dict[str, dict]] | None = None):
+        """Re-read adapters and speaker placement (from objects, or from BlueZ)."""
+        if objects is None:
+            try:
+                objects = dbus.system_bus().get_managed_objects("org.bluez")
+            except (OSError, dbus.DBusError):
+                objects = {}
+        with self._lock:
+            self._adapters = {a.name: a for a in parse_adapters(objects)}
+            self._speakers = parse_speaker_adapters(objects)
+            self._paired = parse_speaker_adapters(objects, paired_only=True)
+            self._connected = _connected_counts(objects)
+            self._refreshed_at = time.monotonic()
+
+    def _ensure_fresh(self):
+        if (
+            self._refreshed_at is None
+            or time.monotonic() - self._refreshed_at > self.refresh_interval
+        ):
+            self.refresh()
+
+    def adapters(self) -> list[Adapter]:
+        """Known adapters, sorted by name."""
+        self._ensure_fresh()
+        with self._lock:
+            return sorted(self._adapters.values())
+
+    def adapters_for(self, mac_address: str) -> list[str]:
+        """Names of the adapters BlueZ knows mac_address on (paired first)."""
+        self._ensure_fresh()
+        with self._lock:
+            return list(self._speakers.get(mac_address.upper(), []))
+
+    def link_counts(self) -> dict[str, int]:
+        """Current links per adapter, including connects in flight from this process."""
+        self._ensure_fresh()
+        live = sysfs_link_counts()
+        with self._lock:
+            base = self._connected if live is None else live
+            return {name: base[name] + self._in_flight[name] for name in self._adapters}
+
+    def select(self, mac_address: str) -> Adapter | None:
+        """Pick the adapter for a new link to mac_address.
+
+        Only adapters the speaker is paired with (or, if it is unknown, any
+        powered adapter) are candidates; the one with the fewest links wins.
+        Returns None when there is nothing to choose, i.e. at most one adapter,
+        so the kernel's default routing applies.
+        """
+        counts = self.link_counts()
+        with self._lock:
+            if len(self._adapters) < 2:
+                return None
+            powered = [a for a in self._adapters.values() if a.powered]
+            paired = set(self._paired.get(mac_address.upper(), []))
+            candidates = [a for a in powered if a.name in paired] or powered
+            if not candidates:
+                return None
+            return min(candidates, key=lambda a: (counts.get(a.name, 0), a.name))
+
+    def resolve(self, adapter: str) -> Adapter | None:
+        """Look up an adapter by name ("hci1") or address."""
+        key = adapter.upper()
+        for candidate in self.adapters():
+            if candidate.name == adapter or candidate.address == key:
+                return candidate
+        if ":" in adapter:
+            return Adapter(adapter, key, "")  # not known to BlueZ, but bindable
+        return None
+
+    def choose(self, mac_address: str, adapter: str | None = None) -> Adapter | None:
+        """The caller's adapter if given, else select(mac_address)."""
+        if adapter is not None:
+            return self.resolve(adapter)
+        return self.select(mac_address)
+
+    @contextmanager
+    def connecting(self, adapter: Adapter | None):
+        """Count a connect on adapter as a link while it is in flight."""
+        if adapter is None:
+            yield
+            return
+        with self._lock:
+            self._in_flight[adapter.name] += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._in_flight[adapter.name] -= 1
+
+
+_default: AdapterPool | None = None
+
+
+def get_adapter_pool() -> AdapterPool:
+    """Return the process-wide adapter pool."""
+    global _default
+    if _default is None:
+        _default = AdapterPool()
+    return _default
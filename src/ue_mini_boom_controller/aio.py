@@ -0,0 +1,637 @@
+"""Asyncio transport for UE Mini Boom.
+
+Non-blocking counterparts of the spp and ble functions, for callers that run an
+event loop. RFCOMM sockets are driven with loop.sock_* calls and the BlueZ
+tools run through asyncio subprocesses, so one process can talk to many
+speakers at once without a thread per speaker.
+
+Every coroutine honours cancellation: pending socket operations are abandoned
+and child processes are killed.
+"""
+
+import asyncio
+import contextlib
+import socket
+import time
+import uuid
+from collections import defaultdict, deque
+
+from . import dbus, sdp
+from .adapters import get_adapter_pool, local_adapter_names
+from .ble import (
+    _MANAGED_OBJECTS_COMMAND,
+    _battery_command,
+    _parse_battery_reply,
+    _parse_busctl_managed_objects,
+    _parse_device_info,
+    _parse_managed_objects,
+    _parse_paired_devices,
+    _ue_devices_from_snapshot,
+)
+from .channel_cache import get_channel_cache
+from .latency import CLOSE, CONNECT, FIRST_BYTE, RESPONSE, SDP, get_latency_recorder
+from .locks import DEFAULT_TIMEOUT, SpeakerLock
+from .metrics import CONNECT_ERRORS, CONNECTS, LINK_DROPS, RECONNECTS, get_link_counters
+from .pacing import get_pacer
+from .profiles import get_profile_store
+from .protocol import SPP_UUID, Frame, FrameDecoder
+from .ratelimit import get_rate_limiter
+from .spp import (
+    _DEFAULT_RFCOMM_CHANNEL,
+    _hex,
+    _parse_sdptool_channel,
+    _sdptool_command,
+)
+
+
+async def _run(argv: list[str], timeout: float) -> tuple[int, str] | None:
+    """Run a command and return (returncode, stdout), or None if it failed to run."""
+    try:
+        proc = await asyncio.create_subprocess_exec(
+            *argv,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.DEVNULL,
+        )
+    except FileNotFoundError:
+        return None
+    try:
+        async with asyncio.timeout(timeout):
+            stdout, _ = await proc.communicate()
+    except TimeoutError:
+        return None
+    finally:
+        if proc.returncode is None:
+            proc.kill()
+            with contextlib.suppress(ProcessLookupError):
+                await proc.wait()
+    return proc.returncode, stdout.decode(errors="replace")
+
+
+async def find_rfcomm_channel(mac_address: str, timeout: float = 10) -> int | None:
+    """Discover the RFCOMM channel for the SPP service.
+
+    Uses the in-process SDP client over a non-blocking L2CAP socket; sdptool is
+    only used where Python has no L2CAP socket support.
+    """
+    if sdp.is_available():
+        return await _sdp_find_rfcomm_channel(mac_address, timeout)
+
+    result = await _run(_sdptool_command(mac_address), timeout)
+    if result is None:
+        return None
+    return _parse_sdptool_channel(result[1])
+
+
+async def _sdp_find_rfcomm_channel(mac_address: str, timeout: float) -> int | None:
+    loop = asyncio.get_running_loop()
+    exchange = sdp.search_transaction([uuid.UUID(SPP_UUID)], [sdp.PROTOCOL_DESCRIPTOR_LIST])
+    try:
+        with socket.socket(
+            socket.AF_BLUETOOTH, socket.SOCK_SEQPACKET, socket.BTPROTO_L2CAP
+        ) as sock:
+            sock.setblocking(False)
+            async with asyncio.timeout(timeout):
+                await loop.sock_connect(sock, (mac_address, sdp.SDP_PSM))
+                request = next(exchange)
+                while True:
+                    await loop.sock_sendall(sock, request)
+                    request = exchange.send(await loop.sock_recv(sock, sdp.SDP_MTU))
+    except StopIteration as done:
+        return sdp.rfcomm_channel(done.value)
+    except (OSError, sdp.SdpError):
+        return None
+
+
+def _bus_managed_objects(timeout: float) -> dict:
+    bus = dbus.system_bus()
+    return bus.call("org.bluez", "/", dbus.OBJECT_MANAGER, "GetManagedObjects", timeout=timeout)[0]
+
+
+async def get_managed_devices(timeout: float = 5) -> dict[str, dict] | None:
+    """Read every BlueZ device in one D-Bus round trip (see ble.get_managed_devices)."""
+    try:
+        objects = await asyncio.to_thread(_bus_managed_objects, timeout)
+        return _parse_managed_objects(objects)
+    except (OSError, dbus.DBusError):
+        pass
+    result = await _run(_MANAGED_OBJECTS_COMMAND, timeout)
+    if result is None or result[0] != 0:
+        return None
+    try:
+        return _parse_managed_objects(_parse_busctl_managed_objects(result[1]))
+    except ValueError:
+        return None
+
+
+async def get_device_status(speaker_mac: str, timeout: float = 5) -> dict:
+    """Read device status from BlueZ (see ble.get_device_status)."""
+    devices = await get_managed_devices(timeout)
+    if devices is not None:
+        return devices.get(speaker_mac.upper(), {})
+
+    result = await _run(["bluetoothctl", "info", speaker_mac], timeout)
+    if result is None:
+        return {}
+    return _parse_device_info(result[1])
+
+
+async def get_battery(speaker_mac: str, timeout: float = 5) -> int:
+    """Read battery level from BlueZ D-Bus Battery1 interface.
+
+    Returns battery percentage (0-100) or -1 on failure.
+    """
+    devices = await get_managed_devices(timeout)
+    if devices is not None:
+        return devices.get(speaker_mac.upper(), {}).get("battery", -1)
+
+    for adapter in local_adapter_names():
+        result = await _run(_battery_command(speaker_mac, adapter), timeout)
+        if result is None:
+            return -1
+        if result[0] == 0:
+            return _parse_battery_reply(result[1])
+    return -1
+
+
+async def get_paired_ue_devices(timeout: float = 5) -> list[tuple[str, str]]:
+    """Return paired UE speakers as a list of (mac_address, name) tuples."""
+    devices = await get_managed_devices(timeout)
+    if devices is not None:
+        return _ue_devices_from_snapshot(devices)
+
+    result = await _run(["bluetoothctl", "devices", "Paired"], timeout)
+    if result is None:
+        return []
+    return _parse_paired_devices(result[1])
+
+
+class AsyncSppSession:
+    """Long-lived non-blocking RFCOMM link to one speaker.
+
+    Asyncio counterpart of spp.SppSession: connects on first use, keeps the
+    socket open, reconnects transparently if the link drops, and holds the
+    speaker's SpeakerLock while connected.
+
+        async with AsyncSppSession(mac) as session:
+            await session.send(COMMANDS["battery_announce"])
+    """
+
+    def __init__(
+        self,
+        mac_address: str,
+        channel: int | None = None,
+        verbose: bool = False,
+        connect_timeout: float = 10,
+        adapter: str | None = None,
+        lock_timeout: float | None = DEFAULT_TIMEOUT,
+    ):
+        self.mac_address = mac_address
+        self.channel = channel
+        self.verbose = verbose
+        # A caller-chosen channel bypasses the channel cache and SDP lookup.
+        self._pinned = channel is not None
+        self.connect_timeout = connect_timeout
+        # Local adapter (name or address) to connect from; None lets AdapterPool choose.
+        self.adapter = adapter
+        self._local = None
+        self._lock = SpeakerLock(mac_address, timeout=lock_timeout)
+        self._pacing = None
+        self.latency = get_latency_recorder()
+        self.counters = get_link_counters()
+        self._sock = None
+        # Whether the link was lost to an error, so the next connect is a reconnect.
+        self._dropped = False
+        self._decoder = FrameDecoder()
+        # When the first bytes after the last send arrived (for latency).
+        self._first_byte_at = None
+        self._send_lock = asyncio.Lock()
+
+    async def __aenter__(self):
+        await self.connect()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self.close()
+
+    @property
+    def pacing(self):
+        """Response-time estimator shared by every session to this speaker.
+
+        connect() looks up the speaker's profile off the event loop first, so
+        resolving this never blocks the loop.
+        """
+        if self._pacing is None:
+            self._pacing = get_pacer().for_speaker(self.mac_address)
+        return self._pacing
+
+    @property
+    def connected(self) -> bool:
+        return self._sock is not None
+
+    async def connect(self):
+        """Open the RFCOMM link if it is not already open.
+
+        Same strategy as spp.SppSession.connect: cached channel first, else a
+        race between the default channel and the SDP lookup, from the least
+        busy adapter.
+        Raises OSError (TimeoutError after connect_timeout) if the speaker
+        cannot be reached, or SpeakerBusyError if another process keeps it past
+        lock_timeout.
+        """
+        if self._sock is not None:
+            return
+
+        # A speaker's first profile lookup may ask BlueZ; keep that off the event loop.
+        profiles = get_profile_store()
+        if not profiles.resolved(self.mac_address):
+            await asyncio.to_thread(profiles.for_speaker, self.mac_address)
+        await self._lock.acquire_async(on_wait=self._report_wait)
+        pool = get_adapter_pool()
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        try:
+            # Choosing may refresh the pool from D-Bus; keep that off the event loop.
+            self._local = await asyncio.to_thread(pool.choose, self.mac_address, self.adapter)
+            with pool.connecting(self._local):
+                sock = await self._connect_channel()
+        except BaseException as e:
+            if isinstance(e, OSError):
+                self.counters.increment(self.mac_address, CONNECT_ERRORS)
+            self._lock.release()
+            raise
+        self._sock = sock
+        self._decoder.clear()
+        self.counters.increment(self.mac_address, CONNECTS)
+        if self._dropped:
+            self.counters.increment(self.mac_address, RECONNECTS)
+            self._dropped = False
+        self.latency.record(self.mac_address, CONNECT, loop.time() - started)
+
+    def _report_wait(self):
+        if self.verbose:
+            print(f"{self.mac_address} is in use by another process, waiting...")
+
+    async def _connect_channel(self):
+        if self._pinned:
+            return await self._open(self.channel)
+        cache = get_channel_cache()
+        channel = cache.get(self.mac_address)
+        sock = None
+        if channel is not None:
+            try:
+                sock = await self._open(channel)
+            except OSError:
+                # Stale cache entry — forget it and discover the channel again.
+                cache.invalidate(self.mac_address)
+        if sock is None:
+            sock, channel = await self._connect_racing()
+        self.channel = channel
+        cache.put(self.mac_address, channel)
+        return sock
+
+    async def _connect_racing(self):
+        """Race a connect to the default channel against the SDP lookup.
+
+        The first connect to succeed wins; the lookup and any other attempt
+        still in progress are cancelled. If SDP reports a channel other than
+        the default, that channel is tried as well.
+        Returns (socket, channel). Raises the last connect error if every
+        attempt fails.
+        """
+        attempts = {
+            asyncio.create_task(self._open(_DEFAULT_RFCOMM_CHANNEL)): _DEFAULT_RFCOMM_CHANNEL
+        }
+        lookup = asyncio.create_task(self._lookup_channel())
+        tried = {_DEFAULT_RFCOMM_CHANNEL}
+        error: Exception = OSError(f"Could not connect to {self.mac_address}")
+        winner = None
+        try:
+            while attempts or lookup is not None:
+                waiting = set(attempts) if lookup is None else {*attempts, lookup}
+                done, _ = await asyncio.wait(waiting, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task is lookup:
+                        lookup = None
+                        channel = task.result()
+                        if channel is None:
+                            if self.verbose:
+                                print("SDP lookup failed")
+                        elif channel not in tried:
+                            tried.add(channel)
+                            attempts[asyncio.create_task(self._open(channel))] = channel
+                        continue
+                    channel = attempts.pop(task)
+                    if task.exception() is not None:
+                        error = task.exception()
+                    elif winner is None:
+                        winner = task.result(), channel
+                    else:
+                        task.result().close()  # lost the race
+                if winner is not None:
+                    return winner
+            raise error
+        finally:
+            pending = list(attempts)
+            losers = pending + ([lookup] if lookup is not None else [])
+            for task in losers:
+                task.cancel()
+            results = await asyncio.gather(*losers, return_exceptions=True)
+            for result in results[: len(pending)]:
+                if not isinstance(result, BaseException):
+                    result.close()  # connected just as it was cancelled
+
+    async def _lookup_channel(self) -> int | None:
+        """find_rfcomm_channel, timed; a lookup cancelled by a won race is not recorded."""
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        channel = await find_rfcomm_channel(self.mac_address)
+        self.latency.record(self.mac_address, SDP, loop.time() - started)
+        return channel
+
+    async def _open(self, channel: int):
+        """Create a non-blocking RFCOMM socket connected to channel."""
+        if self.verbose:
+            print(f"Connecting to {self.mac_address} on RFCOMM channel {channel}...")
+
+        loop = asyncio.get_running_loop()
+        sock = socket.socket(socket.AF_BLUETOOTH, socket.SOCK_STREAM, socket.BTPROTO_RFCOMM)
+        sock.setblocking(False)
+        try:
+            if self._local is not None:
+                sock.bind((self._local.address, 0))
+            async with asyncio.timeout(self.connect_timeout):
+                await loop.sock_connect(sock, (self.mac_address, channel))
+        except BaseException:
+            sock.close()
+            raise
+        return sock
+
+    def close(self):
+        """Close the link and release the speaker. The next command will reconnect."""
+        if self._sock is not None and self.latency.enabled:
+            started = time.monotonic()
+            self._close_socket()
+            self.latency.record(self.mac_address, CLOSE, time.monotonic() - started)
+        else:
+            self._close_socket()
+        self._dropped = False
+        self._lock.release()
+
+    def _close_socket(self):
+        sock, self._sock = self._sock, None
+        if sock is not None:
+            sock.close()
+
+    def _drop_link(self):
+        """Close the socket after an error but keep the speaker's lock (it is reopened next)."""
+        if self._sock is not None:
+            self.counters.increment(self.mac_address, LINK_DROPS)
+            self._dropped = True
+        self._close_socket()
+
+    def _record_response(self, command_id: int, sent_at: float, received_at: float):
+        """Record first-byte and response latency of an exchange sent at sent_at."""
+        if self._first_byte_at is not None:
+            self.latency.record(
+                self.mac_address, FIRST_BYTE, self._first_byte_at - sent_at, command_id
+            )
+        self.latency.record(self.mac_address, RESPONSE, received_at - sent_at, command_id)
+
+    async def _send(self, data: bytes):
+        """Send data, reconnecting once if the link has dropped."""
+        loop = asyncio.get_running_loop()
+        async with self._send_lock:
+            await self.connect()
+            await get_rate_limiter().wait_async(self.mac_address)
+            try:
+                await loop.sock_sendall(self._sock, data)
+            except OSError:
+                if self.verbose:
+                    print("Link dropped, reconnecting...")
+                self._drop_link()
+                await self.connect()
+                await loop.sock_sendall(self._sock, data)
+
+    async def _read_frame(self, command_id: int | None, timeout: float | None) -> Frame | None:
+        """Wait for the next response packet for command_id (any packet if None).
+
+        Returns None after timeout (never, if timeout is None) or if the link drops.
+        """
+        loop = asyncio.get_running_loop()
+        try:
+            async with asyncio.timeout(timeout):
+                while True:
+                    while (frame := self._decoder.next_frame()) is not None:
+                        if command_id is None or frame.command_id == command_id:
+                            return frame
+                    if self._sock is None:
+                        return None
+                    n = await loop.sock_recv_into(self._sock, self._decoder.recv_buffer())
+                    if not n:
+                        self._drop_link()
+                        return None
+                    if self._first_byte_at is None:
+                        self._first_byte_at = loop.time()
+                    self._decoder.commit(n)
+        except TimeoutError:
+            return None
+        except OSError:
+            # Link is gone — drop it so the next command reconnects.
+            self._drop_link()
+            return None
+
+    async def send(self, command: bytes) -> Frame | None:
+        """Send one command packet and return the speaker's response, if any."""
+        loop = asyncio.get_running_loop()
+        self._decoder.clear()
+        self._first_byte_at = None
+        await self._send(command)
+        sent_at = loop.time()
+        frame = await self._read_frame(None, timeout=self.pacing.timeout)
+        if frame is not None:
+            received_at = loop.time()
+            self.pacing.observe(received_at - sent_at)
+            if self.latency.enabled:
+                self._record_response(frame.command_id, sent_at, received_at)
+        return frame
+
+    async def _exchange(self, command_id: int, timeout: float | None) -> Frame | None:
+        """Send one query and wait for its response, feeding the pacer."""
+        loop = asyncio.get_running_loop()
+        self._decoder.clear()  # as in spp.SppSession._exchange
+        self._first_byte_at = None
+        await self._send(bytes([0x02, 0x01, command_id]))
+        sent_at = loop.time()
+        frame = await self._read_frame(
+            command_id, self.pacing.timeout if timeout is None else timeout
+        )
+        if frame is not None:
+            received_at = loop.time()
+            self.pacing.observe(received_at - sent_at)
+            if self.latency.enabled:
+                self._record_response(command_id, sent_at, received_at)
+        elif self.connected:
+            self.pacing.timed_out()
+        return frame
+
+    async def query(
+        self,
+        command_ids: list[int],
+        window: int = 1,
+        timeout: float | None = None,
+    ) -> dict[int, int | None]:
+        """Query LWACP values over this link (see spp.SppSession.query)."""
+        results = {cid: None for cid in command_ids}
+        if not command_ids:
+            return results
+
+        try:
+            if not self.connected:
+                await self.connect()
+                await asyncio.sleep(self.pacing.gap)
+
+            if window > 1:
+                await self._query_pipelined(results, window, timeout)
+                return results
+
+            for i, command_id in enumerate(command_ids):
+                if i:
+                    await asyncio.sleep(self.pacing.gap)
+                frame = await self._exchange(command_id, timeout)
+                if frame is not None and frame.params:
+                    results[command_id] = frame.params[0]
+        except OSError:
+            pass  # keep whatever was read before the link failed
+        return results
+
+    async def _query_pipelined(
+        self, results: dict[int, int | None], window: int, timeout: float | None
+    ):
+        """Send queries with at most `window` awaiting a response; fills `results`.
+
+        A reader task decodes response packets and resolves the oldest pending
+        future for that command id.
+        """
+        if timeout is None:
+            timeout = self.pacing.timeout
+        loop = asyncio.get_running_loop()
+        missed = False
+        pending: dict[int, deque[asyncio.Future]] = defaultdict(deque)
+        slots = asyncio.Semaphore(window)
+
+        async def reader():
+            try:
+                while self.connected:
+                    frame = await self._read_frame(None, timeout=None)
+                    if frame is None:
+                        break
+                    queue = pending.get(frame.command_id)
+                    # A sender whose timeout just fired leaves its cancelled
+                    # future here until it resumes; skip it.
+                    while queue:
+                        future = queue.popleft()
+                        if not future.done():
+                            future.set_result(frame)
+                            break
+            finally:
+                # Fail everything still waiting so the senders return now.
+                for queue in pending.values():
+                    for future in queue:
+                        if not future.done():
+                            future.set_exception(ConnectionError("RFCOMM link closed"))
+                pending.clear()
+
+        async def one(command_id: int):
+            nonlocal missed
+            async with slots:
+                if reader_task.done():
+                    return
+                future = loop.create_future()
+                pending[command_id].append(future)
+                try:
+                    await self._send(bytes([0x02, 0x01, command_id]))
+                    sent_at = loop.time()
+                    async with asyncio.timeout(timeout):
+                        frame = await future
+                    rtt = loop.time() - sent_at
+                    self.pacing.observe(rtt)
+                    self.latency.record(self.mac_address, RESPONSE, rtt, command_id)
+                except TimeoutError:
+                    missed = True
+                    return
+                except OSError:
+                    return
+                finally:
+                    queue = pending.get(command_id)
+                    if queue and future in queue:
+                        queue.remove(future)
+                if frame.params:
+                    results[command_id] = frame.params[0]
+
+        reader_task = asyncio.create_task(reader())
+        try:
+            await asyncio.gather(*(one(cid) for cid in results))
+            if missed and self.connected:
+                self.pacing.timed_out()  # one backoff per batch, as for a TCP RTO
+        finally:
+            reader_task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await reader_task
+
+
+async def send_spp_command(
+    mac_address: str,
+    command: bytes,
+    verbose: bool = False,
+    session: AsyncSppSession | None = None,
+) -> bool:
+    """Send a command to the speaker over RFCOMM. Returns True on success.
+
+    Pass an open AsyncSppSession to reuse its link.
+    """
+    if not hasattr(socket, "AF_BLUETOOTH"):
+        if verbose:
+            print("ERROR: No Bluetooth SPP transport available.")
+        return False
+
+    owned = session is None
+    if owned:
+        session = AsyncSppSession(mac_address, verbose=verbose)
+    try:
+        await session.connect()
+        if verbose:
+            print(f"Sending: {_hex(command)}")
+        response = await session.send(command)
+        if verbose and response is not None:
+            print(f"Response: {_hex(response.to_bytes())}")
+        return True
+    except OSError as e:
+        if verbose:
+            print(f"ERROR: Could not connect — {e}")
+        return False
+    finally:
+        if owned:
+            session.close()
+
+
+async def query_spp_values(
+    mac_address: str,
+    command_ids: list[int],
+    session: AsyncSppSession | None = None,
+    window: int = 1,
+) -> dict[int, int | None]:
+    """Query multiple LWACP values in a single RFCOMM connection.
+
+    Returns a dict mapping command_id -> value (or None on failure).
+    """
+    if not hasattr(socket, "AF_BLUETOOTH"):
+        return {cid: None for cid in command_ids}
+
+    owned = session is None
+    if owned:
+        session = AsyncSppSession(mac_address)
+    try:
+        return await session.query(command_ids, window=window)
+    finally:
+        if owned:
+            session.close()
@@ -0,0 +1,36 @@
+"""Benchmarks of the protocol, parsing and transport hot paths.
+
+`ueboom-bench` runs the suite (see runner), prints time per operation and
+can save the results as a JSON baseline or compare them with one:
+
+    ueboom-bench --save baseline.json
+    ueboom-bench --compare baseline.json 'emulator.*'
+
+New benchmarks register with @benchmark(name) in cases.
+"""
+
+from .runner import (
+    Benchmark,
+    Comparison,
+    Result,
+    benchmark,
+    benchmarks,
+    compare,
+    load_baseline,
+    mann_whitney,
+    measure,
+    save_baseline,
+)
+
+__all__ = [
+    "Benchmark",
+    "Comparison",
+    "Result",
+    "benchmark",
+    "benchmarks",
+    "compare",
+    "load_baseline",
+    "mann_whitney",
+    "measure",
+    "save_baseline",
+]
@@ -0,0 +1,343 @@
+"""The benchmark suite: protocol, BlueZ parsing and transport hot paths.
+
+BlueZ benchmarks feed synthetic replies for DEVICES devices through the
+real parsing code, with the D-Bus connection and subprocesses replaced.
+Transport benchmarks run the real SPP code against an EmulatorServer in
+this process, with zero latency and rate limiting off. They measure the
+client's own overhead, not a speaker's.
+"""
+
+import asyncio
+import contextlib
+import functools
+import json
+import subprocess
+import types
+
+from .. import ble, dbus, latency, metrics
+from ..aio import AsyncSppSession
+from ..device_state import DeviceStateCache
+from ..emulator import EmulatorServer, emulated_macs, emulated_transport
+from ..protocol import FrameDecoder, UECommand, build_spp_command
+from ..ratelimit import get_rate_limiter
+from ..spp import SppSession
+from ..workers import Supervisor
+from .runner import benchmark
+
+# Devices in the synthetic BlueZ replies.
+DEVICES = 5000
+
+_QUERY = build_spp_command(UECommand.EQ_PRESET)
+_QUERY_IDS = [
+    UECommand.EQ_PRESET,
+    UECommand.DOUBLE_UP_MODE,
+    UECommand.DOUBLE_UP_ROLE,
+    UECommand.DOUBLE_UP_LOCK,
+]
+
+
+def synthetic_devices(count: int = DEVICES) -> list[dict]:
+    """Paired and unpaired devices; one in five is a UE speaker, some renamed."""
+    devices = []
+    for i in range(count):
+        suffix = f"{i >> 16:02X}:{i >> 8 & 0xFF:02X}:{i & 0xFF:02X}"
+        if i % 10 == 0:
+            address, name = f"88:C6:26:{suffix}", "UE MINI BOOM"
+        elif i % 10 == 5:
+            address, name = f"C8:DB:26:{suffix}", f"Kitchen {i}"
+        else:
+            address, name = f"00:1A:7D:{suffix}", f"Headset {i}"
+        devices.append(
+            {
+                "address": address,
+                "name": name,
+                "paired": i % 3 != 0,
+                "connected": i % 7 == 0,
+                "battery": i % 101,
+            }
+        )
+    return devices
+
+
+def _managed_objects(devices: list[dict]) -> dict[str, dict[str, dict]]:
+    """A GetManagedObjects result (plain values) for devices on hci0."""
+    objects = {"/org/bluez/hci0": {"org.bluez.Adapter1": {"Address": "00:11:22:33:44:55"}}}
+    for device in devices:
+        path = "/org/bluez/hci0/dev_" + device["address"].replace(":", "_")
+        objects[path] = {
+            "org.bluez.Device1": {
+                "Address": device["address"],
+                "Name": device["name"],
+                "Alias": device["name"],
+                "Adapter": "/org/bluez/hci0",
+                "Paired": device["paired"],
+                "Connected": device["connected"],
+                "Modalias": "usb:v046DpBA20dFF0A",
+            },
+            "org.bluez.Battery1": {"Percentage": device["battery"]},
+        }
+    return objects
+
+
+def _busctl_reply(objects: dict[str, dict[str, dict]]) -> str:
+    """objects as `busctl --json=short` prints it, every value wrapped in a variant."""
+
+    def variant(value):
+        signature = "b" if isinstance(value, bool) else "y" if isinstance(value, int) else "s"
+        return {"type": signature, "data": value}
+
+    data = {
+        path: {
+            iface: {name: variant(value) for name, value in props.items()}
+            for iface, props in interfaces.items()
+        }
+        for path, interfaces in objects.items()
+    }
+    return json.dumps({"type": "a{oa{sa{sv}}}", "data": [data]}, separators=(",", ":"))
+
+
+def _bluetoothctl_info(device: dict) -> str:
+    yes_no = {True: "yes", False: "no"}
+    return "\n".join(
+        [
+            f"Device {device['address']} (public)",
+            f"\tName: {device['name']}",
+            f"\tAlias: {device['name']}",
+            "\tClass: 0x00240414",
+            "\tIcon: audio-card",
+            f"\tPaired: {yes_no[device['paired']]}",
+            "\tBonded: yes",
+            "\tTrusted: yes",
+            "\tBlocked: no",
+            f"\tConnected: {yes_no[device['connected']]}",
+            "\tLegacyPairing: no",
+            "\tUUID: Audio Sink                (0000110b-0000-1000-8000-00805f9b34fb)",
+            "\tUUID: A/V Remote Control Target (0000110c-0000-1000-8000-00805f9b34fb)",
+            "\tUUID: Serial Port               (00001101-0000-1000-8000-00805f9b34fb)",
+            "\tModalias: usb:v046DpBA20dFF0A",
+            f"\tBattery Percentage: 0x{device['battery']:02x} ({device['battery']})",
+        ]
+    )
+
+
+@contextlib.contextmanager
+def _swapped(obj, **attrs):
+    saved = {name: getattr(obj, name) for name in attrs}
+    for name, value in attrs.items():
+        setattr(obj, name, value)
+    try:
+        yield
+    finally:
+        for name, value in saved.items():
+            setattr(obj, name, value)
+
+
+@contextlib.contextmanager
+def _bluez(source: str, devices: list[dict]):
+    """Make ble read devices from source: "dbus", "busctl" or "bluetoothctl"."""
+    objects = _managed_objects(devices)
+    outputs = {
+        "bluetoothctl info": _bluetoothctl_info(devices[0]),
+        "bluetoothctl devices": "\n".join(
+            f"Device {d['address']} {d['name']}" for d in devices if d["paired"]
+        ),
+    }
+    if source == "busctl":
+        outputs["busctl --system"] = _busctl_reply(objects)
+
+    class Bus:
+        def get_managed_objects(self, service):
+            return objects
+
+    def system_bus():
+        if source != "dbus":
+            raise OSError("no system bus")
+        return Bus()
+
+    def run(command, **kwargs):
+        stdout = outputs.get(" ".join(command[:2]))
+        return subprocess.CompletedProcess(command, 1 if stdout is None else 0, stdout or "", "")
+
+    fake_dbus = types.SimpleNamespace(system_bus=system_bus, DBusError=dbus.DBusError)
+    fake_subprocess = types.SimpleNamespace(run=run, TimeoutExpired=subprocess.TimeoutExpired)
+    with _swapped(ble, dbus=fake_dbus, subprocess=fake_subprocess):
+        yield
+
+
+@benchmark("protocol.build_spp_command")
+def _build_spp_command():
+    """Build one command packet with two parameters."""
+    yield functools.partial(build_spp_command, UECommand.EMIT_SOUND, 0x60, 0xC0)
+
+
+@benchmark("protocol.decode_frames[1000]")
+def _decode_frames():
+    """Decode 1000 response packets arriving in 64-byte reads."""
+    stream = b"".join(
+        build_spp_command(command_id, *range(i % 4))
+        for i, command_id in zip(range(1000), [*_QUERY_IDS] * 250)
+    )
+    chunks = [stream[i : i + 64] for i in range(0, len(stream), 64)]
+
+    def decode():
+        decoder = FrameDecoder()
+        for chunk in chunks:
+            decoder.feed(chunk)
+            while decoder.next_frame() is not None:
+                pass
+
+    yield decode
+
+
+def _register_bluez(source: str):
+    @benchmark(f"ble.get_device_status[{source}]")
+    def _get_device_status():
+        """Status of one speaker among 5000 known devices."""
+        devices = synthetic_devices()
+        with _bluez(source, devices):
+            yield functools.partial(ble.get_device_status, devices[0]["address"])
+
+    @benchmark(f"ble.get_paired_ue_devices[{source}]")
+    def _get_paired_ue_devices():
+        """Pick the paired UE speakers out of 5000 devices."""
+        with _bluez(source, synthetic_devices()):
+            yield ble.get_paired_ue_devices
+
+
+for _source in ("dbus", "busctl", "bluetoothctl"):
+    _register_bluez(_source)
+
+
+@benchmark(f"ble.is_ue_device[{DEVICES}]")
+def _is_ue_device():
+    """Classify 5000 devices by name and OUI."""
+    pairs = [(d["address"], d["name"]) for d in synthetic_devices()]
+
+    def classify():
+        for address, name in pairs:
+            ble.is_ue_device(address, name)
+
+    yield classify
+
+
+@benchmark("metrics.render[1000]")
+def _metrics_render():
+    """One scrape of a fleet of 1000 speakers with latency and link metrics."""
+    fleet = [
+        {**d, "paired": True}
+        for d in synthetic_devices(10_000)
+        if d["address"].startswith("88:C6:26")
+    ]
+
+    class LiveCache(DeviceStateCache):
+        live = True  # as if fed by BlueZ signals, so the exporter never reads BlueZ
+
+    devices = LiveCache()
+    devices.load(_managed_objects(fleet))
+    recorder = latency.LatencyRecorder(enabled=True)
+    counters = metrics.LinkCounters()
+    for i, device in enumerate(fleet):
+        mac = device["address"]
+        recorder.record(mac, latency.CONNECT, 0.2 + i % 50 / 100)
+        for command_id in _QUERY_IDS:
+            for sample in range(5):
+                recorder.record(mac, latency.RESPONSE, 0.01 + sample / 100, command_id)
+        counters.increment(mac, metrics.CONNECTS)
+    exporter = metrics.MetricsExporter(devices)
+    with _swapped(latency, _default=recorder), _swapped(metrics, _default=counters):
+        yield exporter.render
+
+
+@contextlib.contextmanager
+def _emulated(macs: list[str]):
+    """An emulator serving macs, with spp/aio routed to it and no rate limit."""
+    limiter = get_rate_limiter()
+    for mac in macs:
+        limiter.configure(None, 1, mac)
+    with EmulatorServer() as server:
+        for mac in macs:
+            server.add_speaker(mac)
+        with emulated_transport(server.address):
+            yield server
+
+
+@benchmark("emulator.send")
+def _emulator_send():
+    """One query round trip over an open SppSession."""
+    [mac] = emulated_macs(1)
+    with _emulated([mac]), SppSession(mac) as session:
+        yield functools.partial(session.send, _QUERY)
+
+
+@benchmark("emulator.query_pipelined[4]")
+def _emulator_query_pipelined():
+    """Four queries pipelined over an open SppSession."""
+    [mac] = emulated_macs(1)
+    with _emulated([mac]), SppSession(mac) as session:
+        yield functools.partial(session.query, _QUERY_IDS, window=len(_QUERY_IDS))
+
+
+@benchmark("emulator.aio_send")
+def _emulator_aio_send():
+    """One query round trip over an open AsyncSppSession."""
+    [mac] = emulated_macs(1)
+    loop = asyncio.new_event_loop()
+    session = AsyncSppSession(mac)
+    try:
+        with _emulated([mac]):
+            yield lambda: loop.run_until_complete(session.send(_QUERY))
+            session.close()
+    finally:
+        loop.close()
+
+
+@benchmark("emulator.aio_fleet[50]")
+def _emulator_aio_fleet():
+    """One query to each of 50 speakers at once over AsyncSppSessions."""
+    macs = emulated_macs(50)
+    loop = asyncio.new_event_loop()
+    sessions = [AsyncSppSession(mac) for mac in macs]
+
+    async def round_trip():
+        await asyncio.gather(*(session.send(_QUERY) for session in sessions))
+
+    try:
+        with _emulated(macs):
+            yield lambda: loop.run_until_complete(round_trip())
+            for session in sessions:
+                session.close()
+    finally:
+        loop.close()
+
+
+_worker_transport = None
+
+
+def emulated_session(server_address, mac_address: str, adapter: str | None = None) -> SppSession:
+    """Supervisor session factory: an SppSession to the emulator at server_address.
+
+    Routes the worker process's SPP traffic to the emulator on first use.
+    adapter is ignored, since emulated links have no local adapter.
+    """
+    global _worker_transport
+    if _worker_transport is None:
+        _worker_transport = emulated_transport(server_address)
+        _worker_transport.__enter__()
+        get_rate_limiter().configure(None, 1)
+    return SppSession(mac_address)
+
+
+@benchmark("workers.supervisor_send[8]")
+def _supervisor_send():
+    """One query to each of 8 speakers through a Supervisor with two workers."""
+    macs = emulated_macs(8)
+    with _emulated(macs) as server:
+        factory = functools.partial(emulated_session, server.address)
+        with Supervisor(["hci0", "hci1"], session_factory=factory) as supervisor:
+
+            def round_trip():
+                futures = [supervisor.submit("send", mac, _QUERY) for mac in macs]
+                for future in futures:
+                    future.result()
+
+            yield round_trip
@@ -0,0 +1,306 @@
+"""Time benchmarks, keep JSON baselines and compare runs against them.
+
+Each benchmark is timed in `repeat` samples. A sample runs the operation
+enough times to take at least min_time seconds, and records the mean time
+per operation. A run compared with a baseline counts as a regression only
+if two things hold. The median is more than `threshold` slower, and a
+Mann-Whitney U test puts the two sets of samples apart with p < alpha. So
+noise alone does not fail a comparison.
+"""
+
+import argparse
+import contextlib
+import datetime
+import fnmatch
+import json
+import math
+import os
+import platform
+import statistics
+import tempfile
+import time
+from collections.abc import Callable
+from pathlib import Path
+from typing import NamedTuple
+
+BASELINE_VERSION = 1
+
+DEFAULT_REPEAT = 10
+DEFAULT_MIN_TIME = 0.05  # seconds per sample
+DEFAULT_THRESHOLD = 0.05  # relative slowdown of the median that matters
+DEFAULT_ALPHA = 0.05
+
+FASTER = "faster"
+SLOWER = "slower"
+SAME = "same"
+
+
+class Benchmark(NamedTuple):
+    """A registered benchmark; setup() is a context manager yielding the operation."""
+
+    name: str
+    description: str
+    setup: Callable
+
+
+class Result(NamedTuple):
+    """Samples of one benchmark, in seconds per operation."""
+
+    name: str
+    number: int  # operations per sample
+    samples: list[float]
+
+    @property
+    def median(self) -> float:
+        return statistics.median(self.samples)
+
+    @property
+    def stdev(self) -> float:
+        return statistics.stdev(self.samples) if len(self.samples) > 1 else 0.0
+
+
+class Comparison(NamedTuple):
+    """A result set against its baseline."""
+
+    name: str
+    baseline: float  # median seconds per operation
+    current: float
+    change: float  # current / baseline - 1
+    p_value: float
+    verdict: str  # FASTER, SLOWER or SAME
+
+
+_registry: dict[str, Benchmark] = {}
+
+
+def benchmark(name: str):
+    """Register a generator function as a benchmark.
+
+    The function sets up, yields the zero-argument operation to time, then
+    tears down. Its docstring's first line describes the benchmark.
+    """
+
+    def register(func):
+        description = (func.__doc__ or "").strip().partition("\n")[0]
+        _registry[name] = Benchmark(name, description, contextlib.contextmanager(func))
+        return func
+
+    return register
+
+
+def benchmarks(patterns: list[str] | None = None) -> list[Benchmark]:
+    """The registered benchmarks whose names match any of the glob patterns."""
+    from . import cases  # noqa: F401  (registers the suite)
+
+    return [
+        bench
+        for name, bench in _registry.items()
+        if not patterns or any(fnmatch.fnmatchcase(name, p) for p in patterns)
+    ]
+
+
+def _time(op: Callable, number: int, clock) -> float:
+    start = clock()
+    for _ in range(number):
+        op()
+    return clock() - start
+
+
+def _autorange(op: Callable, min_time: float, clock) -> int:
+    """How many operations make a sample of at least min_time seconds."""
+    number = 1
+    while _time(op, number, clock) < min_time:
+        number *= 2
+    return number
+
+
+def measure(
+    bench: Benchmark,
+    repeat: int = DEFAULT_REPEAT,
+    min_time: float = DEFAULT_MIN_TIME,
+    clock=time.perf_counter,
+) -> Result:
+    """Run one benchmark; the first call of the operation is a warm-up."""
+    with bench.setup() as op:
+        op()
+        number = _autorange(op, min_time, clock)
+        samples = [_time(op, number, clock) / number for _ in range(repeat)]
+    return Result(bench.name, number, samples)
+
+
+def mann_whitney(a: list[float], b: list[float]) -> float:
+    """Two-sided p-value of the Mann-Whitney U test for samples a and b.
+
+    Uses the normal approximation with tie and continuity corrections, which
+    is close enough from about eight samples each.
+    """
+    n1, n2 = len(a), len(b)
+    if not n1 or not n2:
+        return 1.0
+    pooled = sorted([(value, 0) for value in a] + [(value, 1) for value in b])
+    rank_sum, ties, i = 0.0, 0, 0
+    while i < len(pooled):
+        j = i
+        while j + 1 < len(pooled) and pooled[j + 1][0] == pooled[i][0]:
+            j += 1
+        rank = (i + j) / 2 + 1
+        rank_sum += rank * sum(1 for k in range(i, j + 1) if pooled[k][1] == 0)
+        ties += (j - i + 1) ** 3 - (j - i + 1)
+        i = j + 1
+    n = n1 + n2
+    u = rank_sum - n1 * (n1 + 1) / 2
+    variance = n1 * n2 / 12 * ((n + 1) - ties / (n * (n - 1)))
+    if variance <= 0:
+        return 1.0
+    z = max(0.0, abs(u - n1 * n2 / 2) - 0.5) / math.sqrt(variance)
+    return min(1.0, 2 * (1 - statistics.NormalDist().cdf(z)))
+
+
+def compare(
+    result: Result,
+    baseline: Result,
+    threshold: float = DEFAULT_THRESHOLD,
+    alpha: float = DEFAULT_ALPHA,
+) -> Comparison:
+    before, after = baseline.median, result.median
+    change = after / before - 1 if before else 0.0
+    p_value = mann_whitney(result.samples, baseline.samples)
+    verdict = SAME
+    if p_value < alpha and change > threshold:
+        verdict = SLOWER
+    elif p_value < alpha and change < -threshold:
+        verdict = FASTER
+    return Comparison(result.name, before, after, change, p_value, verdict)
+
+
+def save_baseline(results: list[Result], path: Path):
+    """Write results as a JSON baseline, with where and when they were taken."""
+    data = {
+        "version": BASELINE_VERSION,
+        "created": datetime.datetime.now(datetime.UTC).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "results": {r.name: {"number": r.number, "samples": r.samples} for r in results},
+    }
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(data, indent=2) + "\n")
+
+
+def load_baseline(path: Path) -> dict[str, Result]:
+    """Read a baseline written by save_baseline(); raises ValueError if it is not one."""
+    try:
+        data = json.loads(path.read_text())
+        if data["version"] != BASELINE_VERSION:
+            raise ValueError(f"{path}: baseline version {data['version']} is not supported")
+        return {
+            name: Result(name, int(entry["number"]), [float(s) for s in entry["samples"]])
+            for name, entry in data["results"].items()
+        }
+    except (KeyError, TypeError, AttributeError, json.JSONDecodeError) as e:
+        raise ValueError(f"{path}: not a benchmark baseline ({e})") from None
+
+
+def format_time(seconds: float) -> str:
+    for unit, scale in (("s", 1.0), ("ms", 1e-3), ("us", 1e-6)):
+        if seconds >= scale:
+            return f"{seconds / scale:.3g} {unit}"
+    return f"{seconds / 1e-9:.3g} ns"
+
+
+@contextlib.contextmanager
+def _scratch_state():
+    """Point caches, locks and profiles at a temporary directory.
+
+    The transport benchmarks talk to made-up speakers; their channels and
+    pacing must not end up in the user's cache.
+    """
+    saved = {key: os.environ.get(key) for key in ("XDG_CACHE_HOME", "XDG_RUNTIME_DIR")}
+    with tempfile.TemporaryDirectory(prefix="ueboom-bench-") as scratch:
+        os.environ["XDG_CACHE_HOME"] = os.path.join(scratch, "cache")
+        os.environ["XDG_RUNTIME_DIR"] = os.path.join(scratch, "run")
+        try:
+            yield
+        finally:
+            for key, value in saved.items():
+                if value is None:
+                    os.environ.pop(key, None)
+                else:
+                    os.environ[key] = value
+
+
+def _report(result: Result, comparison: Comparison | None):
+    line = (
+        f"{result.name:<40} {format_time(result.median):>10}/op"
+        f"  ±{format_time(result.stdev):>9}  {1 / result.median:>12,.0f} op/s"
+    )
+    if comparison is not None:
+        line += (
+            f"  {comparison.change:+7.1%} vs {format_time(comparison.baseline)}"
+            f"  (p={comparison.p_value:.3f}) {comparison.verdict}"
+        )
+    print(line, flush=True)
+
+
+def main(argv: list[str] | None = None):
+    parser = argparse.ArgumentParser(
+        prog="ueboom-bench",
+        description="Benchmark protocol, parsing and transport hot paths",
+    )
+    parser.add_argument("names", nargs="*", metavar="NAME", help="Benchmarks to run (globs)")
+    parser.add_argument("--list", "-l", action="store_true", help="List benchmarks and exit")
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT, help="Samples per benchmark")
+    parser.add_argument(
+        "--min-time",
+        type=float,
+        default=DEFAULT_MIN_TIME,
+        help="Minimum seconds per sample (default %(default)g)",
+    )
+    parser.add_argument("--save", type=Path, metavar="FILE", help="Write results as a baseline")
+    parser.add_argument(
+        "--compare", type=Path, metavar="FILE", help="Compare with a baseline; exit 1 on regression"
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=DEFAULT_THRESHOLD * 100,
+        help="Slowdown in percent that counts as a regression (default %(default)g)",
+    )
+    args = parser.parse_args(argv)
+
+    selected = benchmarks(args.names)
+    if args.list:
+        for bench in selected:
+            print(f"{bench.name:<40} {bench.description}")
+        return
+    if not selected:
+        print("ERROR: no benchmark matches " + " ".join(args.names))
+        raise SystemExit(1)
+    if args.repeat < 2:
+        parser.error("--repeat must be at least 2")
+
+    baseline = {}
+    if args.compare is not None:
+        try:
+            baseline = load_baseline(args.compare)
+        except (OSError, ValueError) as e:
+            print(f"ERROR: {e}")
+            raise SystemExit(1) from None
+
+    results, regressions = [], []
+    with _scratch_state():
+        for bench in selected:
+            result = measure(bench, args.repeat, args.min_time)
+            results.append(result)
+            comparison = None
+            if bench.name in baseline:
+                comparison = compare(result, baseline[bench.name], args.threshold / 100)
+                if comparison.verdict == SLOWER:
+                    regressions.append(bench.name)
+            _report(result, comparison)
+
+    if args.save is not None:
+        save_baseline(results, args.save)
+        print(f"Baseline written to {args.save}")
+    if regressions:
+        print(f"{len(regressions)} regression(s): {', '.join(regressions)}")
+        raise SystemExit(1)
@@ -1,27 +1,165 @@
 """BlueZ D-Bus transport and device discovery for UE Mini Boom."""
 
+import json
 import subprocess
 
+from . import dbus
+from .adapters import local_adapter_names
 from .protocol import UE_NAME_KEYWORDS, UE_OUI_PREFIXES
 
+# One D-Bus call returning every BlueZ object with all its interfaces and properties.
+_MANAGED_OBJECTS_COMMAND = [
+    "busctl",
+    "--system",
+    "--json=short",
+    "call",
+    "org.bluez",
+    "/",
+    "org.freedesktop.DBus.ObjectManager",
+    "GetManagedObjects",
+]
 
-def get_device_status(speaker_mac: str) -> dict:
-    """Read device status from BlueZ via bluetoothctl.
 
-    Returns a dict with available fields: name, connected, paired, battery.
+def _battery_object_path(speaker_mac: str, adapter: str = "hci0") -> str:
+    return f"/org/bluez/{adapter}/dev_" + speaker_mac.replace(":", "_")
+
+
+def _battery_command(speaker_mac: str, adapter: str = "hci0") -> list[str]:
+    """dbus-send command line reading Battery1.Percentage for a speaker on adapter."""
+    return [
+        "dbus-send",
+        "--system",
+        "--print-reply",
+        "--dest=org.bluez",
+        _battery_object_path(speaker_mac, adapter),
+        "org.freedesktop.DBus.Properties.Get",
+        "string:org.bluez.Battery1",
+        "string:Percentage",
+    ]
+
+
+def _parse_managed_objects(objects: dict[str, dict[str, dict]]) -> dict[str, dict]:
+    """Turn a GetManagedObjects result into {MAC: status dict}, one per BlueZ device.
+
+    objects maps object path -> interface -> property -> plain value. Status
+    dicts use the same keys as get_device_status (name, alias, connected,
+    paired, modalias, battery) plus address, path and adapter (e.g. "hci0").
+    A speaker paired on several adapters has one object per adapter; the one
+    that is connected (then paired, then reporting a battery) wins.
+    """
+    devices = {}
+    for path, interfaces in objects.items():
+        props = interfaces.get("org.bluez.Device1")
+        if props is None or "Address" not in props:
+            continue
+        address = str(props["Address"]).upper()
+        adapter = props.get("Adapter") or path.rsplit("/", 1)[0]
+        info = {"address": address, "path": path, "adapter": adapter.rsplit("/", 1)[-1]}
+        if "Name" in props:
+            info["name"] = props["Name"]
+        if "Alias" in props and props["Alias"] != info.get("name"):
+            info["alias"] = props["Alias"]
+        for key, prop in (("connected", "Connected"), ("paired", "Paired")):
+            if prop in props:
+                info[key] = bool(props[prop])
+        if "Modalias" in props:
+            info["modalias"] = props["Modalias"]
+        battery = interfaces.get("org.bluez.Battery1", {}).get("Percentage")
+        if battery is not None:
+            info["battery"] = int(battery)
+        other = devices.get(address)
+        if other is None or _preference(info) > _preference(other):
+            devices[address] = info
+    return devices
+
+
+def _preference(info: dict) -> tuple[bool, bool, bool]:
+    """Rank of one adapter's view of a device; the live link's adapter knows best."""
+    return info.get("connected", False), info.get("paired", False), "battery" in info
+
+
+def _parse_busctl_managed_objects(stdout: str) -> dict[str, dict[str, dict]]:
+    """Decode `busctl --json=short call ... GetManagedObjects` output.
+
+    busctl wraps every variant as {"type": ..., "data": ...}; those are unwrapped.
+    Raises ValueError on unexpected output.
     """
-    info = {}
+    try:
+        reply = json.loads(stdout)
+        raw = reply["data"][0]
+        return {path: _unwrap_interfaces(interfaces) for path, interfaces in raw.items()}
+    except (KeyError, IndexError, TypeError, AttributeError) as e:
+        raise ValueError(f"unexpected GetManagedObjects reply: {e}") from None
+
+
+def _unwrap_interfaces(interfaces: dict) -> dict[str, dict]:
+    """Strip busctl variant wrappers from an a{sa{sv}} value."""
+    return {iface: _unwrap_properties(props) for iface, props in interfaces.items()}
+
+
+def _unwrap_properties(props: dict) -> dict:
+    """Strip busctl variant wrappers from an a{sv} value."""
+    return {name: variant["data"] for name, variant in props.items()}
+
+
+def get_managed_objects() -> dict[str, dict[str, dict]] | None:
+    """Return the raw GetManagedObjects result of org.bluez.
+
+    Maps object path -> interface -> property -> plain value, or None if the
+    system bus cannot be queried. Uses the process's persistent bus connection,
+    falling back to busctl.
+    """
+    try:
+        return dbus.system_bus().get_managed_objects("org.bluez")
+    except (OSError, dbus.DBusError):
+        pass
     try:
         result = subprocess.run(
-            ["bluetoothctl", "info", speaker_mac],
+            _MANAGED_OBJECTS_COMMAND,
             capture_output=True,
             text=True,
             timeout=5,
         )
     except (FileNotFoundError, subprocess.TimeoutExpired):
-        return info
+        return None
+    if result.returncode != 0:
+        return None
+    try:
+        return _parse_busctl_managed_objects(result.stdout)
+    except ValueError:
+        return None
+
+
+def get_managed_devices() -> dict[str, dict] | None:
+    """Read every BlueZ device in a single D-Bus round trip.
+
+    Calls org.freedesktop.DBus.ObjectManager.GetManagedObjects on org.bluez and
+    returns {MAC: status dict} (see _parse_managed_objects), or None if the
+    system bus cannot be queried.
+    """
+    objects = get_managed_objects()
+    if objects is None:
+        return None
+    return _parse_managed_objects(objects)
 
-    for line in result.stdout.splitlines():
+
+def _ue_devices_from_snapshot(devices: dict[str, dict]) -> list[tuple[str, str]]:
+    """Paired UE speakers from a get_managed_devices() result, as (mac, name)."""
+    found = []
+    for address, info in sorted(devices.items()):
+        if not info.get("paired"):
+            continue
+        # bluetoothctl lists devices by alias, which falls back to the name.
+        name = info.get("alias", info.get("name", address))
+        if is_ue_device(address, name):
+            found.append((address, name))
+    return found
+
+
+def _parse_device_info(stdout: str) -> dict:
+    """Parse `bluetoothctl info <mac>` output into a status dict."""
+    info = {}
+    for line in stdout.splitlines():
         line = line.strip()
         if line.startswith("Name:"):
             info["name"] = line.split(":", 1)[1].strip()
@@ -47,36 +185,81 @@ def get_device_status(speaker_mac: str) -> dict:
     return info
 
 
-def get_battery(speaker_mac: str) -> int:
-    """Read battery level from BlueZ D-Bus Battery1 interface.
+def _parse_battery_reply(stdout: str) -> int:
+    """Parse the `dbus-send --print-reply` output of a Percentage read.
 
-    Returns battery percentage (0-100) or -1 on failure.
+    Returns battery percentage (0-100) or -1 if the reply has no value.
     """
-    dbus_path = "/org/bluez/hci0/dev_" + speaker_mac.replace(":", "_")
+    for line in stdout.splitlines():
+        line = line.strip()
+        if line.startswith("variant") or "byte" in line:
+            parts = line.split()
+            try:
+                return int(parts[-1])
+            except ValueError:
+                return -1
+    return -1
+
+
+def _parse_paired_devices(stdout: str) -> list[tuple[str, str]]:
+    """Parse `bluetoothctl devices Paired` output, keeping only UE speakers."""
+    devices = []
+    for line in stdout.splitlines():
+        parts = line.split(maxsplit=2)
+        if len(parts) < 3 or parts[0] != "Device":
+            continue
+        address = parts[1]
+        name = parts[2]
+        if is_ue_device(address, name):
+            devices.append((address, name))
+    return devices
+
+
+def get_device_status(speaker_mac: str) -> dict:
+    """Read device status from BlueZ.
+
+    Uses one D-Bus GetManagedObjects call, falling back to bluetoothctl when
+    the bus cannot be queried.
+    Returns a dict with available fields: name, connected, paired, battery.
+    """
+    devices = get_managed_devices()
+    if devices is not None:
+        return devices.get(speaker_mac.upper(), {})
+
     try:
         result = subprocess.run(
-            [
-                "dbus-send",
-                "--system",
-                "--print-reply",
-                "--dest=org.bluez",
-                dbus_path,
-                "org.freedesktop.DBus.Properties.Get",
-                "string:org.bluez.Battery1",
-                "string:Percentage",
-            ],
+            ["bluetoothctl", "info", speaker_mac],
             capture_output=True,
             text=True,
             timeout=5,
         )
+    except (FileNotFoundError, subprocess.TimeoutExpired):
+        return {}
+    return _parse_device_info(result.stdout)
+
+
+def get_battery(speaker_mac: str) -> int:
+    """Read battery level from BlueZ D-Bus Battery1 interface.
+
+    Returns battery percentage (0-100) or -1 on failure.
+    """
+    devices = get_managed_devices()
+    if devices is not None:
+        return devices.get(speaker_mac.upper(), {}).get("battery", -1)
+
+    # Without the snapshot we do not know the speaker's adapter; try each one.
+    for adapter in local_adapter_names():
+        try:
+            result = subprocess.run(
+                _battery_command(speaker_mac, adapter),
+                capture_output=True,
+                text=True,
+                timeout=5,
+            )
+        except (FileNotFoundError, subprocess.TimeoutExpired):
+            return -1
         if result.returncode == 0:
-            for line in result.stdout.splitlines():
-                line = line.strip()
-                if line.startswith("variant") or "byte" in line:
-                    parts = line.split()
-                    return int(parts[-1])
-    except (FileNotFoundError, subprocess.TimeoutExpired, ValueError):
-        pass
+            return _parse_battery_reply(result.stdout)
     return -1
 
 
@@ -90,6 +273,10 @@ def is_ue_device(address: str, name: str) -> bool:
 
 def get_paired_ue_devices() -> list[tuple[str, str]]:
     """Return paired UE speakers as a list of (mac_address, name) tuples."""
+    devices = get_managed_devices()
+    if devices is not None:
+        return _ue_devices_from_snapshot(devices)
+
     try:
         result = subprocess.run(
             ["bluetoothctl", "devices", "Paired"],
@@ -99,14 +286,4 @@ def get_paired_ue_devices() -> list[tuple[str, str]]:
         )
     except FileNotFoundError:
         return []
-
-    devices = []
-    for line in result.stdout.splitlines():
-        parts = line.split(maxsplit=2)
-        if len(parts) < 3 or parts[0] != "Device":
-            continue
-        address = parts[1]
-        name = parts[2]
-        if is_ue_device(address, name):
-            devices.append((address, name))
-    return devices
+    return _parse_paired_devices(result.stdout)
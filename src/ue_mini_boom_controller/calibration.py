@@ -0,0 +1,108 @@
+"""Find the fastest command rate a speaker answers reliably (`ueboom --calibrate`).
+
+Calibration sends bursts of EQ_PRESET reads, which change nothing on the
+speaker, at increasing sustained rates. It stops at the first rate where
+answers go missing. The last clean rate is saved as the profile for the
+speaker's modalias (see profiles), together with the recv timeout and gap
+the pacer had learned by then.
+"""
+
+import time
+from statistics import mean
+from typing import NamedTuple
+
+from .ble import get_device_status
+from .profiles import Profile, get_profile_store
+from .protocol import UECommand
+from .ratelimit import get_rate_limiter
+from .spp import SppSession
+
+# Sustained rates to try, in commands per second.
+DEFAULT_RATES = (2.0, 4.0, 8.0, 16.0, 32.0, 64.0)
+
+# Queries per burst, and bursts per rate.
+DEFAULT_BURST = 4
+DEFAULT_ROUNDS = 5
+
+_PROBE = bytes([0x02, 0x01, UECommand.EQ_PRESET])
+
+
+class Step(NamedTuple):
+    """Result of one calibration rate."""
+
+    rate: float
+    sent: int
+    answered: int
+    rtt: float | None  # mean round trip (seconds)
+
+    @property
+    def clean(self) -> bool:
+        return self.answered == self.sent
+
+
+def _burst(session: SppSession, count: int) -> list[float]:
+    """Send count EQ_PRESET queries back to back; returns the RTT of each answer."""
+    sent_at = [session.send_nowait(_PROBE) for _ in range(count)]
+    rtts = []
+    while len(rtts) < count:
+        frame = session.read_response(UECommand.EQ_PRESET)
+        if frame is None:
+            break
+        rtts.append(time.monotonic() - sent_at[len(rtts)])
+    return rtts
+
+
+def calibrate(
+    mac_address: str,
+    rates=DEFAULT_RATES,
+    burst: int = DEFAULT_BURST,
+    rounds: int = DEFAULT_ROUNDS,
+    session: SppSession | None = None,
+    on_step=None,
+) -> Profile | None:
+    """Measure mac_address and save a profile for its modalias.
+
+    on_step(step) is called after each rate. Returns the profile (saved only
+    if BlueZ reports a modalias), or None if even the slowest rate lost
+    answers. Raises OSError if the speaker cannot be reached.
+    """
+    limiter = get_rate_limiter()
+    owned = session is None
+    if owned:
+        session = SppSession(mac_address)
+    pacing = session.pacing
+    best = None
+    try:
+        session.connect()
+        time.sleep(pacing.gap)
+        for rate in rates:
+            limiter.configure(rate=rate, burst=burst, mac_address=mac_address)
+            rtts = []
+            sent = 0
+            for _ in range(rounds):
+                answers = _burst(session, burst)
+                sent += burst
+                rtts += answers  # read_response() has fed each to the pacer
+                if len(answers) < burst:
+                    pacing.timed_out()
+                time.sleep(pacing.gap)
+            step = Step(rate, sent, len(rtts), mean(rtts) if rtts else None)
+            if on_step is not None:
+                on_step(step)
+            if not step.clean:
+                break
+            best = (rate, pacing.timeout, pacing.gap)
+    finally:
+        if owned:
+            session.close()
+
+    if best is None:
+        limiter.configure(rate=limiter.rate, burst=limiter.burst, mac_address=mac_address)
+        return None
+    rate, timeout, gap = best
+    limiter.configure(rate=rate, burst=burst, mac_address=mac_address)
+    modalias = get_device_status(mac_address).get("modalias", "")
+    profile = Profile(modalias, rate, burst, round(timeout, 3), round(gap, 3), time.time())
+    if modalias:
+        get_profile_store().put(profile, mac_address)
+    return profile
@@ -0,0 +1,98 @@
+"""RFCOMM channel cache, so repeat connects skip the SDP lookup.
+
+Entries are kept in memory and persisted to
+$XDG_CACHE_HOME/ue-mini-boom-controller/channels.json, so cold-start CLI runs
+benefit as well. Each entry expires after a TTL, and callers drop an entry as
+soon as connecting to its channel fails.
+"""
+
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+from .paths import cache_dir
+
+# Channel assignments only change when the speaker firmware changes.
+DEFAULT_TTL = 24 * 60 * 60
+
+
+class ChannelCache:
+    """Per-MAC RFCOMM channel cache with a TTL, backed by a JSON file."""
+
+    def __init__(self, path: Path | None = None, ttl: float = DEFAULT_TTL):
+        self.path = path
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries: dict[str, tuple[int, float]] | None = None
+        self._lock = threading.Lock()
+
+    def _load(self) -> dict[str, tuple[int, float]]:
+        if self._entries is None:
+            self._entries = {}
+            if self.path is not None:
+                try:
+                    raw = json.loads(self.path.read_text())
+                    for mac, entry in raw.items():
+                        self._entries[mac] = (int(entry["channel"]), float(entry["stored_at"]))
+                except (OSError, ValueError, TypeError, KeyError, AttributeError):
+                    pass  # missing or corrupt cache — start empty
+        return self._entries
+
+    def _save(self):
+        if self.path is None:
+            return
+        data = {
+            mac: {"channel": channel, "stored_at": stored_at}
+            for mac, (channel, stored_at) in self._entries.items()
+        }
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp")
+            tmp.write_text(json.dumps(data, indent=1))
+            os.replace(tmp, self.path)
+        except OSError:
+            pass  # cache is best effort
+
+    def get(self, mac_address: str) -> int | None:
+        """Return the cached channel for mac_address, or None if absent or expired."""
+        key = mac_address.upper()
+        with self._lock:
+            entry = self._load().get(key)
+            if entry is not None and time.time() - entry[1] < self.ttl:
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+            return None
+
+    def put(self, mac_address: str, channel: int):
+        """Remember that mac_address answers on channel."""
+        key = mac_address.upper()
+        with self._lock:
+            entries = self._load()
+            now = time.time()
+            old = entries.get(key)
+            entries[key] = (channel, now)
+            # Skip rewriting the file when a fresh, identical entry is already on disk.
+            if old is None or old[0] != channel or now - old[1] > self.ttl / 2:
+                self._save()
+
+    def invalidate(self, mac_address: str):
+        """Forget the channel for mac_address (e.g. after a failed connect)."""
+        key = mac_address.upper()
+        with self._lock:
+            if self._load().pop(key, None) is not None:
+                self._save()
+
+
+_default: ChannelCache | None = None
+
+
+def get_channel_cache() -> ChannelCache:
+    """Return the process-wide cache backed by the user's cache directory."""
+    global _default
+    if _default is None:
+        _default = ChannelCache(cache_dir() / "channels.json")
+    return _default
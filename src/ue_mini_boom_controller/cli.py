@@ -1,20 +1,49 @@
 """CLI entry point for UE Mini Boom Controller."""
 
 import argparse
+import time
 
 import argcomplete
 
 from .ble import get_battery, get_device_status, get_paired_ue_devices
-from .interactive import interactive_mode
+from .fleet import DEFAULT_CONCURRENCY, DEFAULT_TARGET_SKEW
+from .latency import get_latency_recorder
 from .protocol import COMMANDS, UECommand
 from .spp import query_spp_values, send_spp_command, set_speaker_name
 
 _EQ_NAMES = {0: "Off (flat)", 1: "Out Loud", 2: "Intimate", 3: "Vocals"}
 
 
-def _print_status(mac: str):
+class _LocalApi:
+    """Does the work in this process; DaemonClient has the same methods."""
+
+    def get_paired_ue_devices(self):
+        return get_paired_ue_devices()
+
+    def get_device_status(self, mac: str):
+        return get_device_status(mac)
+
+    def get_battery(self, mac: str):
+        return get_battery(mac)
+
+    def query_spp_values(self, mac: str, command_ids: list[int]):
+        return query_spp_values(mac, command_ids)
+
+    def send_spp_command(self, mac: str, command: bytes):
+        return send_spp_command(mac, command)
+
+    def set_speaker_name(self, mac: str, name: str):
+        return set_speaker_name(mac, name)
+
+    def latency_summary(self, mac: str | None = None):
+        recorder = get_latency_recorder()
+        return recorder.summary(mac) if recorder.enabled else None
+
+
+def _print_status(mac: str, api=None):
     """Print current speaker status from BlueZ D-Bus + safe LWACP queries."""
-    status = get_device_status(mac)
+    api = api or _LocalApi()
+    status = api.get_device_status(mac)
 
     name = status.get("name", mac)
     connected = status.get("connected", False)
@@ -35,7 +64,7 @@ def _print_status(mac: str):
         return
 
     # Query EQ preset over LWACP (safe to read)
-    values = query_spp_values(mac, [UECommand.EQ_PRESET])
+    values = api.query_spp_values(mac, [UECommand.EQ_PRESET])
 
     eq_val = values.get(UECommand.EQ_PRESET)
     if eq_val is not None:
@@ -81,6 +110,123 @@ def _stereo_setup_flow(mac: str):
             print("WARNING: Speaker may still be in discovery mode. Power-cycle to reset.")
 
 
+def _calibrate_flow(mac: str):
+    """Find the fastest reliable command rate for mac and save it as its model's profile."""
+    from .calibration import calibrate
+
+    print(f"Calibrating {mac} with bursts of EQ preset reads...")
+
+    def report(step):
+        line = f"  {step.rate:5g} cmd/s: {step.answered}/{step.sent} answered"
+        if step.rtt is not None:
+            line += f", RTT {step.rtt * 1000:.0f} ms"
+        if not step.clean:
+            line += " — responses dropping"
+        print(line)
+
+    try:
+        profile = calibrate(mac, on_step=report)
+    except Exception as e:
+        print(f"ERROR: Could not connect — {e}")
+        return
+    if profile is None:
+        print("The speaker dropped responses even at the slowest rate; no profile saved.")
+        return
+    print(
+        f"Reliable up to {profile.rate:g} cmd/s (burst {profile.burst}), "
+        f"timeout {profile.timeout:.2f}s, gap {profile.gap:.3f}s"
+    )
+    if profile.modalias:
+        print(f"Saved profile for {profile.modalias}")
+    else:
+        print("WARNING: BlueZ reports no modalias for this speaker; profile not saved.")
+
+
+def _print_latency(rows) -> None:
+    """Print latency percentiles per speaker and phase, in milliseconds."""
+    if rows is None:
+        print("Latency is not being recorded (start ueboomd with --latency).")
+        return
+    if not rows:
+        print("No latency recorded.")
+        return
+    print(f"{'Latency (ms)':<22}{'count':>7}{'mean':>9}{'p50':>9}{'p95':>9}{'p99':>9}{'max':>9}")
+    mac = None
+    for row in rows:
+        if row.mac_address != mac:
+            mac = row.mac_address
+            print(f"  {mac}")
+        label = row.phase if row.command_id is None else f"{row.phase} 0x{row.command_id:02X}"
+        times = (row.mean, row.p50, row.p95, row.p99, row.max)
+        print(f"    {label:<18}{row.count:>7}" + "".join(f"{t * 1000:>9.2f}" for t in times))
+
+
+def _fleet_flow(args) -> None:
+    """Send one command to several speakers in parallel and report per-speaker results."""
+    from .fleet import fan_out, synchronized_send
+
+    targets = list(args.mac or [])
+    if args.all:
+        targets += [addr for addr, _name in get_paired_ue_devices()]
+    targets = list(dict.fromkeys(targets))
+    if not targets:
+        print("No paired UE speakers found.")
+        return
+
+    if args.raw:
+        command = bytes.fromhex(args.raw.replace(" ", ""))
+    elif args.command:
+        command = COMMANDS[args.command]
+    else:
+        print("ERROR: --all or several --mac need a command (--command or --raw).")
+        return
+
+    if args.sync:
+        print(f"Connecting to {len(targets)} speaker(s) for a synchronized send...")
+        report = synchronized_send(targets, command, concurrency=args.jobs)
+        results = report.results
+    else:
+        print(f"Sending to {len(targets)} speaker(s), up to {args.jobs} at a time...")
+        results = fan_out(targets, command, concurrency=args.jobs)
+    for r in results:
+        line = f"  {r.mac_address}  {'OK  ' if r.ok else 'FAIL'}  {r.elapsed:6.2f}s"
+        if r.error:
+            line += f"  {r.error}"
+        print(line)
+    succeeded = sum(r.ok for r in results)
+    slowest = max(r.elapsed for r in results)
+    print(f"{succeeded}/{len(results)} succeeded (slowest {slowest:.2f}s)")
+    if args.sync:
+        print(f"Send skew: {report.skew * 1000:.2f} ms (target {args.max_skew:g} ms)")
+        if report.skew * 1000 > args.max_skew:
+            print("WARNING: speakers did not receive the command within the target skew.")
+
+
+def _serve_metrics(port: int, address: str = "127.0.0.1") -> None:
+    """Serve speaker metrics over HTTP until Ctrl-C (--metrics-port)."""
+    from .device_state import DeviceStateCache
+    from .metrics import serve_metrics
+
+    devices = DeviceStateCache()
+    if not devices.start():
+        print("BlueZ signals unavailable; reading device state every few seconds")
+    try:
+        server = serve_metrics(port, address, devices)
+    except OSError as e:
+        devices.stop()
+        print(f"ERROR: cannot serve metrics on {address}:{port}: {e}")
+        raise SystemExit(1) from None
+    print(f"Serving metrics on http://{address}:{server.port}/metrics (Ctrl-C to stop)")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop()
+        devices.stop()
+
+
 def main():
     parser = argparse.ArgumentParser(
         description="UE Mini Boom Controller \u2014 replaces the official app",
@@ -102,12 +248,31 @@ Examples:
   # Interactive mode
   %(prog)s -i
 
+  # Measure how fast the speaker can take commands; saves a profile for its model
+  %(prog)s --calibrate
+
+  # Play the power-on sound on every paired speaker at once
+  %(prog)s --all --command sound_power_on --sync
+
+  # Show where the time went: SDP, connect, first byte, response, close
+  %(prog)s --status --latency
+
+  # Export battery and connection state for Prometheus until Ctrl-C
+  %(prog)s --metrics-port 9464
+
 Tab completion (add to ~/.bashrc or ~/.zshrc):
   eval "$(register-python-argcomplete %(prog)s)"
         """,
     )
 
-    parser.add_argument("--mac", help="Bluetooth MAC address of the UE Mini Boom")
+    parser.add_argument(
+        "--mac",
+        action="append",
+        help="Bluetooth MAC address of the UE Mini Boom (repeat to target several speakers)",
+    )
+    parser.add_argument(
+        "--all", action="store_true", help="Send the command to every paired UE speaker"
+    )
     parser.add_argument("--list", action="store_true", help="List paired UE speakers")
     parser.add_argument("--status", action="store_true", help="Show current speaker status")
     parser.add_argument("--battery", action="store_true", help="Read battery level")
@@ -116,16 +281,85 @@ Tab completion (add to ~/.bashrc or ~/.zshrc):
         action="store_true",
         help="Guided stereo pairing setup for two speakers",
     )
+    parser.add_argument(
+        "--calibrate",
+        action="store_true",
+        help="Find the fastest reliable command rate and save it for this speaker model",
+    )
     parser.add_argument("--name", help="Set speaker name")
     parser.add_argument("--interactive", "-i", action="store_true", help="Interactive menu mode")
     parser.add_argument("--raw", help="Send raw hex command (e.g. '03 01 64 01')")
+    parser.add_argument("--command", choices=sorted(COMMANDS), help="Send a pre-built command")
+    parser.add_argument(
+        "--sync",
+        action="store_true",
+        help="With --all / several --mac: connect first, then release all sends at once",
+    )
+    parser.add_argument(
+        "--max-skew",
+        type=float,
+        default=DEFAULT_TARGET_SKEW * 1000,
+        help="Target send skew in ms for --sync (default %(default)g)",
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=DEFAULT_CONCURRENCY,
+        help=f"Speakers contacted in parallel with --all (default {DEFAULT_CONCURRENCY})",
+    )
+
+    parser.add_argument(
+        "--latency",
+        action="store_true",
+        help="Print per-phase latency percentiles (SDP, connect, first byte, response, close)",
+    )
+
+    parser.add_argument(
+        "--metrics-port",
+        type=int,
+        metavar="PORT",
+        help="Serve speaker metrics at http://127.0.0.1:PORT/metrics until Ctrl-C "
+        "(link and latency metrics: ueboomd --metrics-port)",
+    )
+
+    parser.add_argument(
+        "--no-daemon",
+        action="store_true",
+        help="Do the work in this process even if ueboomd is running",
+    )
 
     argcomplete.autocomplete(parser)
     args = parser.parse_args()
+    if args.latency:
+        get_latency_recorder().enabled = True
+    if args.metrics_port is not None:
+        _serve_metrics(args.metrics_port)
+        return
 
+    fleet = args.all or (args.mac and len(args.mac) > 1)
+    client = None
+    if not args.no_daemon:
+        from .daemon import connect_client
+
+        client = connect_client()
+    # Interactive, guided and fleet flows keep their own links; everything else is forwarded.
+    if client is not None and (fleet or args.interactive or args.stereo_setup or args.calibrate):
+        client.close()
+        client = None
+    api = client or _LocalApi()
+    try:
+        _run(parser, args, api)
+        if args.latency:
+            _print_latency(api.latency_summary())
+    finally:
+        if client is not None:
+            client.close()
+
+
+def _run(parser, args, api):
     # --- List paired UE speakers (no MAC needed) ---
     if args.list:
-        devices = get_paired_ue_devices()
+        devices = api.get_paired_ue_devices()
         if devices:
             print(f"Found {len(devices)} paired UE speaker(s):")
             for addr, name in devices:
@@ -135,9 +369,14 @@ Tab completion (add to ~/.bashrc or ~/.zshrc):
             print("Pair your speaker first: bluetoothctl pair <MAC>")
         return
 
+    # --- One command to several speakers ---
+    if args.all or (args.mac and len(args.mac) > 1):
+        _fleet_flow(args)
+        return
+
     # --- Auto-detect MAC if not provided ---
     if not args.mac:
-        devices = get_paired_ue_devices()
+        devices = api.get_paired_ue_devices()
         if len(devices) == 1:
             mac = devices[0][0]
             print(f"Auto-detected: {devices[0][1]} ({mac})")
@@ -150,34 +389,44 @@ Tab completion (add to ~/.bashrc or ~/.zshrc):
             parser.print_help()
             return
     else:
-        mac = args.mac
+        mac = args.mac[0]
 
     # --- Status ---
     if args.status:
-        _print_status(mac)
+        _print_status(mac, api)
         return
 
     # --- Battery ---
     if args.battery:
-        level = get_battery(mac)
+        level = api.get_battery(mac)
         if level >= 0:
             print(f"Battery: {level}%")
         else:
             print("Could not read battery. Is the speaker connected?")
         return
 
+    # --- Calibration ---
+    if args.calibrate:
+        _calibrate_flow(mac)
+        return
+
     # --- SPP commands ---
     if args.stereo_setup:
         _stereo_setup_flow(mac)
 
     elif args.name:
-        set_speaker_name(mac, args.name)
+        api.set_speaker_name(mac, args.name)
 
     elif args.raw:
         raw_bytes = bytes.fromhex(args.raw.replace(" ", ""))
-        send_spp_command(mac, raw_bytes)
+        api.send_spp_command(mac, raw_bytes)
+
+    elif args.command:
+        api.send_spp_command(mac, COMMANDS[args.command])
 
     elif args.interactive:
+        from .interactive import interactive_mode
+
         interactive_mode(mac)
 
     else:
@@ -0,0 +1,480 @@
+"""ueboomd: a long-running daemon that keeps BlueZ state and speaker channels warm.
+
+A one-shot `ueboom` run pays for process startup, a BlueZ read and the SDP
+lookup before it can send anything. The daemon keeps a live DeviceStateCache,
+the channel cache and the pacer in memory, and serves requests over a Unix
+socket at $XDG_RUNTIME_DIR/ue-mini-boom-controller/ueboomd.sock. A speaker's
+RFCOMM link stays open while requests for it are queued and is closed after
+the last one, so the daemon never keeps other processes off the speaker.
+
+The protocol is one JSON object per line in each direction:
+
+    -> {"id": 1, "method": "battery", "params": {"mac": "88:C6:26:20:33:40"}}
+    <- {"id": 1, "result": 87}
+    <- {"id": 2, "error": "unknown method 'bogus'"}
+
+DaemonClient is the blocking client that cli.main uses when a daemon is running.
+With --metrics-port the daemon also serves OpenMetrics over HTTP (see metrics).
+"""
+
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import signal
+import socket
+from pathlib import Path
+
+from . import aio
+from .device_state import DeviceStateCache
+from .latency import LatencySummary, get_latency_recorder
+from .metrics import serve_metrics
+from .paths import runtime_dir
+from .protocol import UECommand, build_spp_command
+from .spp import _hex
+
+# Largest request line the daemon accepts.
+_MAX_LINE = 64 * 1024
+
+
+def socket_path() -> Path:
+    """Default location of the daemon's socket."""
+    return runtime_dir() / "ueboomd.sock"
+
+
+class DaemonError(Exception):
+    """The daemon rejected a request or answered with an error."""
+
+
+def _mac(params: dict) -> str:
+    mac = params.get("mac")
+    if not isinstance(mac, str) or not mac:
+        raise DaemonError("missing 'mac' parameter")
+    return mac.upper()
+
+
+def _param(params: dict, name: str, kind: type, default):
+    """params[name] if it is a kind (bools are not ints), else DaemonError; default if absent."""
+    value = params.get(name, default)
+    if not isinstance(value, kind) or (kind is int and isinstance(value, bool)):
+        raise DaemonError(f"'{name}' must be {'a string' if kind is str else 'an integer'}")
+    return value
+
+
+class SingleFlight:
+    """Coalesces concurrent identical operations into one.
+
+    The first caller for a key starts the operation; callers arriving while it
+    is in flight await the same result (or exception) instead of starting
+    their own. A caller that gives up does not cancel it for the others.
+    """
+
+    def __init__(self):
+        self.coalesced = 0
+        self._in_flight: dict[tuple, asyncio.Future] = {}
+
+    async def run(self, key: tuple, operation):
+        """Await operation() once per key at a time; operation is a coroutine function."""
+        task = self._in_flight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(operation())
+            self._in_flight[key] = task
+            task.add_done_callback(lambda _: self._in_flight.pop(key, None))
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(task)
+
+
+class Daemon:
+    """Serves the JSON API on a Unix socket; see the module docstring.
+
+    Concurrent identical reads (same method, speaker and command ids) share
+    one BlueZ read or RFCOMM query through SingleFlight.
+    """
+
+    def __init__(
+        self,
+        path: Path | None = None,
+        verbose: bool = False,
+        metrics_port: int | None = None,
+        metrics_address: str = "127.0.0.1",
+    ):
+        self.path = path or socket_path()
+        self.verbose = verbose
+        # Where to serve OpenMetrics over HTTP; None serves nothing (see metrics).
+        self.metrics_port = metrics_port
+        self.metrics_address = metrics_address
+        self.metrics = None
+        self.devices = DeviceStateCache()
+        self._sessions: dict[str, aio.AsyncSppSession] = {}
+        self._links: dict[str, asyncio.Lock] = {}
+        # Requests holding or queued for each speaker's link.
+        self._users: dict[str, int] = {}
+        self._reads = SingleFlight()
+        self._server = None
+        self._handlers = {
+            "ping": self._ping,
+            "list": self._list,
+            "status": self._status,
+            "battery": self._battery,
+            "send": self._send,
+            "query": self._query,
+            "set_name": self._set_name,
+            "latency": self._latency,
+        }
+
+    async def start(self):
+        """Bind the socket and start serving in the background.
+
+        Raises DaemonError if another daemon already answers on the socket.
+        """
+        if _daemon_answers(self.path):
+            raise DaemonError(f"a daemon is already running on {self.path}")
+        self.path.parent.mkdir(mode=0o700, parents=True, exist_ok=True)
+        with contextlib.suppress(FileNotFoundError):
+            self.path.unlink()  # stale socket from a daemon that died
+        if not await asyncio.to_thread(self.devices.start) and self.verbose:
+            print("BlueZ signals unavailable; reading device state on demand")
+        if self.metrics_port is not None:
+            try:
+                self.metrics = serve_metrics(self.metrics_port, self.metrics_address, self.devices)
+            except OSError as e:
+                self.devices.stop()
+                raise DaemonError(
+                    f"cannot serve metrics on {self.metrics_address}:{self.metrics_port}: {e}"
+                ) from None
+        self._server = await asyncio.start_unix_server(
+            self._serve_client, path=str(self.path), limit=_MAX_LINE
+        )
+        os.chmod(self.path, 0o600)
+
+    async def serve_forever(self):
+        await self.start()
+        try:
+            await self._server.serve_forever()
+        finally:
+            await self.close()
+
+    async def close(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+            with contextlib.suppress(FileNotFoundError):
+                self.path.unlink()
+        for session in self._sessions.values():
+            session.close()
+        self._sessions.clear()
+        if self.metrics is not None:
+            await asyncio.to_thread(self.metrics.stop)
+            self.metrics = None
+        self.devices.stop()
+
+    async def _serve_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while line := await reader.readline():
+                reply = await self.handle_line(line)
+                writer.write(json.dumps(reply).encode() + b"\n")
+                await writer.drain()
+        except (ConnectionError, asyncio.LimitOverrunError, ValueError):
+            pass
+        finally:
+            writer.close()
+            with contextlib.suppress(ConnectionError):
+                await writer.wait_closed()
+
+    async def handle_line(self, line: bytes) -> dict:
+        """Answer one request line; never raises."""
+        request_id = None
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict):
+                raise DaemonError("request must be a JSON object")
+            request_id = request.get("id")
+            handler = self._handlers.get(request.get("method"))
+            if handler is None:
+                raise DaemonError(f"unknown method {request.get('method')!r}")
+            params = request.get("params") or {}
+            if not isinstance(params, dict):
+                raise DaemonError("'params' must be an object")
+            return {"id": request_id, "result": await handler(params)}
+        except (ValueError, TypeError, AttributeError) as e:
+            # Parameters of a shape the handlers did not check for.
+            return {"id": request_id, "error": f"bad request: {e}"}
+        except (DaemonError, OSError) as e:
+            return {"id": request_id, "error": str(e)}
+
+    # --- RFCOMM links ---
+
+    @contextlib.asynccontextmanager
+    async def _link(self, mac: str):
+        """The open session for mac, held exclusively for one request.
+
+        Requests queued behind this one reuse the link; the last closes it,
+        which frees the speaker's lock for other processes. The channel cache
+        and pacer outlive the link, so the next connect skips the SDP lookup.
+        """
+        self._users[mac] = self._users.get(mac, 0) + 1
+        try:
+            async with self._links.setdefault(mac, asyncio.Lock()):
+                session = self._sessions.get(mac)
+                if session is None:
+                    session = self._sessions[mac] = aio.AsyncSppSession(mac, verbose=self.verbose)
+                yield session
+        finally:
+            self._users[mac] -= 1
+            if not self._users[mac]:
+                del self._users[mac]
+                session = self._sessions.pop(mac, None)
+                if session is not None:
+                    session.close()
+
+    # --- Handlers ---
+
+    async def _ping(self, params: dict):
+        return {
+            "pid": os.getpid(),
+            "sessions": sorted(self._sessions),
+            "live": self.devices.live,
+            "coalesced": self._reads.coalesced,
+        }
+
+    async def _list(self, params: dict):
+        if self.devices.live:
+            return self.devices.get_paired_ue_devices()
+        return await self._reads.run(("list",), aio.get_paired_ue_devices)
+
+    async def _status(self, params: dict):
+        mac = _mac(params)
+        if self.devices.live:
+            return self.devices.get_device_status(mac)
+        return await self._reads.run(("status", mac), lambda: aio.get_device_status(mac))
+
+    async def _battery(self, params: dict):
+        mac = _mac(params)
+        if self.devices.live:
+            return self.devices.get_battery(mac)
+        return await self._reads.run(("battery", mac), lambda: aio.get_battery(mac))
+
+    async def _send(self, params: dict):
+        mac = _mac(params)
+        command = bytes.fromhex(_param(params, "command", str, ""))
+        if not command:
+            raise DaemonError("missing 'command' parameter")
+        async with self._link(mac) as session:
+            try:
+                await session.connect()
+                frame = await session.send(command)
+            except OSError as e:
+                return {"ok": False, "error": str(e), "response": None}
+        return {"ok": True, "response": frame.to_bytes().hex() if frame is not None else None}
+
+    async def _query(self, params: dict):
+        mac = _mac(params)
+        ids = params.get("ids")
+        # type() rather than isinstance(): JSON true/false arrive as bools, which are ints.
+        if not isinstance(ids, list) or not all(type(i) is int and 0 <= i <= 0xFF for i in ids):
+            raise DaemonError("'ids' must be a list of command ids (0-255)")
+        window = _param(params, "window", int, 1)
+        if window < 1:
+            raise DaemonError("'window' must be at least 1")
+
+        async def query():
+            async with self._link(mac) as session:
+                values = await session.query(ids, window=window)
+            # JSON object keys are strings.
+            return {str(cid): value for cid, value in values.items()}
+
+        return await self._reads.run(("query", mac, tuple(ids), window), query)
+
+    async def _set_name(self, params: dict):
+        name = _param(params, "name", str, "")
+        command = build_spp_command(UECommand.SET_NAME, *name.encode("utf-8")[:32])
+        return await self._send({**params, "command": command.hex()})
+
+    async def _latency(self, params: dict):
+        recorder = get_latency_recorder()
+        mac = _param(params, "mac", str, "")
+        rows = [row._asdict() for row in recorder.summary(mac.upper() if mac else None)]
+        if params.get("reset"):
+            recorder.reset()
+        return {"enabled": recorder.enabled, "summary": rows}
+
+
+def _daemon_answers(path: Path) -> bool:
+    """True if something accepts connections on the socket at path."""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(1.0)
+        try:
+            sock.connect(str(path))
+        except OSError:
+            return False
+    return True
+
+
+class DaemonClient:
+    """Blocking client for a running ueboomd.
+
+    Its methods mirror the ble and spp functions the CLI uses.
+    """
+
+    def __init__(self, path: Path | None = None, timeout: float = 30.0):
+        self.path = path or socket_path()
+        self.timeout = timeout
+        self._sock = None
+        self._file = None
+        self._next_id = 0
+
+    def __enter__(self):
+        self.connect()
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def connect(self):
+        """Connect to the daemon; raises OSError if none is running."""
+        if self._sock is not None:
+            return
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        try:
+            sock.connect(str(self.path))
+        except OSError:
+            sock.close()
+            raise
+        self._sock = sock
+        self._file = sock.makefile("rb")
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        if self._sock is not None:
+            self._sock.close()
+            self._sock = None
+
+    def call(self, method: str, **params):
+        """Send one request and return its result; raises DaemonError on an error reply."""
+        self.connect()
+        self._next_id += 1
+        request = {"id": self._next_id, "method": method, "params": params}
+        self._sock.sendall(json.dumps(request).encode() + b"\n")
+        line = self._file.readline()
+        if not line:
+            self.close()
+            raise ConnectionError("daemon closed the connection")
+        reply = json.loads(line)
+        if "error" in reply:
+            raise DaemonError(reply["error"])
+        return reply.get("result")
+
+    def get_paired_ue_devices(self) -> list[tuple[str, str]]:
+        return [tuple(entry) for entry in self.call("list")]
+
+    def get_device_status(self, speaker_mac: str) -> dict:
+        return self.call("status", mac=speaker_mac)
+
+    def get_battery(self, speaker_mac: str) -> int:
+        return self.call("battery", mac=speaker_mac)
+
+    def query_spp_values(self, mac_address: str, command_ids: list[int], window: int = 1):
+        values = self.call("query", mac=mac_address, ids=list(command_ids), window=window)
+        return {int(cid): value for cid, value in values.items()}
+
+    def send_spp_command(self, mac_address: str, command: bytes, verbose: bool = True) -> bool:
+        if verbose:
+            print(f"Sending: {_hex(command)}")
+        return self._report(self.call("send", mac=mac_address, command=command.hex()), verbose)
+
+    def set_speaker_name(self, mac_address: str, name: str) -> bool:
+        return self._report(self.call("set_name", mac=mac_address, name=name), verbose=True)
+
+    def latency_summary(self, mac_address: str | None = None) -> list[LatencySummary] | None:
+        """The daemon's latency percentiles, or None if it is not recording them."""
+        reply = self.call("latency", mac=mac_address) if mac_address else self.call("latency")
+        if not reply["enabled"]:
+            return None
+        return [LatencySummary(**row) for row in reply["summary"]]
+
+    @staticmethod
+    def _report(result: dict, verbose: bool) -> bool:
+        """Print a send result the way spp.send_spp_command does."""
+        if not result["ok"]:
+            print(f"ERROR: Could not connect — {result['error']}")
+            return False
+        if verbose:
+            if result["response"] is not None:
+                print(f"Response: {_hex(bytes.fromhex(result['response']))}")
+            print("Command sent successfully.")
+        return True
+
+
+def connect_client(path: Path | None = None) -> DaemonClient | None:
+    """A connected DaemonClient, or None if no daemon is running."""
+    client = DaemonClient(path)
+    try:
+        client.connect()
+    except OSError:
+        return None
+    return client
+
+
+def main(argv: list[str] | None = None):
+    parser = argparse.ArgumentParser(
+        prog="ueboomd",
+        description="Keep UE speaker state warm and serve ueboom requests over a Unix socket",
+    )
+    parser.add_argument(
+        "--socket",
+        type=Path,
+        help="Socket path (default $XDG_RUNTIME_DIR/ue-mini-boom-controller/ueboomd.sock)",
+    )
+    parser.add_argument("--verbose", "-v", action="store_true", help="Log connects and errors")
+    parser.add_argument(
+        "--latency",
+        action="store_true",
+        help="Record per-phase latency histograms (ueboom --latency shows them)",
+    )
+    parser.add_argument(
+        "--metrics-port",
+        type=int,
+        metavar="PORT",
+        help="Serve OpenMetrics (speakers, links, latency) at http://ADDRESS:PORT/metrics",
+    )
+    parser.add_argument(
+        "--metrics-address",
+        default="127.0.0.1",
+        metavar="ADDRESS",
+        help="Address for --metrics-port (default %(default)s)",
+    )
+    args = parser.parse_args(argv)
+    if args.latency:
+        get_latency_recorder().enabled = True
+
+    try:
+        path = args.socket or socket_path()
+    except PermissionError as e:
+        print(f"ERROR: {e}")
+        raise SystemExit(1) from None
+    daemon = Daemon(
+        path,
+        verbose=args.verbose,
+        metrics_port=args.metrics_port,
+        metrics_address=args.metrics_address,
+    )
+
+    async def run():
+        loop = asyncio.get_running_loop()
+        task = asyncio.current_task()
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(signum, task.cancel)
+        with contextlib.suppress(asyncio.CancelledError):
+            await daemon.serve_forever()
+
+    try:
+        asyncio.run(run())
+    except DaemonError as e:
+        print(f"ERROR: {e}")
+        raise SystemExit(1) from None
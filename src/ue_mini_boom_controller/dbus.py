@@ -0,0 +1,668 @@
+"""Minimal D-Bus client speaking the wire protocol over a Unix socket.
+
+Covers what talking to BlueZ needs: SASL EXTERNAL authentication, marshalling
+of the basic and container types (no Unix fds), method calls, property reads
+and signal subscriptions. One connection to the system bus is kept per
+process (see system_bus()), so a property read is a single round trip on an
+open socket instead of a dbus-send process.
+
+Like sdp.py, the marshalling layer is pure and works on bytes; Connection is a
+thin socket layer on top. Variants are passed in as Variant(signature, value)
+and come back unwrapped to their plain value.
+
+Reference: D-Bus Specification, "Message Protocol".
+"""
+
+import os
+import socket
+import struct
+import threading
+from concurrent.futures import Future
+from typing import Callable, NamedTuple
+
+BUS_NAME = "org.freedesktop.DBus"
+BUS_PATH = "/org/freedesktop/DBus"
+PROPERTIES = "org.freedesktop.DBus.Properties"
+OBJECT_MANAGER = "org.freedesktop.DBus.ObjectManager"
+
+DEFAULT_SYSTEM_BUS_ADDRESS = "unix:path=/var/run/dbus/system_bus_socket"
+
+# Message types
+METHOD_CALL = 1
+METHOD_RETURN = 2
+ERROR = 3
+SIGNAL = 4
+
+# Message flags
+NO_REPLY_EXPECTED = 0x01
+
+# Header field codes, in the order they appear in Message.
+_FIELDS = (
+    (1, "path", "o"),
+    (2, "interface", "s"),
+    (3, "member", "s"),
+    (4, "error_name", "s"),
+    (5, "reply_serial", "u"),
+    (6, "destination", "s"),
+    (7, "sender", "s"),
+    (8, "signature", "g"),
+)
+
+# Fixed-size basic types: struct format and size (= alignment).
+_FIXED = {
+    "y": ("B", 1),
+    "n": ("h", 2),
+    "q": ("H", 2),
+    "i": ("i", 4),
+    "u": ("I", 4),
+    "x": ("q", 8),
+    "t": ("Q", 8),
+    "d": ("d", 8),
+    "h": ("I", 4),
+}
+_ALIGNMENT = {code: size for code, (_, size) in _FIXED.items()}
+_ALIGNMENT.update({"b": 4, "s": 4, "o": 4, "a": 4, "g": 1, "v": 1, "(": 8, "{": 8})
+
+_MAX_MESSAGE = 128 * 1024 * 1024
+
+
+class DBusError(Exception):
+    """An error reply from the bus or a peer, or a malformed message."""
+
+    def __init__(self, name: str, message: str = ""):
+        super().__init__(f"{name}: {message}" if message else name)
+        self.name = name
+
+
+class Variant(NamedTuple):
+    """A value marshalled as D-Bus variant with an explicit signature."""
+
+    signature: str
+    value: object
+
+
+class Message(NamedTuple):
+    """One D-Bus message; absent header fields are None."""
+
+    type: int
+    serial: int
+    path: str | None = None
+    interface: str | None = None
+    member: str | None = None
+    error_name: str | None = None
+    reply_serial: int | None = None
+    destination: str | None = None
+    sender: str | None = None
+    signature: str = ""
+    body: tuple = ()
+    flags: int = 0
+
+
+# --- Signatures ---
+
+
+def split_signature(signature: str) -> list[str]:
+    """Split a signature into its complete types, e.g. "sa{sv}as" -> ["s", "a{sv}", "as"]."""
+    types = []
+    pos = 0
+    while pos < len(signature):
+        end = _type_end(signature, pos)
+        types.append(signature[pos:end])
+        pos = end
+    return types
+
+
+def _type_end(signature: str, pos: int) -> int:
+    if pos >= len(signature):
+        raise DBusError("org.freedesktop.DBus.Error.InvalidSignature", signature)
+    code = signature[pos]
+    if code == "a":
+        return _type_end(signature, pos + 1)
+    if code in "({":
+        close = ")" if code == "(" else "}"
+        pos += 1
+        while pos < len(signature) and signature[pos] != close:
+            pos = _type_end(signature, pos)
+        if pos >= len(signature):
+            raise DBusError("org.freedesktop.DBus.Error.InvalidSignature", signature)
+        return pos + 1
+    if code in _ALIGNMENT:
+        return pos + 1
+    raise DBusError("org.freedesktop.DBus.Error.InvalidSignature", signature)
+
+
+# --- Marshalling ---
+
+
+class _Writer:
+    def __init__(self):
+        self.buf = bytearray()
+
+    def align(self, n: int):
+        self.buf.extend(b"\0" * (-len(self.buf) % n))
+
+    def write_all(self, signature: str, values):
+        types = split_signature(signature)
+        if len(types) != len(values):
+            raise DBusError(
+                "org.freedesktop.DBus.Error.InvalidArgs",
+                f"signature {signature!r} needs {len(types)} values, got {len(values)}",
+            )
+        for code, value in zip(types, values):
+            self._write(code, value)
+
+    def _write(self, code: str, value):
+        head = code[0]
+        if head in _FIXED:
+            fmt, size = _FIXED[head]
+            self.align(size)
+            self.buf.extend(struct.pack("<" + fmt, value))
+        elif head == "b":
+            self.align(4)
+            self.buf.extend(struct.pack("<I", 1 if value else 0))
+        elif head in "so":
+            data = value.encode("utf-8")
+            self.align(4)
+            self.buf.extend(struct.pack("<I", len(data)) + data + b"\0")
+        elif head == "g":
+            data = value.encode("ascii")
+            self.buf.extend(bytes([len(data)]) + data + b"\0")
+        elif head == "v":
+            self._write("g", value.signature)
+            self._write(value.signature, value.value)
+        elif head == "(":
+            self.align(8)
+            for sub, item in zip(split_signature(code[1:-1]), value, strict=True):
+                self._write(sub, item)
+        elif head == "a":
+            self._write_array(code[1:], value)
+        else:
+            raise DBusError("org.freedesktop.DBus.Error.InvalidSignature", code)
+
+    def _write_array(self, element: str, value):
+        self.align(4)
+        length_at = len(self.buf)
+        self.buf.extend(b"\0\0\0\0")
+        self.align(_ALIGNMENT[element[0]])
+        start = len(self.buf)
+        if element == "y":
+            self.buf.extend(value)
+        elif element[0] == "{":
+            key, val = split_signature(element[1:-1])
+            for k, v in value.items():
+                self.align(8)
+                self._write(key, k)
+                self._write(val, v)
+        else:
+            for item in value:
+                self._write(element, item)
+        struct.pack_into("<I", self.buf, length_at, len(self.buf) - start)
+
+
+class _Reader:
+    def __init__(self, data: bytes, endian: str = "<", pos: int = 0):
+        self.data = memoryview(data)
+        self.endian = endian
+        self.pos = pos
+
+    def align(self, n: int):
+        self.pos += -self.pos % n
+
+    def _unpack(self, fmt: str, size: int):
+        if self.pos + size > len(self.data):
+            raise DBusError("org.freedesktop.DBus.Error.InvalidArgs", "truncated message")
+        value = struct.unpack_from(self.endian + fmt, self.data, self.pos)[0]
+        self.pos += size
+        return value
+
+    def _bytes(self, size: int) -> bytes:
+        if self.pos + size > len(self.data):
+            raise DBusError("org.freedesktop.DBus.Error.InvalidArgs", "truncated message")
+        data = bytes(self.data[self.pos : self.pos + size])
+        self.pos += size
+        return data
+
+    def read_all(self, signature: str) -> tuple:
+        return tuple(self.read(code) for code in split_signature(signature))
+
+    def read(self, code: str):
+        head = code[0]
+        if head in _FIXED:
+            fmt, size = _FIXED[head]
+            self.align(size)
+            return self._unpack(fmt, size)
+        if head == "b":
+            self.align(4)
+            return self._unpack("I", 4) != 0
+        if head in "so":
+            self.align(4)
+            length = self._unpack("I", 4)
+            text = self._bytes(length + 1)[:-1]
+            return text.decode("utf-8", errors="replace")
+        if head == "g":
+            length = self._unpack("B", 1)
+            return self._bytes(length + 1)[:-1].decode("ascii")
+        if head == "v":
+            return self.read(self.read("g"))
+        if head == "(":
+            self.align(8)
+            return tuple(self.read(sub) for sub in split_signature(code[1:-1]))
+        if head == "a":
+            return self._read_array(code[1:])
+        raise DBusError("org.freedesktop.DBus.Error.InvalidSignature", code)
+
+    def _read_array(self, element: str):
+        self.align(4)
+        length = self._unpack("I", 4)
+        self.align(_ALIGNMENT[element[0]])
+        end = self.pos + length
+        if end > len(self.data):
+            raise DBusError("org.freedesktop.DBus.Error.InvalidArgs", "array overruns message")
+        if element == "y":
+            return self._bytes(length)
+        if element[0] == "{":
+            key, val = split_signature(element[1:-1])
+            result = {}
+            while self.pos < end:
+                self.align(8)
+                k = self.read(key)
+                result[k] = self.read(val)
+            return result
+        items = []
+        while self.pos < end:
+            items.append(self.read(element))
+        return items
+
+
+def marshal(signature: str, values) -> bytes:
+    """Marshal values (one per complete type in signature), little-endian."""
+    writer = _Writer()
+    writer.write_all(signature, values)
+    return bytes(writer.buf)
+
+
+def unmarshal(signature: str, data: bytes, endian: str = "<") -> tuple:
+    """Unmarshal a body with the given signature into a tuple of plain values."""
+    return _Reader(data, endian).read_all(signature)
+
+
+# --- Messages ---
+
+
+def encode_message(message: Message) -> bytes:
+    """Serialize a Message (little-endian)."""
+    body = marshal(message.signature, message.body) if message.signature else b""
+    fields = []
+    for code, name, sig in _FIELDS:
+        value = getattr(message, name)
+        if value is not None and (name != "signature" or value):
+            fields.append((code, Variant(sig, value)))
+    writer = _Writer()
+    writer.buf.extend(
+        struct.pack("<BBBBII", ord("l"), message.type, message.flags, 1, len(body), message.serial)
+    )
+    writer.write_all("a(yv)", [fields])
+    writer.align(8)
+    return bytes(writer.buf) + body
+
+
+def message_length(header: bytes) -> int:
+    """Total byte length of a message, given at least its first 16 bytes."""
+    endian = "<" if header[0:1] == b"l" else ">"
+    body_length, _, fields_length = struct.unpack_from(endian + "III", header, 4)
+    return 16 + fields_length + (-fields_length % 8) + body_length
+
+
+def decode_message(data: bytes) -> Message:
+    """Parse one complete message."""
+    if len(data) < 16 or data[0:1] not in (b"l", b"B"):
+        raise DBusError("org.freedesktop.DBus.Error.InvalidArgs", "bad message header")
+    endian = "<" if data[0:1] == b"l" else ">"
+    _, msg_type, flags, _, body_length, serial = struct.unpack_from(endian + "BBBBII", data)
+    reader = _Reader(data, endian, 12)
+    raw_fields = reader.read("a(yv)")
+    reader.align(8)
+    names = {code: name for code, name, _ in _FIELDS}
+    fields = {names[code]: value for code, value in raw_fields if code in names}
+    signature = fields.pop("signature", "")
+    body = ()
+    if signature:
+        body_reader = _Reader(data[reader.pos : reader.pos + body_length], endian)
+        body = body_reader.read_all(signature)
+    return Message(msg_type, serial, signature=signature, body=body, flags=flags, **fields)
+
+
+# --- Connection ---
+
+
+def _parse_address(address: str) -> list[str | bytes]:
+    """Socket paths from a D-Bus address list (unix:path= and unix:abstract= only)."""
+    paths = []
+    for entry in address.split(";"):
+        transport, _, params = entry.partition(":")
+        if transport != "unix":
+            continue
+        options = dict(p.split("=", 1) for p in params.split(",") if "=" in p)
+        if "path" in options:
+            paths.append(options["path"])
+        elif "abstract" in options:
+            paths.append(b"\0" + options["abstract"].encode())
+    return paths
+
+
+class Connection:
+    """One authenticated connection to a message bus.
+
+    A reader thread matches replies to calls and hands signals to the
+    callbacks registered with add_match(). Callbacks run on that thread and
+    must not make blocking calls on the same connection.
+
+        bus = Connection(address)
+        bus.connect()
+        level = bus.get_property("org.bluez", path, "org.bluez.Battery1", "Percentage")
+    """
+
+    def __init__(self, address: str, timeout: float = 5.0):
+        self.address = address
+        self.timeout = timeout
+        self.unique_name = None
+        # Incoming method calls (peers calling us); unanswered calls get an error.
+        self.on_method_call: Callable[[Message], None] | None = None
+        self._sock = None
+        self._serial = 0
+        self._pending: dict[int, Future] = {}
+        self._matches: list[tuple[str, dict[str, str], Callable[[Message], None]]] = []
+        self._lock = threading.Lock()
+        self._send_lock = threading.Lock()
+        self._reader = None
+
+    def __enter__(self):
+        self.connect()
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    @property
+    def connected(self) -> bool:
+        return self._sock is not None
+
+    def connect(self):
+        """Open the socket, authenticate, and register with the bus.
+
+        Raises OSError if the bus cannot be reached, DBusError if it refuses us.
+        """
+        if self._sock is not None:
+            return
+        sock = self._open_socket()
+        try:
+            sock.settimeout(self.timeout)
+            self._authenticate(sock)
+            sock.settimeout(None)
+        except (OSError, DBusError):
+            sock.close()
+            raise
+        self._sock = sock
+        self._reader = threading.Thread(target=self._read_loop, args=(sock,), daemon=True)
+        self._reader.start()
+        self.unique_name = self.call(BUS_NAME, BUS_PATH, BUS_NAME, "Hello")[0]
+
+    def _open_socket(self) -> socket.socket:
+        error: OSError = FileNotFoundError(f"no usable D-Bus address in {self.address!r}")
+        for path in _parse_address(self.address):
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.settimeout(self.timeout)
+            try:
+                sock.connect(path)
+                return sock
+            except OSError as e:
+                sock.close()
+                error = e
+        raise error
+
+    @staticmethod
+    def _authenticate(sock: socket.socket):
+        uid = str(os.getuid()).encode().hex()
+        sock.sendall(b"\0AUTH EXTERNAL " + uid.encode() + b"\r\n")
+        reply = b""
+        while not reply.endswith(b"\r\n"):
+            chunk = sock.recv(256)
+            if not chunk:
+                raise ConnectionError("bus closed the connection during authentication")
+            reply += chunk
+        if not reply.startswith(b"OK "):
+            raise DBusError("org.freedesktop.DBus.Error.AuthFailed", reply.decode().strip())
+        sock.sendall(b"BEGIN\r\n")
+
+    def close(self):
+        sock, self._sock = self._sock, None
+        if sock is not None:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            sock.close()
+        reader, self._reader = self._reader, None
+        if reader is not None and reader is not threading.current_thread():
+            reader.join(timeout=2)
+
+    def _read_loop(self, sock: socket.socket):
+        buf = bytearray()
+        try:
+            while True:
+                while len(buf) < 16 or len(buf) < message_length(buf):
+                    if len(buf) >= 16 and message_length(buf) > _MAX_MESSAGE:
+                        raise DBusError("org.freedesktop.DBus.Error.LimitsExceeded", "too long")
+                    chunk = sock.recv(65536)
+                    if not chunk:
+                        return
+                    buf.extend(chunk)
+                length = message_length(buf)
+                message = decode_message(bytes(buf[:length]))
+                del buf[:length]
+                self._dispatch(message)
+        except (OSError, DBusError):
+            return
+        finally:
+            if self._sock is sock:
+                self._sock = None
+            sock.close()
+            with self._lock:
+                pending, self._pending = self._pending, {}
+            for future in pending.values():
+                if not future.done():
+                    future.set_exception(ConnectionError("D-Bus connection closed"))
+
+    def _dispatch(self, message: Message):
+        if message.type in (METHOD_RETURN, ERROR):
+            with self._lock:
+                future = self._pending.pop(message.reply_serial, None)
+            if future is not None:
+                future.set_result(message)
+        elif message.type == SIGNAL:
+            with self._lock:
+                matches = list(self._matches)
+            for _, rule, callback in matches:
+                if _matches_rule(rule, message):
+                    try:
+                        callback(message)
+                    except Exception:
+                        pass  # a broken subscriber must not take the connection down
+        elif message.type == METHOD_CALL:
+            if self.on_method_call is not None:
+                self.on_method_call(message)
+            elif not message.flags & NO_REPLY_EXPECTED:
+                self.send_error(message, "org.freedesktop.DBus.Error.UnknownMethod")
+
+    def _next_serial(self) -> int:
+        with self._lock:
+            self._serial += 1
+            return self._serial
+
+    def send(self, message: Message) -> int:
+        """Send a message as is (its serial is replaced); returns the serial used."""
+        sock = self._sock
+        if sock is None:
+            raise ConnectionError("D-Bus connection is not open")
+        serial = self._next_serial()
+        data = encode_message(message._replace(serial=serial))
+        with self._send_lock:
+            sock.sendall(data)
+        return serial
+
+    def call(
+        self,
+        destination: str,
+        path: str,
+        interface: str,
+        member: str,
+        signature: str = "",
+        body: tuple = (),
+        timeout: float | None = None,
+    ) -> tuple:
+        """Call a method and return the reply body as a tuple of plain values.
+
+        Raises DBusError for error replies, OSError if the connection fails.
+        """
+        message = Message(
+            METHOD_CALL,
+            0,
+            path=path,
+            interface=interface,
+            member=member,
+            destination=destination,
+            signature=signature,
+            body=tuple(body),
+        )
+        future = Future()
+        sock = self._sock
+        if sock is None:
+            raise ConnectionError("D-Bus connection is not open")
+        serial = self._next_serial()
+        with self._lock:
+            self._pending[serial] = future
+        try:
+            with self._send_lock:
+                sock.sendall(encode_message(message._replace(serial=serial)))
+            reply = future.result(timeout=self.timeout if timeout is None else timeout)
+        except TimeoutError:
+            raise TimeoutError(f"no reply to {interface}.{member}") from None
+        finally:
+            with self._lock:
+                self._pending.pop(serial, None)
+        if reply.type == ERROR:
+            detail = reply.body[0] if reply.body and isinstance(reply.body[0], str) else ""
+            raise DBusError(reply.error_name or "org.freedesktop.DBus.Error.Failed", detail)
+        return reply.body
+
+    def get_property(self, destination: str, path: str, interface: str, name: str):
+        """Read one property through org.freedesktop.DBus.Properties.Get."""
+        return self.call(destination, path, PROPERTIES, "Get", "ss", (interface, name))[0]
+
+    def get_managed_objects(self, destination: str, path: str = "/") -> dict:
+        """Return ObjectManager.GetManagedObjects as path -> interface -> properties."""
+        return self.call(destination, path, OBJECT_MANAGER, "GetManagedObjects")[0]
+
+    def add_match(self, rule: str, callback: Callable[[Message], None]):
+        """Subscribe to signals matching a match rule, e.g. "type='signal',sender='org.bluez'"."""
+        self.call(BUS_NAME, BUS_PATH, BUS_NAME, "AddMatch", "s", (rule,))
+        with self._lock:
+            self._matches.append((rule, _parse_rule(rule), callback))
+
+    def remove_match(self, rule: str, callback: Callable[[Message], None]):
+        """Drop a subscription made with add_match()."""
+        with self._lock:
+            self._matches = [m for m in self._matches if m[0] != rule or m[2] != callback]
+        if self.connected:
+            try:
+                self.call(BUS_NAME, BUS_PATH, BUS_NAME, "RemoveMatch", "s", (rule,))
+            except (OSError, DBusError):
+                pass
+
+    def emit_signal(self, path: str, interface: str, member: str, signature="", body=()):
+        """Broadcast a signal from this connection."""
+        self.send(
+            Message(
+                SIGNAL,
+                0,
+                path=path,
+                interface=interface,
+                member=member,
+                signature=signature,
+                body=tuple(body),
+            )
+        )
+
+    def send_reply(self, call: Message, signature: str = "", body: tuple = ()):
+        """Answer an incoming method call."""
+        self.send(
+            Message(
+                METHOD_RETURN,
+                0,
+                reply_serial=call.serial,
+                destination=call.sender,
+                signature=signature,
+                body=tuple(body),
+            )
+        )
+
+    def send_error(self, call: Message, name: str, text: str = ""):
+        """Answer an incoming method call with an error."""
+        self.send(
+            Message(
+                ERROR,
+                0,
+                error_name=name,
+                reply_serial=call.serial,
+                destination=call.sender,
+                signature="s",
+                body=(text,),
+            )
+        )
+
+
+def _parse_rule(rule: str) -> dict[str, str]:
+    """Parse a match rule into key -> value (quotes stripped)."""
+    result = {}
+    for part in rule.split(","):
+        key, _, value = part.partition("=")
+        result[key.strip()] = value.strip().strip("'")
+    return result
+
+
+def _matches_rule(rule: dict[str, str], message: Message) -> bool:
+    """Local filter for the keys the bus cannot disambiguate between our callbacks.
+
+    sender is left to the bus: it compares well-known names, we only see unique ones.
+    """
+    if rule.get("type", "signal") != "signal":
+        return False
+    for key in ("path", "interface", "member"):
+        if key in rule and getattr(message, key) != rule[key]:
+            return False
+    namespace = rule.get("path_namespace")
+    if namespace is not None and namespace != "/":
+        path = message.path or ""
+        if path != namespace and not path.startswith(namespace + "/"):
+            return False
+    return True
+
+
+_system_bus: Connection | None = None
+_system_bus_lock = threading.Lock()
+
+
+def system_bus() -> Connection:
+    """Return the process-wide system bus connection, connecting on first use.
+
+    Honours DBUS_SYSTEM_BUS_ADDRESS. Raises OSError or DBusError if the bus
+    cannot be reached.
+    """
+    global _system_bus
+    with _system_bus_lock:
+        if _system_bus is None or not _system_bus.connected:
+            address = os.environ.get("DBUS_SYSTEM_BUS_ADDRESS", DEFAULT_SYSTEM_BUS_ADDRESS)
+            bus = Connection(address)
+            bus.connect()
+            _system_bus = bus
+        return _system_bus
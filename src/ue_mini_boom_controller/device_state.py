@@ -0,0 +1,169 @@
+"""Live BlueZ device state, kept current by D-Bus signals.
+
+DeviceStateCache seeds itself from one GetManagedObjects snapshot and then
+applies the PropertiesChanged, InterfacesAdded and InterfacesRemoved signals
+that org.bluez emits, so connected/battery/name/alias reads are dictionary
+lookups instead of a D-Bus round trip per query. It is meant for
+long-running processes; one-shot CLI runs keep using the ble getters.
+"""
+
+import threading
+
+from . import ble, dbus
+
+_PROPERTIES = dbus.PROPERTIES
+_OBJECT_MANAGER = dbus.OBJECT_MANAGER
+
+# Only the objects and interfaces that feed a device status dict.
+_TRACKED_INTERFACES = ("org.bluez.Device1", "org.bluez.Battery1")
+
+_MATCH_RULES = (
+    f"type='signal',sender='org.bluez',interface='{_PROPERTIES}',member='PropertiesChanged'",
+    f"type='signal',sender='org.bluez',interface='{_OBJECT_MANAGER}'",
+)
+
+
+class DeviceStateCache:
+    """In-memory table of BlueZ device status, updated incrementally from signals.
+
+    cache = DeviceStateCache()
+    if cache.start():
+        cache.get_battery(mac)  # no D-Bus round trip
+    """
+
+    def __init__(self):
+        self.updates = 0
+        self._objects: dict[str, dict[str, dict]] = {}
+        self._devices: dict[str, dict] = {}
+        self._lock = threading.Lock()
+        self._bus = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    @property
+    def live(self) -> bool:
+        """True while the signal feed is running and the table can be trusted."""
+        return self._bus is not None and self._bus.connected
+
+    def load(self, objects: dict[str, dict[str, dict]]):
+        """Replace the table with a GetManagedObjects result (see ble.get_managed_objects)."""
+        with self._lock:
+            self._objects = {
+                path: {i: dict(p) for i, p in interfaces.items() if i in _TRACKED_INTERFACES}
+                for path, interfaces in objects.items()
+                if "org.bluez.Device1" in interfaces
+            }
+            self._devices = ble._parse_managed_objects(self._objects)
+
+    def apply_signal(self, path: str, interface: str, member: str, args: list) -> bool:
+        """Apply one org.bluez signal with plain (unwrapped) arguments.
+
+        Returns True if a tracked device changed.
+        """
+        with self._lock:
+            if interface == _PROPERTIES and member == "PropertiesChanged":
+                iface, changed, invalidated = args
+                props = self._objects.get(path, {}).get(iface)
+                if props is None:
+                    return False
+                props.update(changed)
+                for name in invalidated:
+                    props.pop(name, None)
+            elif interface == _OBJECT_MANAGER and member == "InterfacesAdded":
+                path, added = args
+                tracked = {i: dict(p) for i, p in added.items() if i in _TRACKED_INTERFACES}
+                if not tracked or (
+                    "org.bluez.Device1" not in tracked and path not in self._objects
+                ):
+                    return False
+                self._objects.setdefault(path, {}).update(tracked)
+            elif interface == _OBJECT_MANAGER and member == "InterfacesRemoved":
+                path, removed = args
+                interfaces = self._objects.get(path)
+                if interfaces is None:
+                    return False
+                for iface in removed:
+                    interfaces.pop(iface, None)
+                if "org.bluez.Device1" not in interfaces:
+                    del self._objects[path]
+            else:
+                return False
+            self._refresh(path)
+            self.updates += 1
+            return True
+
+    def _refresh(self, path: str):
+        """Rebuild the status dict of the device at path, from every adapter that knows it."""
+        macs = {mac for mac, info in self._devices.items() if info["path"] == path}
+        address = self._objects.get(path, {}).get("org.bluez.Device1", {}).get("Address")
+        if address is not None:
+            macs.add(str(address).upper())
+        for mac in macs:
+            self._devices.pop(mac, None)
+        copies = {
+            other: interfaces
+            for other, interfaces in self._objects.items()
+            if str(interfaces.get("org.bluez.Device1", {}).get("Address", "")).upper() in macs
+        }
+        self._devices.update(ble._parse_managed_objects(copies))
+
+    def start(self, bus: dbus.Connection | None = None) -> bool:
+        """Subscribe to org.bluez signals and seed the table.
+
+        Uses the process's system bus connection unless bus is given. Returns
+        False (and leaves the cache not live) if the bus cannot be reached.
+        """
+        if self.live:
+            return True
+        added = []
+        try:
+            bus = bus or dbus.system_bus()
+            # Subscribe before taking the snapshot so no change falls in between.
+            for rule in _MATCH_RULES:
+                bus.add_match(rule, self._on_signal)
+                added.append(rule)
+            self._bus = bus
+            self.load(bus.get_managed_objects("org.bluez"))
+        except (OSError, dbus.DBusError):
+            self._bus = None
+            for rule in added:
+                bus.remove_match(rule, self._on_signal)
+            return False
+        return True
+
+    def _on_signal(self, message: dbus.Message):
+        try:
+            self.apply_signal(message.path, message.interface, message.member, list(message.body))
+        except (ValueError, KeyError, TypeError, AttributeError):
+            pass  # malformed signal — ignore it
+
+    def stop(self):
+        """Stop following signals; the table keeps its last contents."""
+        bus, self._bus = self._bus, None
+        if bus is not None:
+            for rule in _MATCH_RULES:
+                bus.remove_match(rule, self._on_signal)
+
+    def devices(self) -> dict[str, dict]:
+        """Return a copy of the whole table, {MAC: status dict}."""
+        with self._lock:
+            return {mac: dict(info) for mac, info in self._devices.items()}
+
+    def get_device_status(self, speaker_mac: str) -> dict:
+        """Cached counterpart of ble.get_device_status."""
+        with self._lock:
+            return dict(self._devices.get(speaker_mac.upper(), {}))
+
+    def get_battery(self, speaker_mac: str) -> int:
+        """Cached counterpart of ble.get_battery."""
+        with self._lock:
+            return self._devices.get(speaker_mac.upper(), {}).get("battery", -1)
+
+    def get_paired_ue_devices(self) -> list[tuple[str, str]]:
+        """Cached counterpart of ble.get_paired_ue_devices."""
+        return ble._ue_devices_from_snapshot(self.devices())
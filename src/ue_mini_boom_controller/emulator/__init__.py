@@ -0,0 +1,30 @@
+"""LWACP speaker emulator for load tests and benchmarks without hardware.
+
+EmulatedSpeaker keeps a speaker's state and answers LWACP packets.
+EmulatorServer serves many of them over TCP or a Unix socket, with per-speaker
+latency and jitter. emulated_transport() points the real spp/aio code at
+a server, so sessions, pipelining, locks and pacing run over real sockets.
+A FaultInjector makes the links fragment, stall, drop and reset.
+
+    with EmulatorServer(auto_create=True, latency=0.02) as server:
+        with emulated_transport(server.address):
+            with SppSession("88:C6:26:00:00:01") as session:
+                session.query([UECommand.EQ_PRESET])
+
+`ueboom-emulator` runs a server from the command line.
+"""
+
+from .faults import FaultEvent, FaultInjector
+from .server import EmulatorServer, emulated_macs
+from .speaker import EmulatedSpeaker
+from .transport import EmulatedRfcommSocket, emulated_transport
+
+__all__ = [
+    "EmulatedRfcommSocket",
+    "EmulatedSpeaker",
+    "EmulatorServer",
+    "FaultEvent",
+    "FaultInjector",
+    "emulated_macs",
+    "emulated_transport",
+]
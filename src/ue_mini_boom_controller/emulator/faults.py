@@ -0,0 +1,126 @@
+"""Seeded fault injection for emulated links.
+
+Real RFCOMM links split packets across reads, stall, lose responses and drop
+mid-query. A FaultInjector plugged into an EmulatorServer does the same to
+every response the emulated speakers send. It picks faults from per-link
+random generators seeded from (seed, speaker, link number), so a run
+with the same seed and the same requests gets the same faults. Every
+injected fault is logged in `events` for comparing runs.
+
+    faults = FaultInjector(seed=42, fragment=0.5, drop=0.05, reset=0.01)
+    with EmulatorServer(auto_create=True, faults=faults) as server:
+        ...
+"""
+
+import random
+import threading
+from collections import Counter
+from typing import NamedTuple
+
+FRAGMENT = "fragment"
+STALL = "stall"
+DROP = "drop"
+RESET = "reset"
+
+
+class FaultEvent(NamedTuple):
+    """One injected fault."""
+
+    mac_address: str
+    link: int  # how many links to this speaker came before
+    response: int  # index of the response on the link
+    kind: str
+    detail: tuple = ()  # fragment sizes, or the stall in seconds
+
+
+class Delivery(NamedTuple):
+    """How to deliver one response; chunks is None to reset the link instead."""
+
+    extra_delay: float
+    chunks: list[bytes] | None
+
+
+class LinkFaults:
+    """Fault schedule for one link; see FaultInjector.for_link()."""
+
+    def __init__(self, injector: "FaultInjector", mac_address: str, link: int):
+        self._injector = injector
+        self._mac_address = mac_address
+        self._link = link
+        self._responses = 0
+        self._random = random.Random(f"{injector.seed}:{mac_address}:{link}")
+
+    def _log(self, kind: str, detail: tuple = ()):
+        self._injector._record(
+            FaultEvent(self._mac_address, self._link, self._responses, kind, detail)
+        )
+
+    def deliver(self, data: bytes) -> Delivery | None:
+        """Decide the fate of one response; None drops it."""
+        plan, rng = self._injector, self._random
+        try:
+            if rng.random() < plan.reset:
+                self._log(RESET)
+                return Delivery(0.0, None)
+            if rng.random() < plan.drop:
+                self._log(DROP)
+                return None
+            extra = 0.0
+            if rng.random() < plan.stall:
+                extra = rng.uniform(0.0, plan.max_stall)
+                self._log(STALL, (round(extra, 6),))
+            chunks = [data]
+            if len(data) > 1 and rng.random() < plan.fragment:
+                cuts = sorted(rng.sample(range(1, len(data)), rng.randint(1, len(data) - 1)))
+                chunks = [data[i:j] for i, j in zip([0, *cuts], [*cuts, len(data)])]
+                self._log(FRAGMENT, tuple(len(chunk) for chunk in chunks))
+            return Delivery(extra, chunks)
+        finally:
+            self._responses += 1
+
+
+class FaultInjector:
+    """Probabilities (0-1, per response) of each fault, and the seed they are drawn with.
+
+    fragment splits a response at random byte boundaries, written
+    fragment_gap apart. stall holds it back for up to max_stall seconds.
+    drop never sends it. reset aborts the link where it would have gone
+    out.
+    """
+
+    def __init__(
+        self,
+        seed: int = 0,
+        fragment: float = 0.0,
+        stall: float = 0.0,
+        drop: float = 0.0,
+        reset: float = 0.0,
+        max_stall: float = 0.5,
+        fragment_gap: float = 0.002,
+    ):
+        self.seed = seed
+        self.fragment = fragment
+        self.stall = stall
+        self.drop = drop
+        self.reset = reset
+        self.max_stall = max_stall
+        self.fragment_gap = fragment_gap
+        self.events: list[FaultEvent] = []
+        self._links: Counter = Counter()
+        self._lock = threading.Lock()
+
+    def for_link(self, mac_address: str) -> LinkFaults:
+        """Schedule for a new link to mac_address."""
+        with self._lock:
+            link = self._links[mac_address]
+            self._links[mac_address] += 1
+        return LinkFaults(self, mac_address, link)
+
+    def _record(self, event: FaultEvent):
+        with self._lock:
+            self.events.append(event)
+
+    def counts(self) -> Counter:
+        """How many faults of each kind were injected."""
+        with self._lock:
+            return Counter(event.kind for event in self.events)
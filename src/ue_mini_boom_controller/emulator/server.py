@@ -0,0 +1,313 @@
+"""Serve emulated speakers over a TCP or Unix stream socket.
+
+Each connection stands in for one RFCOMM link. The client opens it with a
+hello (see transport) naming the speaker and RFCOMM channel, and the server
+answers with one status byte. After that the stream carries raw LWACP
+packets both ways, exactly as an RFCOMM socket would. Like a real speaker,
+each emulated speaker takes one link at a time.
+"""
+
+import argparse
+import asyncio
+import contextlib
+import signal
+import socket
+import struct
+import threading
+from pathlib import Path
+
+from ..protocol import FrameDecoder
+from .faults import FaultInjector
+from .speaker import EmulatedSpeaker
+
+HELLO = b"LWE1"  # followed by 6 MAC bytes and the RFCOMM channel
+HELLO_SIZE = len(HELLO) + 7
+
+# Status byte sent in reply to the hello.
+STATUS_OK = 0
+STATUS_UNKNOWN_SPEAKER = 1
+STATUS_WRONG_CHANNEL = 2
+STATUS_BUSY = 3
+
+# The channel UE speakers put LWACP on.
+DEFAULT_CHANNEL = 5
+
+# First three bytes of generated MACs (a UE OUI, so is_ue_device() accepts them).
+_MAC_PREFIX = "88:C6:26"
+
+
+def emulated_macs(count: int) -> list[str]:
+    """count distinct speaker MACs for an emulated fleet."""
+    return [f"{_MAC_PREFIX}:{i >> 16:02X}:{i >> 8 & 0xFF:02X}:{i & 0xFF:02X}" for i in range(count)]
+
+
+def _mac_from_bytes(data: bytes) -> str:
+    return ":".join(f"{b:02X}" for b in data)
+
+
+class EmulatorServer:
+    """Emulated speakers behind one listening socket.
+
+    address is a Unix socket path, or a (host, port) pair for TCP; None
+    listens on an ephemeral TCP port on 127.0.0.1. Speakers are added with
+    add_speaker(), or created on first connect when auto_create is set;
+    latency, jitter and seed are their defaults. faults, if given, mangles
+    every response (see faults).
+
+    The server can share an event loop with clients that use asyncio, but the
+    transport shim's connect is blocking, so run it in its own thread for
+    those (start_background(), or use the server as a context manager).
+    """
+
+    def __init__(
+        self,
+        address: str | Path | tuple[str, int] | None = None,
+        channel: int = DEFAULT_CHANNEL,
+        auto_create: bool = False,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        seed: int = 0,
+        faults: FaultInjector | None = None,
+    ):
+        self.address = ("127.0.0.1", 0) if address is None else address
+        self.channel = channel
+        self.auto_create = auto_create
+        self.latency = latency
+        self.jitter = jitter
+        self.seed = seed
+        self.faults = faults
+        self.connections = 0
+        self._speakers: dict[str, EmulatedSpeaker] = {}
+        self._linked: set[str] = set()
+        self._links: set[asyncio.Task] = set()
+        self._server = None
+        self._loop = None
+        self._thread = None
+
+    def __enter__(self):
+        self.start_background()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop_background()
+
+    @property
+    def speakers(self) -> dict[str, EmulatedSpeaker]:
+        return dict(self._speakers)
+
+    def add_speaker(self, mac_address: str, **kwargs) -> EmulatedSpeaker:
+        """Add (or replace) a speaker; kwargs go to EmulatedSpeaker."""
+        kwargs.setdefault("latency", self.latency)
+        kwargs.setdefault("jitter", self.jitter)
+        kwargs.setdefault("seed", f"{self.seed}:{mac_address.upper()}")
+        speaker = EmulatedSpeaker(mac_address, **kwargs)
+        self._speakers[speaker.mac_address] = speaker
+        return speaker
+
+    def speaker(self, mac_address: str) -> EmulatedSpeaker | None:
+        return self._speakers.get(mac_address.upper())
+
+    async def start(self):
+        if isinstance(self.address, tuple):
+            host, port = self.address
+            self._server = await asyncio.start_server(self._handle, host, port)
+            self.address = self._server.sockets[0].getsockname()[:2]
+        else:
+            path = Path(self.address)
+            with contextlib.suppress(FileNotFoundError):
+                path.unlink()
+            self._server = await asyncio.start_unix_server(self._handle, path)
+
+    async def serve_forever(self):
+        if self._server is None:
+            await self.start()
+        await self._server.serve_forever()
+
+    async def close(self):
+        """Stop listening and drop every open link."""
+        if self._server is None:
+            return
+        self._server.close()
+        links = list(self._links)
+        for task in links:
+            task.cancel()
+        await asyncio.gather(*links, return_exceptions=True)
+        await self._server.wait_closed()
+        self._server = None
+
+    def start_background(self):
+        """Run the server on its own event loop in a daemon thread."""
+        started = threading.Event()
+        failure = []
+
+        def run():
+            self._loop = asyncio.new_event_loop()
+            try:
+                self._loop.run_until_complete(self.start())
+            except BaseException as e:
+                failure.append(e)
+                started.set()
+                self._loop.close()
+                return
+            started.set()
+            self._loop.run_forever()
+            self._loop.run_until_complete(self.close())
+            self._loop.close()
+
+        self._thread = threading.Thread(target=run, name="lwacp-emulator", daemon=True)
+        self._thread.start()
+        started.wait()
+        if failure:
+            raise failure[0]
+
+    def stop_background(self):
+        if self._thread is None:
+            return
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._thread = None
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        sock = writer.get_extra_info("socket")
+        if sock is not None and sock.family in (socket.AF_INET, socket.AF_INET6):
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        speaker = None
+        task = asyncio.current_task()
+        self._links.add(task)
+        try:
+            hello = await reader.readexactly(HELLO_SIZE)
+            if not hello.startswith(HELLO):
+                return
+            mac = _mac_from_bytes(hello[len(HELLO) : -1])
+            speaker = self._speakers.get(mac)
+            if speaker is None and self.auto_create:
+                speaker = self.add_speaker(mac)
+            if speaker is None:
+                status = STATUS_UNKNOWN_SPEAKER
+            elif hello[-1] != self.channel:
+                status = STATUS_WRONG_CHANNEL
+            elif mac in self._linked:
+                status = STATUS_BUSY
+            else:
+                status = STATUS_OK
+            writer.write(bytes([status]))
+            await writer.drain()
+            if status != STATUS_OK:
+                speaker = None
+                return
+            self._linked.add(mac)
+            self.connections += 1
+            await self._serve_link(speaker, reader, writer)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            self._links.discard(task)
+            if speaker is not None:
+                self._linked.discard(speaker.mac_address)
+            writer.close()
+            with contextlib.suppress(ConnectionError):
+                await writer.wait_closed()
+
+    async def _serve_link(self, speaker: EmulatedSpeaker, reader, writer):
+        """Answer packets until the client closes, delaying each response."""
+        loop = asyncio.get_running_loop()
+        outgoing: asyncio.Queue = asyncio.Queue()
+        faults = self.faults.for_link(speaker.mac_address) if self.faults else None
+
+        async def sender():
+            while True:
+                due, chunks = await outgoing.get()
+                delay = due - loop.time()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                if chunks is None:
+                    _reset(writer)
+                    return
+                for i, chunk in enumerate(chunks):
+                    if i:
+                        await asyncio.sleep(self.faults.fragment_gap)
+                    writer.write(chunk)
+                    await writer.drain()
+
+        send_task = asyncio.create_task(sender())
+        decoder = FrameDecoder()
+        last_due = 0.0
+        try:
+            while data := await reader.read(4096):
+                decoder.feed(data)
+                while (frame := decoder.next_frame()) is not None:
+                    response = speaker.handle(frame)
+                    if response is None:
+                        continue
+                    delay, chunks = speaker.delay(), [response.to_bytes()]
+                    if faults is not None:
+                        delivery = faults.deliver(chunks[0])
+                        if delivery is None:
+                            continue  # dropped
+                        delay += delivery.extra_delay
+                        chunks = delivery.chunks
+                    # RFCOMM is ordered: a response never overtakes an earlier one.
+                    last_due = max(last_due, loop.time() + delay)
+                    outgoing.put_nowait((last_due, chunks))
+        finally:
+            send_task.cancel()
+            with contextlib.suppress(asyncio.CancelledError, ConnectionError):
+                await send_task
+
+
+def _reset(writer: asyncio.StreamWriter):
+    """Abort the link; over TCP the client sees a reset rather than a clean close."""
+    sock = writer.get_extra_info("socket")
+    if sock is not None and sock.family in (socket.AF_INET, socket.AF_INET6):
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_LINGER, struct.pack("ii", 1, 0))
+    writer.transport.abort()
+
+
+def _parse_address(args) -> str | tuple[str, int]:
+    if args.unix:
+        return args.unix
+    host, _, port = args.tcp.rpartition(":")
+    return host or "127.0.0.1", int(port)
+
+
+def main(argv: list[str] | None = None):
+    parser = argparse.ArgumentParser(
+        prog="ueboom-emulator",
+        description="Serve emulated UE speakers for load tests and benchmarks",
+    )
+    where = parser.add_mutually_exclusive_group()
+    where.add_argument("--unix", help="Listen on this Unix socket path")
+    where.add_argument(
+        "--tcp", default="127.0.0.1:0", help="Listen on HOST:PORT (default %(default)s)"
+    )
+    parser.add_argument("--speakers", type=int, default=1, help="Speakers to emulate")
+    parser.add_argument("--latency", type=float, default=20.0, help="Response latency in ms")
+    parser.add_argument("--jitter", type=float, default=5.0, help="Latency jitter in ms")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for jitter and faults")
+    faults = parser.add_argument_group("fault injection (probability per response)")
+    for kind in ("fragment", "stall", "drop", "reset"):
+        faults.add_argument(f"--{kind}", type=float, default=0.0, metavar="P")
+    args = parser.parse_args(argv)
+
+    server = EmulatorServer(
+        _parse_address(args),
+        latency=args.latency / 1000,
+        jitter=args.jitter / 1000,
+        seed=args.seed,
+    )
+    if args.fragment or args.stall or args.drop or args.reset:
+        server.faults = FaultInjector(args.seed, args.fragment, args.stall, args.drop, args.reset)
+    for mac in emulated_macs(args.speakers):
+        server.add_speaker(mac)
+
+    async def run():
+        loop = asyncio.get_running_loop()
+        task = asyncio.current_task()
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(signum, task.cancel)
+        await server.start()
+        print(f"Emulating {args.speakers} speaker(s) on {server.address}", flush=True)
+        with contextlib.suppress(asyncio.CancelledError):
+            await server.serve_forever()
+
+    asyncio.run(run())
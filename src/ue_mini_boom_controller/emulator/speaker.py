@@ -0,0 +1,92 @@
+"""The LWACP side of one emulated speaker, independent of any transport."""
+
+import random
+
+from ..protocol import Frame, UECommand
+
+# Values a query (a packet with no parameters) reads back, and a packet with
+# one parameter sets.
+_SETTINGS = {
+    UECommand.EQ_PRESET: "eq_preset",
+    UECommand.DOUBLE_UP_MODE: "double_up_mode",
+    UECommand.DOUBLE_UP_ROLE: "double_up_role",
+    UECommand.DOUBLE_UP_LOCK: "double_up_lock",
+}
+
+MAX_VOLUME = 31
+MAX_NAME_BYTES = 32
+
+
+class EmulatedSpeaker:
+    """State and command handling of one UE Mini Boom.
+
+    handle() takes a request packet and returns the response packet, or None
+    for commands the speaker does not answer. Response delays are drawn from
+    latency +/- jitter (seconds) with a seeded generator, so runs repeat.
+    """
+
+    def __init__(
+        self,
+        mac_address: str,
+        name: str = "UE MINI BOOM",
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        seed: int | str | None = None,
+    ):
+        self.mac_address = mac_address.upper()
+        self.name = name
+        self.eq_preset = 0
+        self.volume = MAX_VOLUME // 2
+        self.double_up_mode = 0
+        self.double_up_role = 0
+        self.double_up_lock = 0
+        # Querying DOUBLE_UP_LOCK puts a real speaker into stereo discovery.
+        self.discovering = False
+        self.latency = latency
+        self.jitter = jitter
+        self.received = 0
+        self.answered = 0
+        self._random = random.Random(self.mac_address if seed is None else seed)
+
+    def delay(self) -> float:
+        """How long the next response takes."""
+        if not self.jitter:
+            return self.latency
+        return max(0.0, self.latency + self._random.uniform(-self.jitter, self.jitter))
+
+    def handle(self, frame: Frame) -> Frame | None:
+        self.received += 1
+        command_id, params = frame.command_id, frame.params
+        response = None
+        if command_id in _SETTINGS:
+            attr = _SETTINGS[command_id]
+            if params:
+                setattr(self, attr, params[0])
+            else:
+                if command_id == UECommand.DOUBLE_UP_LOCK:
+                    self.discovering = True
+                response = Frame(command_id, bytes([getattr(self, attr)]))
+        elif command_id == UECommand.SET_NAME:
+            self.name = params[:MAX_NAME_BYTES].decode("utf-8", "replace")
+        elif command_id == UECommand.VOLUME_ADJUST and params:
+            step = params[1] if len(params) > 1 else 1
+            change = step if params[0] else -step
+            self.volume = min(MAX_VOLUME, max(0, self.volume + change))
+        if response is not None:
+            self.answered += 1
+        return response
+
+    def snapshot(self) -> dict:
+        """Current state, for assertions and reports."""
+        return {
+            "mac": self.mac_address,
+            "name": self.name,
+            "eq_preset": self.eq_preset,
+            "volume": self.volume,
+            "double_up_mode": self.double_up_mode,
+            "double_up_role": self.double_up_role,
+            "double_up_lock": self.double_up_lock,
+            "discovering": self.discovering,
+            "received": self.received,
+            "answered": self.answered,
+        }
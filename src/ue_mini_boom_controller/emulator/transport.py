@@ -0,0 +1,123 @@
+"""Point the real spp/aio transport code at an EmulatorServer.
+
+emulated_transport() swaps the socket module seen by spp and aio for one
+whose AF_BLUETOOTH/RFCOMM sockets are EmulatedRfcommSockets. Those are
+ordinary stream sockets to the emulator that connect((mac, channel)) with
+the server's hello. Everything above the socket runs unchanged: SppSession,
+AsyncSppSession, the channel cache, locks, rate limiting and pacing. SDP
+lookups answer with the emulator's channel.
+
+    with EmulatorServer(auto_create=True) as server, emulated_transport(server.address):
+        query_spp_values("88:C6:26:00:00:01", [UECommand.EQ_PRESET])
+"""
+
+import contextlib
+import errno
+import socket
+import types
+from pathlib import Path
+
+from .. import aio, spp
+from .server import DEFAULT_CHANNEL, HELLO, STATUS_OK
+
+# Linux values; Python builds without Bluetooth support lack the constants.
+AF_BLUETOOTH = getattr(socket, "AF_BLUETOOTH", 31)
+BTPROTO_RFCOMM = getattr(socket, "BTPROTO_RFCOMM", 3)
+
+# How long the hello exchange may take (seconds).
+_HELLO_TIMEOUT = 5.0
+
+
+class EmulatedRfcommSocket(socket.socket):
+    """A stream socket to the emulator that behaves like an RFCOMM socket.
+
+    It reports family AF_BLUETOOTH so asyncio passes (mac, channel) straight
+    to connect() instead of resolving it. connect() is blocking even on a
+    non-blocking socket, because it runs the hello exchange.
+    """
+
+    def __init__(self, server_address: str | Path | tuple[str, int]):
+        self._server_address = server_address
+        family = socket.AF_INET if isinstance(server_address, tuple) else socket.AF_UNIX
+        super().__init__(family, socket.SOCK_STREAM)
+        if family == socket.AF_INET:
+            self.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    @property
+    def family(self):
+        return AF_BLUETOOTH
+
+    def bind(self, address):
+        pass  # the local adapter is meaningless here
+
+    def connect(self, address):
+        mac_address, channel = address
+        previous = self.gettimeout()
+        self.settimeout(_HELLO_TIMEOUT if previous in (None, 0.0) else previous)
+        try:
+            try:
+                super().connect(
+                    self._server_address
+                    if isinstance(self._server_address, tuple)
+                    else str(self._server_address)
+                )
+            except FileNotFoundError:
+                raise ConnectionRefusedError(errno.ECONNREFUSED, "emulator not running") from None
+            mac = bytes.fromhex(mac_address.replace(":", ""))
+            self.sendall(HELLO + mac + bytes([channel]))
+            status = self.recv(1)
+        finally:
+            self.settimeout(previous)
+        if status != bytes([STATUS_OK]):
+            raise ConnectionRefusedError(
+                errno.ECONNREFUSED, f"{mac_address} refused channel {channel}"
+            )
+
+    def connect_ex(self, address):
+        try:
+            self.connect(address)
+        except OSError as e:
+            return e.errno or errno.ECONNREFUSED
+        return 0
+
+
+def transport_module(server_address, socket_factory=EmulatedRfcommSocket) -> types.ModuleType:
+    """A stand-in for the socket module whose RFCOMM sockets reach the emulator.
+
+    socket_factory(server_address) builds each link socket; fault injection
+    wraps it here.
+    """
+    module = types.ModuleType("socket")
+    module.__dict__.update(socket.__dict__)
+    module.AF_BLUETOOTH = AF_BLUETOOTH
+    module.BTPROTO_RFCOMM = BTPROTO_RFCOMM
+
+    def make_socket(family=-1, type=-1, proto=-1, fileno=None):
+        if family == AF_BLUETOOTH and proto == BTPROTO_RFCOMM:
+            return socket_factory(server_address)
+        if family == AF_BLUETOOTH:
+            raise OSError(errno.EAFNOSUPPORT, "only RFCOMM is emulated")
+        return socket.socket(family, type, proto, fileno)
+
+    module.socket = make_socket
+    return module
+
+
+@contextlib.contextmanager
+def emulated_transport(
+    server_address, channel: int = DEFAULT_CHANNEL, socket_factory=EmulatedRfcommSocket
+):
+    """Route spp and aio RFCOMM traffic to the emulator at server_address."""
+    module = transport_module(server_address, socket_factory)
+
+    async def find_rfcomm_channel(mac_address: str, timeout: float = 10) -> int:
+        return channel
+
+    saved = (spp.socket, aio.socket, spp._find_rfcomm_channel, aio.find_rfcomm_channel)
+    spp.socket = aio.socket = module
+    spp._find_rfcomm_channel = lambda mac_address, on_start=None: channel
+    aio.find_rfcomm_channel = find_rfcomm_channel
+    try:
+        yield module
+    finally:
+        spp.socket, aio.socket, spp._find_rfcomm_channel, aio.find_rfcomm_channel = saved
@@ -0,0 +1,130 @@
+"""Send one SPP command to many speakers in parallel."""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import NamedTuple
+
+from .spp import SppSession
+
+# Default number of speakers contacted at once.
+DEFAULT_CONCURRENCY = 8
+
+# Send-time spread a synchronized group action should stay within (seconds).
+DEFAULT_TARGET_SKEW = 0.005
+
+
+class SpeakerResult(NamedTuple):
+    """Outcome of one speaker's send."""
+
+    mac_address: str
+    ok: bool
+    elapsed: float  # seconds, including connect
+    response: bytes | None = None
+    error: str | None = None
+
+
+def _send_one(mac_address: str, command: bytes) -> SpeakerResult:
+    started = time.monotonic()
+    try:
+        with SppSession(mac_address) as session:
+            frame = session.send(command)
+    except Exception as e:
+        return SpeakerResult(mac_address, False, time.monotonic() - started, error=str(e))
+    response = frame.to_bytes() if frame is not None else None
+    return SpeakerResult(mac_address, True, time.monotonic() - started, response)
+
+
+def fan_out(
+    mac_addresses: list[str],
+    command: bytes,
+    concurrency: int = DEFAULT_CONCURRENCY,
+) -> list[SpeakerResult]:
+    """Send command to every speaker, at most `concurrency` at a time.
+
+    Each speaker gets its own RFCOMM link. Returns one SpeakerResult per
+    address, in the order given; a failing speaker never stops the others.
+    """
+    macs = list(dict.fromkeys(mac_addresses))  # drop duplicates, keep order
+    if not macs:
+        return []
+    with ThreadPoolExecutor(max_workers=max(1, min(concurrency, len(macs)))) as pool:
+        return list(pool.map(_send_one, macs, [command] * len(macs)))
+
+
+class SyncReport(NamedTuple):
+    """Outcome of a synchronized send."""
+
+    results: list[SpeakerResult]
+    skew: float  # seconds between the first and last completed send
+
+
+def synchronized_send(
+    mac_addresses: list[str],
+    command: bytes,
+    concurrency: int = DEFAULT_CONCURRENCY,
+) -> SyncReport:
+    """Send command to every speaker at the same moment.
+
+    All RFCOMM links are opened first (up to `concurrency` at a time) and the
+    packet is already encoded, so the only work left at release time is the
+    send itself. One thread per connected speaker then waits on a barrier and
+    sends as soon as it opens.
+
+    Each SpeakerResult.elapsed is the delay from the release to that speaker's
+    send completing; SyncReport.skew is the spread of those completion times.
+    Speakers that could not be connected are reported as failed and excluded
+    from the skew.
+    """
+    macs = list(dict.fromkeys(mac_addresses))
+    sessions = {mac: SppSession(mac) for mac in macs}
+    errors: dict[str, str] = {}
+    sent_at: dict[str, float] = {}
+    responses: dict[str, bytes | None] = {}
+
+    def connect(mac: str):
+        try:
+            sessions[mac].connect()
+        except Exception as e:
+            errors[mac] = str(e)
+
+    try:
+        if macs:
+            with ThreadPoolExecutor(max_workers=max(1, min(concurrency, len(macs)))) as pool:
+                list(pool.map(connect, macs))
+
+        ready = [mac for mac in macs if mac not in errors]
+        barrier = threading.Barrier(len(ready) + 1)
+
+        def fire(mac: str):
+            session = sessions[mac]
+            try:
+                barrier.wait()
+                session.send_nowait(command)
+                sent_at[mac] = time.perf_counter()
+                frame = session.read_response()
+            except Exception as e:
+                errors[mac] = str(e)
+                return
+            responses[mac] = frame.to_bytes() if frame is not None else None
+
+        threads = [threading.Thread(target=fire, args=(mac,), daemon=True) for mac in ready]
+        for thread in threads:
+            thread.start()
+        barrier.wait()
+        released = time.perf_counter()
+        for thread in threads:
+            thread.join()
+    finally:
+        for session in sessions.values():
+            session.close()
+
+    results = []
+    for mac in macs:
+        if mac in sent_at and mac not in errors:
+            results.append(SpeakerResult(mac, True, sent_at[mac] - released, responses.get(mac)))
+        else:
+            results.append(SpeakerResult(mac, False, 0.0, error=errors.get(mac, "not sent")))
+    times = [sent_at[r.mac_address] for r in results if r.ok]
+    skew = max(times) - min(times) if times else 0.0
+    return SyncReport(results, skew)
@@ -1,11 +1,14 @@
 """Interactive menu mode for UE Mini Boom."""
 
 from .protocol import COMMANDS
-from .spp import send_spp_command, set_speaker_name
+from .spp import SppSession, send_spp_command, set_speaker_name
 
 
 def interactive_mode(mac_address: str):
-    """Run an interactive menu for controlling the speaker."""
+    """Run an interactive menu for controlling the speaker.
+
+    All menu commands share one RFCOMM link, opened on the first command.
+    """
     print(f"""
 ╔══════════════════════════════════════════════════╗
 ║         UE Mini Boom Controller v1.0             ║
@@ -24,23 +27,27 @@ def interactive_mode(mac_address: str):
         "3": "sound_power_on",
     }
 
-    while True:
-        try:
-            choice = input("\nCommand> ").strip()
-        except (EOFError, KeyboardInterrupt):
-            print("\nGoodbye!")
-            break
-
-        if choice == "0":
-            print("Goodbye!")
-            break
-        elif choice == "2":
-            name = input("Enter new speaker name: ").strip()
-            if name:
-                set_speaker_name(mac_address, name)
-        elif choice in command_map:
-            cmd_name = command_map[choice]
-            cmd = COMMANDS[cmd_name]
-            send_spp_command(mac_address, cmd)
-        else:
-            print("Invalid choice.")
+    session = SppSession(mac_address, verbose=True)
+    try:
+        while True:
+            try:
+                choice = input("\nCommand> ").strip()
+            except (EOFError, KeyboardInterrupt):
+                print("\nGoodbye!")
+                break
+
+            if choice == "0":
+                print("Goodbye!")
+                break
+            elif choice == "2":
+                name = input("Enter new speaker name: ").strip()
+                if name:
+                    set_speaker_name(mac_address, name, session=session)
+            elif choice in command_map:
+                cmd_name = command_map[choice]
+                cmd = COMMANDS[cmd_name]
+                send_spp_command(mac_address, cmd, session=session)
+            else:
+                print("Invalid choice.")
+    finally:
+        session.close()
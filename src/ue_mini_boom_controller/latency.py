@@ -0,0 +1,199 @@
+"""Per-phase latency histograms for SPP links.
+
+When a command is slow, the question is where the time went. Sessions time
+each phase of their work and record it per speaker:
+
+    sdp         the RFCOMM channel lookup (SDP or sdptool)
+    connect     from starting the connect to the link being up, SDP race included
+    first_byte  from sending a command to the first bytes coming back
+    response    from sending a command to its complete response packet
+    close       closing the link
+
+first_byte and response are kept per command id as well. Each (speaker,
+phase, command id) gets an HDR-style Histogram, so percentiles stay
+accurate to two significant digits from microseconds to minutes.
+
+Recording is off by default, and then a session pays one attribute check
+per phase. Turn it on with get_latency_recorder().enabled = True (ueboom
+--latency, ueboomd --latency), then read summary() or histogram().
+"""
+
+import math
+import threading
+from typing import NamedTuple
+
+SDP = "sdp"
+CONNECT = "connect"
+FIRST_BYTE = "first_byte"
+RESPONSE = "response"
+CLOSE = "close"
+PHASES = (SDP, CONNECT, FIRST_BYTE, RESPONSE, CLOSE)
+_ORDER = {phase: i for i, phase in enumerate(PHASES)}
+
+# Each power-of-two range of values is split into 2**(_SUB_BUCKET_BITS - 1)
+# buckets, so a bucket is at most 1/128 of its values wide: two significant digits.
+_SUB_BUCKET_BITS = 8
+_HALF_BITS = _SUB_BUCKET_BITS - 1
+
+
+class Histogram:
+    """Counts of durations in log-linear buckets, HdrHistogram style.
+
+    Values are recorded in seconds and kept at microsecond resolution.
+    Percentiles report the top of the bucket they fall in, so they are
+    never below the true value and at most 1% above it.
+    """
+
+    def __init__(self):
+        self.counts: dict[int, int] = {}  # bucket index -> count
+        self.count = 0
+        self.total = 0  # microseconds
+        self.min = 0
+        self.max = 0
+
+    @staticmethod
+    def _index(micros: int) -> int:
+        shift = max(0, micros.bit_length() - _SUB_BUCKET_BITS)
+        return (shift << _HALF_BITS) + (micros >> shift)
+
+    @staticmethod
+    def _upper(index: int) -> int:
+        """Largest value (microseconds) that lands in bucket index."""
+        shift = max(0, (index >> _HALF_BITS) - 1)
+        sub = index - (shift << _HALF_BITS)
+        return ((sub + 1) << shift) - 1
+
+    def record(self, seconds: float):
+        micros = max(0, round(seconds * 1_000_000))
+        index = self._index(micros)
+        self.counts[index] = self.counts.get(index, 0) + 1
+        if not self.count or micros < self.min:
+            self.min = micros
+        self.max = max(self.max, micros)
+        self.count += 1
+        self.total += micros
+
+    def merge(self, other: "Histogram"):
+        """Add other's counts to this histogram."""
+        for index, count in other.counts.items():
+            self.counts[index] = self.counts.get(index, 0) + count
+        if other.count:
+            self.min = min(self.min, other.min) if self.count else other.min
+            self.max = max(self.max, other.max)
+        self.count += other.count
+        self.total += other.total
+
+    def percentile(self, percent: float) -> float:
+        """The value (seconds) that percent of recorded values are at or below."""
+        if not self.count:
+            return 0.0
+        rank = max(1, math.ceil(percent / 100 * self.count))
+        seen = 0
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+            if seen >= rank:
+                return min(self._upper(index), self.max) / 1_000_000
+        return self.max / 1_000_000
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count / 1_000_000 if self.count else 0.0
+
+    def buckets(self) -> list[tuple[float, int]]:
+        """(upper bound in seconds, count) of every non-empty bucket, in order."""
+        return [(self._upper(i) / 1_000_000, self.counts[i]) for i in sorted(self.counts)]
+
+
+class LatencySummary(NamedTuple):
+    """Percentiles of one histogram, in seconds."""
+
+    mac_address: str
+    phase: str
+    command_id: int | None
+    count: int
+    mean: float
+    p50: float
+    p95: float
+    p99: float
+    max: float
+
+
+class LatencyRecorder:
+    """Histograms per (speaker, phase, command id); see the module docstring."""
+
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        self._histograms: dict[tuple[str, str, int | None], Histogram] = {}
+        self._lock = threading.Lock()
+
+    def record(self, mac_address: str, phase: str, seconds: float, command_id: int | None = None):
+        """Add one timing; does nothing while recording is off."""
+        if not self.enabled:
+            return
+        key = (mac_address.upper(), phase, command_id)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram()
+            histogram.record(seconds)
+
+    def histogram(
+        self, mac_address: str, phase: str, command_id: int | None = None
+    ) -> Histogram | None:
+        """A copy of one histogram, or None if nothing was recorded for it."""
+        with self._lock:
+            live = self._histograms.get((mac_address.upper(), phase, command_id))
+            if live is None:
+                return None
+            copy = Histogram()
+            copy.merge(live)
+        return copy
+
+    def histograms(self) -> dict[tuple[str, str, int | None], Histogram]:
+        """Copies of every histogram, keyed by (MAC, phase, command id)."""
+        with self._lock:
+            keys = list(self._histograms)
+        return {key: self.histogram(*key) for key in keys}
+
+    def summary(self, mac_address: str | None = None) -> list[LatencySummary]:
+        """p50/p95/p99 of every histogram, or only mac_address's; in phase order."""
+        rows = []
+        for (mac, phase, command_id), histogram in self.histograms().items():
+            if mac_address is not None and mac != mac_address.upper():
+                continue
+            rows.append(
+                LatencySummary(
+                    mac,
+                    phase,
+                    command_id,
+                    histogram.count,
+                    histogram.mean,
+                    histogram.percentile(50),
+                    histogram.percentile(95),
+                    histogram.percentile(99),
+                    histogram.max / 1_000_000,
+                )
+            )
+        rows.sort(
+            key=lambda r: (
+                r.mac_address,
+                _ORDER.get(r.phase, len(PHASES)),
+                -1 if r.command_id is None else r.command_id,
+            )
+        )
+        return rows
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+
+
+_default: LatencyRecorder | None = None
+
+
+def get_latency_recorder() -> LatencyRecorder:
+    """Return the process-wide latency recorder."""
+    global _default
+    if _default is None:
+        _default = LatencyRecorder()
+    return _default
@@ -0,0 +1,151 @@
+"""Cross-process per-speaker locks.
+
+A speaker accepts a single RFCOMM connection on its LWACP channel, so two
+ueboom processes talking to the same speaker at once make one of them fail.
+SpeakerLock serialises them with an fcntl lock on
+$XDG_RUNTIME_DIR/ue-mini-boom-controller/locks/<MAC>.lock. The lock is tied to
+an open file, so the kernel releases it if its holder dies.
+
+Callers either queue for the lock until a deadline or fail fast (timeout=0).
+Time spent waiting is recorded per speaker; see wait_stats().
+"""
+
+import fcntl
+import os
+import threading
+import time
+from typing import NamedTuple
+
+from .paths import runtime_dir
+
+# How long SppSession waits for another process to finish with a speaker (seconds).
+DEFAULT_TIMEOUT = 30.0
+
+# Polling interval bounds while waiting (flock has no timed wait).
+_POLL_MIN = 0.005
+_POLL_MAX = 0.1
+
+
+class SpeakerBusyError(TimeoutError):
+    """Another process holds the speaker's lock."""
+
+
+class WaitStats(NamedTuple):
+    """Lock contention seen by this process for one speaker."""
+
+    acquisitions: int
+    contended: int  # acquisitions that had to wait
+    total_wait: float  # seconds
+    max_wait: float  # seconds
+
+
+_stats: dict[str, WaitStats] = {}
+_stats_lock = threading.Lock()
+
+
+def _record(mac_address: str, waited: float, contended: bool):
+    with _stats_lock:
+        old = _stats.get(mac_address, WaitStats(0, 0, 0.0, 0.0))
+        _stats[mac_address] = WaitStats(
+            old.acquisitions + 1,
+            old.contended + contended,
+            old.total_wait + waited,
+            max(old.max_wait, waited),
+        )
+
+
+def wait_stats() -> dict[str, WaitStats]:
+    """Per-speaker lock-wait statistics of this process."""
+    with _stats_lock:
+        return dict(_stats)
+
+
+def lock_path(mac_address: str):
+    return runtime_dir() / "locks" / f"{mac_address.upper().replace(':', '')}.lock"
+
+
+class SpeakerLock:
+    """Exclusive, cross-process lock on one speaker.
+
+    timeout=None waits indefinitely, timeout=0 fails fast; otherwise acquire()
+    raises SpeakerBusyError once the deadline passes.
+
+        with SpeakerLock(mac, timeout=10):
+            ...  # sole user of the speaker's RFCOMM channel
+    """
+
+    def __init__(self, mac_address: str, timeout: float | None = DEFAULT_TIMEOUT):
+        self.mac_address = mac_address.upper()
+        self.timeout = timeout
+        self.waited = 0.0
+        self._fd = None
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+    @property
+    def held(self) -> bool:
+        return self._fd is not None
+
+    def _open(self) -> int:
+        path = lock_path(self.mac_address)
+        path.parent.mkdir(mode=0o700, parents=True, exist_ok=True)
+        return os.open(path, os.O_RDWR | os.O_CREAT | os.O_CLOEXEC, 0o600)
+
+    def try_acquire(self) -> bool:
+        """Take the lock if it is free; never waits."""
+        if self._fd is not None:
+            return True
+        fd = self._open()
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(fd)
+            return False
+        except BaseException:
+            os.close(fd)
+            raise
+        self._fd = fd
+        return True
+
+    def _waits(self, on_wait):
+        """Yield poll delays until the lock is taken; raise SpeakerBusyError at the deadline."""
+        if self._fd is not None:
+            return
+        started = time.monotonic()
+        poll = _POLL_MIN
+        contended = False
+        while not self.try_acquire():
+            waited = time.monotonic() - started
+            if self.timeout is not None and waited >= self.timeout:
+                _record(self.mac_address, waited, True)
+                raise SpeakerBusyError(f"{self.mac_address} is in use by another process")
+            if not contended:
+                contended = True
+                if on_wait is not None:
+                    on_wait()
+            yield poll if self.timeout is None else min(poll, self.timeout - waited)
+            poll = min(poll * 2, _POLL_MAX)
+        self.waited = time.monotonic() - started
+        _record(self.mac_address, self.waited, contended)
+
+    def acquire(self, on_wait=None):
+        """Take the lock, waiting up to timeout. on_wait() is called once if we have to wait."""
+        for delay in self._waits(on_wait):
+            time.sleep(delay)
+
+    async def acquire_async(self, on_wait=None):
+        """acquire() for event loops: waits with asyncio.sleep instead of blocking."""
+        import asyncio  # here, so the synchronous CLI never loads it
+
+        for delay in self._waits(on_wait):
+            await asyncio.sleep(delay)
+
+    def release(self):
+        fd, self._fd = self._fd, None
+        if fd is not None:
+            os.close(fd)  # closing the descriptor drops the flock
@@ -0,0 +1,301 @@
+"""Fleet and transport metrics in OpenMetrics text format, over HTTP.
+
+MetricsExporter renders what this process knows:
+
+    ueboom_speaker_battery_percent   gauge, per paired UE speaker (BlueZ)
+    ueboom_speaker_connected         gauge, per paired UE speaker (BlueZ)
+    ueboom_link_connects_total       RFCOMM connects, per speaker
+    ueboom_link_reconnects_total     connects that replaced a dropped link
+    ueboom_link_connect_errors_total connects that failed
+    ueboom_link_drops_total          links lost to a send or recv error
+    ueboom_response_timeouts_total   queries that got no answer (see pacing)
+    ueboom_sdp_cache_lookups_total   channel cache lookups, by result
+    ueboom_sdp_cache_hit_ratio       hits / lookups
+    ueboom_latency_seconds           histogram per speaker, phase and command
+
+Link counters and latency come from the sessions of this process, so they
+belong in the process doing the SPP work: `ueboomd --metrics-port`.
+Latency is exported only while the latency recorder is on; serve_metrics()
+turns it on. Rendering touches only in-memory state; BlueZ is read from a
+live DeviceStateCache, or at most once per bluez_ttl otherwise.
+"""
+
+import threading
+import time
+from collections import Counter
+
+from .ble import _ue_devices_from_snapshot, get_managed_devices
+from .channel_cache import get_channel_cache
+from .latency import get_latency_recorder
+from .pacing import get_pacer
+
+CONTENT_TYPE = "application/openmetrics-text; version=1.0.0; charset=utf-8"
+
+# Link events counted per speaker by SppSession and AsyncSppSession.
+CONNECTS = "connects"
+RECONNECTS = "reconnects"
+CONNECT_ERRORS = "connect_errors"
+LINK_DROPS = "drops"
+
+# How long a BlueZ snapshot is reused when there is no live device cache (seconds).
+DEFAULT_BLUEZ_TTL = 5.0
+
+# Bucket bounds (seconds) of the exported latency histograms.
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+
+class LinkCounters:
+    """Per-speaker counts of link events (CONNECTS, RECONNECTS, ...)."""
+
+    def __init__(self):
+        self._counts: Counter = Counter()
+        self._lock = threading.Lock()
+
+    def increment(self, mac_address: str, event: str):
+        with self._lock:
+            self._counts[mac_address.upper(), event] += 1
+
+    def get(self, mac_address: str, event: str) -> int:
+        with self._lock:
+            return self._counts[mac_address.upper(), event]
+
+    def snapshot(self) -> dict[tuple[str, str], int]:
+        """{(MAC, event): count} of every event seen so far."""
+        with self._lock:
+            return dict(self._counts)
+
+
+_default: LinkCounters | None = None
+
+
+def get_link_counters() -> LinkCounters:
+    """Return the process-wide link counters."""
+    global _default
+    if _default is None:
+        _default = LinkCounters()
+    return _default
+
+
+def _escape(value: str) -> str:
+    if "\\" not in value and '"' not in value and "\n" not in value:
+        return value  # MACs, phases and most names
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(labels: dict) -> str:
+    """labels as {key="value",...}, or "" for none."""
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + "}"
+
+
+def _number(value) -> str:
+    if isinstance(value, int):
+        return str(value)
+    return f"{value:.1f}" if value.is_integer() else repr(value)
+
+
+# le="..."} closing every bucket's label set, rendered once.
+_BUCKET_LABELS = [(bound, f'le="{_number(float(bound))}"}}') for bound in LATENCY_BUCKETS]
+
+
+class MetricsExporter:
+    """Renders this process's metrics; see the module docstring.
+
+    devices is the DeviceStateCache to read battery and connected state
+    from. Without one, or while it is not live, BlueZ is read with one
+    GetManagedObjects call at most every bluez_ttl seconds.
+    """
+
+    def __init__(self, devices=None, bluez_ttl: float = DEFAULT_BLUEZ_TTL, clock=time.monotonic):
+        self.devices = devices
+        self.bluez_ttl = bluez_ttl
+        self._clock = clock
+        self._snapshot: dict[str, dict] = {}
+        self._snapshot_at = None
+        self._lock = threading.Lock()
+
+    def _bluez(self) -> dict[str, dict]:
+        if self.devices is not None and self.devices.live:
+            return self.devices.devices()
+        with self._lock:
+            now = self._clock()
+            if self._snapshot_at is None or now - self._snapshot_at >= self.bluez_ttl:
+                self._snapshot = get_managed_devices() or {}
+                self._snapshot_at = now
+            return self._snapshot
+
+    def _speakers(self) -> list[tuple[str, dict]]:
+        """Paired UE speakers known to BlueZ, as (rendered labels, status) sorted by MAC."""
+        devices = self._bluez()
+        return [
+            (_labels({"mac": mac, "name": name}), devices[mac])
+            for mac, name in _ue_devices_from_snapshot(devices)
+        ]
+
+    def render(self) -> str:
+        """Every metric family in OpenMetrics text format, ending with # EOF."""
+        lines: list[str] = []
+
+        def family(name: str, kind: str, help_text: str, samples):
+            lines.append(f"# TYPE {name} {kind}")
+            lines.append(f"# HELP {name} {help_text}")
+            for suffix, labels, value in samples:
+                lines.append(f"{name}{suffix}{labels} {_number(value)}")
+
+        speakers = self._speakers()
+        family(
+            "ueboom_speaker_battery_percent",
+            "gauge",
+            "Battery level reported by BlueZ.",
+            [
+                ("", labels, info["battery"])
+                for labels, info in speakers
+                if info.get("battery", -1) >= 0
+            ],
+        )
+        family(
+            "ueboom_speaker_connected",
+            "gauge",
+            "1 if BlueZ reports the speaker connected.",
+            [("", labels, int(bool(info.get("connected")))) for labels, info in speakers],
+        )
+
+        counts = get_link_counters().snapshot()
+        for event, help_text in (
+            (CONNECTS, "RFCOMM links opened."),
+            (RECONNECTS, "RFCOMM links reopened after a drop."),
+            (CONNECT_ERRORS, "RFCOMM connects that failed."),
+            (LINK_DROPS, "RFCOMM links lost to a send or receive error."),
+        ):
+            family(
+                f"ueboom_link_{event}",
+                "counter",
+                help_text,
+                [
+                    ("_total", _labels({"mac": mac}), count)
+                    for (mac, name), count in sorted(counts.items())
+                    if name == event
+                ],
+            )
+        family(
+            "ueboom_response_timeouts",
+            "counter",
+            "Queries the speaker did not answer in time.",
+            [
+                ("_total", _labels({"mac": mac}), pacing.timeouts)
+                for mac, pacing in sorted(get_pacer().speakers().items())
+            ],
+        )
+
+        cache = get_channel_cache()
+        hits, misses = cache.hits, cache.misses
+        family(
+            "ueboom_sdp_cache_lookups",
+            "counter",
+            "RFCOMM channel cache lookups.",
+            [("_total", '{result="hit"}', hits), ("_total", '{result="miss"}', misses)],
+        )
+        family(
+            "ueboom_sdp_cache_hit_ratio",
+            "gauge",
+            "Share of channel lookups answered from the cache.",
+            [("", "", hits / (hits + misses) if hits + misses else 0.0)],
+        )
+
+        family(
+            "ueboom_latency_seconds",
+            "histogram",
+            "Time per phase of SPP work (see ueboom --latency).",
+            self._latency_samples(),
+        )
+        lines.append("# EOF")
+        return "\n".join(lines) + "\n"
+
+    def _latency_samples(self):
+        histograms = get_latency_recorder().histograms()
+        for (mac, phase, command_id), histogram in sorted(
+            histograms.items(),
+            key=lambda item: (item[0][0], item[0][1], -1 if item[0][2] is None else item[0][2]),
+        ):
+            labels = {"mac": mac, "phase": phase}
+            if command_id is not None:
+                labels["command"] = f"0x{command_id:02X}"
+            labels = _labels(labels)
+            open_labels = labels[:-1] + ","
+            buckets = histogram.buckets()
+            seen, i = 0, 0
+            for bound, le in _BUCKET_LABELS:
+                while i < len(buckets) and buckets[i][0] <= bound:
+                    seen += buckets[i][1]
+                    i += 1
+                yield "_bucket", open_labels + le, seen
+            yield "_bucket", open_labels + 'le="+Inf"}', histogram.count
+            yield "_count", labels, histogram.count
+            yield "_sum", labels, histogram.total / 1_000_000
+
+
+class MetricsServer:
+    """Serves an exporter at http://address:port/metrics from a background thread.
+
+    port 0 picks a free port; the chosen one is in .port after start().
+    """
+
+    def __init__(self, exporter: MetricsExporter, port: int, address: str = "127.0.0.1"):
+        self.exporter = exporter
+        self.address = address
+        self.port = port
+        self._server = None
+        self._thread = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def start(self):
+        """Bind and start serving; raises OSError if the port is taken."""
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        exporter = self.exporter
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?", 1)[0] not in ("/metrics", "/"):
+                    self.send_error(404)
+                    return
+                body = exporter.render().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", CONTENT_TYPE)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass  # scrapes every few seconds would flood stderr
+
+        self._server = ThreadingHTTPServer((self.address, self.port), Handler)
+        self._server.daemon_threads = True
+        self.port = self._server.server_address[1]
+        self._thread = threading.Thread(
+            target=self._server.serve_forever, name="ueboom-metrics", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        if self._server is None:
+            return
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread.join()
+        self._server = self._thread = None
+
+
+def serve_metrics(port: int, address: str = "127.0.0.1", devices=None) -> MetricsServer:
+    """Start serving metrics with latency recording on; returns the running server."""
+    get_latency_recorder().enabled = True
+    server = MetricsServer(MetricsExporter(devices), port, address)
+    server.start()
+    return server
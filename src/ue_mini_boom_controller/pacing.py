@@ -0,0 +1,121 @@
+"""Adaptive command pacing from observed speaker response times.
+
+Each speaker gets a round-trip estimator in the style of TCP's retransmission
+timer (RFC 6298): a smoothed RTT and its mean deviation give the recv timeout
+(SRTT + 4 * RTTVAR, clamped). A timed-out query doubles it until the next
+answer arrives. The inter-command gap is the quiet time left before the next
+command, and the settle time after a fresh connect. It follows SRTT the same
+way, so a speaker that answers in 30 ms is no longer paced as if it took a
+second, and one on a weak link is given more room.
+
+    pacing = get_pacer().for_speaker(mac)
+    frame = session._read_frame(cid, timeout=pacing.timeout)
+"""
+
+import threading
+
+from .profiles import get_profile_store
+
+# Before the first sample: the old fixed recv timeout and settle delay.
+INITIAL_TIMEOUT = 1.0
+INITIAL_GAP = 0.3
+
+MIN_TIMEOUT = 0.2
+MAX_TIMEOUT = 8.0
+MIN_GAP = 0.01
+MAX_GAP = 1.0
+
+# RFC 6298 gains and variance multiplier.
+_ALPHA = 1 / 8
+_BETA = 1 / 4
+_K = 4
+
+
+class SpeakerPacing:
+    """RTT estimator for one speaker; observe() and timed_out() feed it."""
+
+    def __init__(self, initial_timeout: float = INITIAL_TIMEOUT, initial_gap: float = INITIAL_GAP):
+        self.initial_timeout = initial_timeout
+        self.initial_gap = initial_gap
+        self.srtt: float | None = None
+        self.rttvar: float | None = None
+        self.samples = 0
+        self.timeouts = 0
+        self._backoff = 1
+        self._lock = threading.Lock()
+
+    def observe(self, rtt: float):
+        """Record the time from sending a command to its response."""
+        with self._lock:
+            if self.srtt is None:
+                self.srtt, self.rttvar = rtt, rtt / 2
+            else:
+                self.rttvar = (1 - _BETA) * self.rttvar + _BETA * abs(self.srtt - rtt)
+                self.srtt = (1 - _ALPHA) * self.srtt + _ALPHA * rtt
+            self.samples += 1
+            self._backoff = 1
+
+    def timed_out(self):
+        """Record a command that got no response; backs timeout and gap off."""
+        with self._lock:
+            self.timeouts += 1
+            self._backoff = min(self._backoff * 2, 64)
+
+    @property
+    def timeout(self) -> float:
+        """How long to wait for a response."""
+        with self._lock:
+            if self.srtt is None:
+                base = self.initial_timeout
+            else:
+                base = max(MIN_TIMEOUT, self.srtt + _K * self.rttvar)
+            return min(MAX_TIMEOUT, base * self._backoff)
+
+    @property
+    def gap(self) -> float:
+        """Quiet time between an exchange and the next command, and after connecting."""
+        with self._lock:
+            base = self.initial_gap if self.srtt is None else max(MIN_GAP, self.srtt / 2)
+            return min(MAX_GAP, base * self._backoff)
+
+
+class Pacer:
+    """SpeakerPacing per speaker MAC, created on first use.
+
+    A new speaker starts from its calibration profile (see profiles) if
+    there is one.
+    """
+
+    def __init__(self):
+        self._speakers: dict[str, SpeakerPacing] = {}
+        self._lock = threading.Lock()
+
+    def for_speaker(self, mac_address: str) -> SpeakerPacing:
+        key = mac_address.upper()
+        with self._lock:
+            pacing = self._speakers.get(key)
+        if pacing is not None:
+            return pacing
+        profile = get_profile_store().for_speaker(key)
+        if profile is None:
+            pacing = SpeakerPacing()
+        else:
+            pacing = SpeakerPacing(initial_timeout=profile.timeout, initial_gap=profile.gap)
+        with self._lock:
+            return self._speakers.setdefault(key, pacing)
+
+    def speakers(self) -> dict[str, SpeakerPacing]:
+        """The pacing of every speaker seen so far, by MAC."""
+        with self._lock:
+            return dict(self._speakers)
+
+
+_default: Pacer | None = None
+
+
+def get_pacer() -> Pacer:
+    """Return the process-wide pacer."""
+    global _default
+    if _default is None:
+        _default = Pacer()
+    return _default
@@ -0,0 +1,39 @@
+"""Per-user file locations, following the XDG base directory spec."""
+
+import os
+import stat
+import tempfile
+from pathlib import Path
+
+_APP_DIR = "ue-mini-boom-controller"
+
+
+def cache_dir() -> Path:
+    """Directory for disposable cached data ($XDG_CACHE_HOME/ue-mini-boom-controller)."""
+    base = os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache"
+    return Path(base) / _APP_DIR
+
+
+def runtime_dir() -> Path:
+    """Directory for sockets and locks ($XDG_RUNTIME_DIR/ue-mini-boom-controller).
+
+    Falls back to a per-user directory under the system temp dir when
+    XDG_RUNTIME_DIR is not set. That one is created with mode 0700, and
+    PermissionError is raised if it exists but is not a directory owned by
+    this user and closed to everyone else, since another user could
+    otherwise hold our locks or answer on our daemon socket.
+    """
+    base = os.environ.get("XDG_RUNTIME_DIR")
+    if base:
+        return Path(base) / _APP_DIR
+    path = Path(tempfile.gettempdir()) / f"{_APP_DIR}-{os.getuid()}"
+    try:
+        path.mkdir(mode=0o700)
+    except FileExistsError:
+        pass
+    st = path.lstat()
+    if not stat.S_ISDIR(st.st_mode) or st.st_uid != os.getuid() or st.st_mode & 0o077:
+        raise PermissionError(
+            f"{path} is not a private directory of this user; remove it or set XDG_RUNTIME_DIR"
+        )
+    return path
@@ -0,0 +1,148 @@
+"""Per-firmware pacing profiles written by `ueboom --calibrate`.
+
+A profile records the fastest command rate a speaker model answered
+reliably, together with the recv timeout and gap measured at that rate. Profiles
+are keyed by the BlueZ modalias (vendor, product and firmware version), so a
+calibration run on one speaker covers every speaker of the same batch. They
+are stored in $XDG_CACHE_HOME/ue-mini-boom-controller/profiles.json together
+with the modalias of each speaker seen so far. The rate limiter and pacer
+start new speakers from their profile instead of the built-in defaults.
+"""
+
+import json
+import os
+import threading
+from pathlib import Path
+from typing import NamedTuple
+
+from .ble import get_device_status, get_managed_devices
+from .paths import cache_dir
+
+
+class Profile(NamedTuple):
+    """Calibrated pacing for one speaker model."""
+
+    modalias: str
+    rate: float  # sustained commands per second
+    burst: int  # commands that may go out back to back
+    timeout: float  # initial recv timeout (seconds)
+    gap: float  # initial inter-command gap (seconds)
+    calibrated_at: float  # time.time()
+
+
+class ProfileStore:
+    """Profiles by modalias plus a speaker -> modalias index, backed by a JSON file."""
+
+    def __init__(self, path: Path | None = None):
+        self.path = path
+        self._profiles: dict[str, Profile] | None = None
+        self._speakers: dict[str, str] = {}
+        # Modalias (or None) of every device BlueZ has been asked about.
+        self._looked_up: dict[str, str | None] = {}
+        self._lock = threading.Lock()
+        # One BlueZ lookup at a time; callers arriving meanwhile reuse its answer.
+        self._lookup_lock = threading.Lock()
+
+    def _load(self) -> dict[str, Profile]:
+        if self._profiles is None:
+            self._profiles = {}
+            if self.path is not None:
+                try:
+                    raw = json.loads(self.path.read_text())
+                    for modalias, entry in raw.get("profiles", {}).items():
+                        self._profiles[modalias] = Profile(modalias=modalias, **entry)
+                    self._speakers = {
+                        mac.upper(): str(modalias)
+                        for mac, modalias in raw.get("speakers", {}).items()
+                    }
+                except (OSError, ValueError, TypeError, AttributeError):
+                    self._profiles, self._speakers = {}, {}  # missing or corrupt
+        return self._profiles
+
+    def _save(self):
+        if self.path is None:
+            return
+        data = {
+            "profiles": {
+                modalias: {k: v for k, v in profile._asdict().items() if k != "modalias"}
+                for modalias, profile in self._profiles.items()
+            },
+            "speakers": self._speakers,
+        }
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp")
+            tmp.write_text(json.dumps(data, indent=1))
+            os.replace(tmp, self.path)
+        except OSError:
+            pass  # profiles are best effort
+
+    def get(self, modalias: str) -> Profile | None:
+        with self._lock:
+            return self._load().get(modalias)
+
+    def put(self, profile: Profile, mac_address: str | None = None):
+        """Store a profile, and remember that mac_address has its modalias."""
+        with self._lock:
+            self._load()[profile.modalias] = profile
+            if mac_address is not None:
+                self._speakers[mac_address.upper()] = profile.modalias
+            self._save()
+
+    def _cached(self, key: str) -> tuple[bool, Profile | None]:
+        """(True, profile) if key can be answered without BlueZ, else (False, None)."""
+        profiles = self._load()
+        if not profiles:
+            return True, None
+        modalias = self._speakers.get(key)
+        if modalias is None:
+            if key not in self._looked_up:
+                return False, None
+            modalias = self._looked_up[key]
+        return True, profiles.get(modalias)
+
+    def resolved(self, mac_address: str) -> bool:
+        """Whether for_speaker(mac_address) will answer without asking BlueZ."""
+        with self._lock:
+            return self._cached(mac_address.upper())[0]
+
+    def for_speaker(self, mac_address: str) -> Profile | None:
+        """The profile for mac_address's model, or None.
+
+        BlueZ is asked only if some profile exists, and about each speaker at
+        most once per process: one GetManagedObjects snapshot gives the
+        modalias of every known device, so a fleet costs a single lookup.
+        """
+        key = mac_address.upper()
+        with self._lock:
+            hit, profile = self._cached(key)
+        if hit:
+            return profile
+        with self._lookup_lock:
+            with self._lock:
+                hit, profile = self._cached(key)
+            if hit:
+                return profile
+            devices = get_managed_devices()
+            if devices is None:
+                devices = {key: get_device_status(key)}
+            with self._lock:
+                for mac, info in devices.items():
+                    self._looked_up[mac] = info.get("modalias") or None
+                modalias = self._looked_up.setdefault(key, None)
+                if modalias is None:
+                    return None
+                self._speakers[key] = modalias
+                self._save()
+                return self._profiles.get(modalias)
+
+
+_default: ProfileStore | None = None
+
+
+def get_profile_store() -> ProfileStore:
+    """Return the process-wide store backed by the user's cache directory."""
+    global _default
+    if _default is None:
+        _default = ProfileStore(cache_dir() / "profiles.json")
+    return _default
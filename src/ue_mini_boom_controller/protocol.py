@@ -1,9 +1,11 @@
 """
-Protocol constants and command builder for UE Mini Boom.
+Protocol constants, command builder and response decoder for UE Mini Boom.
 
 Extracted from decompiled UE Boom APK (com.logitech.ue.centurion.*).
 """
 
+from typing import NamedTuple
+
 # Bluetooth SPP UUID (Serial Port Profile — standard)
 SPP_UUID = "00001101-0000-1000-8000-00805F9B34FB"
 
@@ -102,3 +104,89 @@ COMMANDS = {
     # Stereo discovery trigger (querying DU lock initiates pairing workflow)
     "stereo_discover": build_spp_command(UECommand.DOUBLE_UP_LOCK),
 }
+
+
+class Frame(NamedTuple):
+    """One decoded LWACP packet."""
+
+    command_id: int
+    params: bytes
+
+    def to_bytes(self) -> bytes:
+        return build_spp_command(self.command_id, *self.params)
+
+
+class FrameDecoder:
+    """
+    Incremental decoder for LWACP packets read from a byte stream.
+
+    Format: [total_length] [0x01] [command_id] [params...] (see build_spp_command)
+
+    Bytes are written straight into an internal bytearray — either with
+    sock.recv_into(decoder.recv_buffer()) followed by commit(n), or with feed().
+    Partial packets stay buffered until the rest arrives; several packets
+    arriving in one read are returned one by one from next_frame().
+    """
+
+    def __init__(self, size: int = 1024):
+        self._buf = bytearray(size)
+        self._start = 0
+        self._end = 0
+
+    def __len__(self) -> int:
+        return self._end - self._start
+
+    def clear(self):
+        """Drop all buffered bytes."""
+        self._start = self._end = 0
+
+    def recv_buffer(self) -> memoryview:
+        """Return the free tail of the buffer for recv_into()."""
+        if self._start == self._end:
+            self._start = self._end = 0
+        elif self._end == len(self._buf):
+            # Move the pending partial packet to the front (at most 255 bytes).
+            pending = self._end - self._start
+            if pending == len(self._buf):
+                # Replace rather than resize: callers may still hold a view.
+                grown = bytearray(2 * len(self._buf))
+                grown[:pending] = self._buf
+                self._buf = grown
+            else:
+                self._buf[:pending] = self._buf[self._start : self._end]
+            self._start, self._end = 0, pending
+        return memoryview(self._buf)[self._end :]
+
+    def commit(self, n: int):
+        """Mark n bytes written into recv_buffer() as received."""
+        self._end += n
+
+    def feed(self, data: bytes):
+        """Append received bytes to the buffer."""
+        view = memoryview(data)
+        while view:
+            free = self.recv_buffer()
+            n = min(len(free), len(view))
+            free[:n] = view[:n]
+            self.commit(n)
+            view = view[n:]
+
+    def next_frame(self) -> Frame | None:
+        """Return the next complete packet, or None if more bytes are needed.
+
+        Bytes that cannot start a valid packet are skipped one at a time so the
+        decoder resynchronises after line noise.
+        """
+        buf = self._buf
+        while self._end - self._start >= 3:
+            start = self._start
+            length = buf[start]
+            if length < 2 or buf[start + 1] != 0x01:
+                self._start += 1
+                continue
+            end = start + 1 + length
+            if end > self._end:
+                return None
+            self._start = end
+            return Frame(buf[start + 2], bytes(buf[start + 3 : end]))
+        return None
@@ -0,0 +1,131 @@
+"""Per-speaker token-bucket rate limiting for SPP commands.
+
+The speaker firmware drops commands that arrive too quickly. Every SPP send
+takes a token from its speaker's bucket first. A bucket holds up to `burst`
+tokens and refills at `rate` tokens per second, so short bursts go out at
+once and only sustained floods are slowed down. Buckets are shared across
+the process, so sessions, fleet jobs and the interactive loop all count
+against the same limit.
+
+    get_rate_limiter().configure(rate=1.0, burst=2)                   # all speakers
+    get_rate_limiter().configure(rate=5.0, burst=10, mac_address=mac)  # one speaker
+"""
+
+import threading
+import time
+
+from .profiles import get_profile_store
+
+# Sustained commands per second, and how many may go out back to back.
+DEFAULT_RATE = 2.0
+DEFAULT_BURST = 4
+
+
+class TokenBucket:
+    """Token bucket; rate=None disables limiting."""
+
+    def __init__(self, rate: float | None, burst: int, clock=time.monotonic):
+        if burst < 1:
+            raise ValueError("burst must be at least 1")
+        self.rate = rate
+        self.burst = burst
+        self._clock = clock
+        self._tokens = float(burst)
+        self._stamp = clock()
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """Take a token; returns how long to wait before using it (0 if one was free).
+
+        The token is taken even if the caller then waits, so concurrent callers
+        queue up in order rather than all waking at the same refill.
+        """
+        if self.rate is None:
+            return 0.0
+        with self._lock:
+            now = self._clock()
+            self._tokens = min(self.burst, self._tokens + (now - self._stamp) * self.rate)
+            self._stamp = now
+            self._tokens -= 1
+            return 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+
+
+class RateLimiter:
+    """Token buckets keyed by speaker MAC, created on first use.
+
+    A speaker's limit is its configure() override, else its calibration
+    profile (see profiles), else the default.
+    """
+
+    def __init__(self, rate: float | None = DEFAULT_RATE, burst: int = DEFAULT_BURST):
+        self.rate = rate
+        self.burst = burst
+        self.throttled = 0  # sends that had to wait
+        self._overrides: dict[str, tuple[float | None, int]] = {}
+        self._buckets: dict[str, TokenBucket] = {}
+        self._lock = threading.Lock()
+
+    def configure(self, rate: float | None, burst: int, mac_address: str | None = None):
+        """Set the limit for one speaker, or the default for all of them."""
+        with self._lock:
+            if mac_address is None:
+                self.rate, self.burst = rate, burst
+                self._buckets = {
+                    mac: bucket for mac, bucket in self._buckets.items() if mac in self._overrides
+                }
+            else:
+                key = mac_address.upper()
+                self._overrides[key] = (rate, burst)
+                self._buckets.pop(key, None)
+
+    def bucket(self, mac_address: str) -> TokenBucket:
+        key = mac_address.upper()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            override = self._overrides.get(key)
+        if bucket is not None:
+            return bucket
+        if override is None:
+            profile = get_profile_store().for_speaker(key)
+            if profile is not None:
+                override = (profile.rate, profile.burst)
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                rate, burst = override or (self.rate, self.burst)
+                bucket = self._buckets[key] = TokenBucket(rate, burst)
+            return bucket
+
+    def _reserve(self, mac_address: str) -> float:
+        delay = self.bucket(mac_address).reserve()
+        if delay > 0:
+            with self._lock:
+                self.throttled += 1
+        return delay
+
+    def wait(self, mac_address: str) -> float:
+        """Block until mac_address may be sent another command; returns the delay."""
+        delay = self._reserve(mac_address)
+        if delay > 0:
+            time.sleep(delay)
+        return delay
+
+    async def wait_async(self, mac_address: str) -> float:
+        """wait() for event loops."""
+        import asyncio  # here, so the synchronous CLI never loads it
+
+        delay = self._reserve(mac_address)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        return delay
+
+
+_default: RateLimiter | None = None
+
+
+def get_rate_limiter() -> RateLimiter:
+    """Return the process-wide rate limiter."""
+    global _default
+    if _default is None:
+        _default = RateLimiter()
+    return _default
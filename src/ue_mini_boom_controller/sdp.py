@@ -0,0 +1,278 @@
+"""In-process SDP client for finding the speaker's RFCOMM channel.
+
+Replaces `sdptool search` with a ServiceSearchAttribute request sent over an
+L2CAP socket to PSM 1. The module is split into a pure layer (PDU encoding,
+data element parsing, record inspection) that works on bytes and can be tested
+without hardware, and a thin socket layer on top.
+
+Reference: Bluetooth Core Specification, Vol 3, Part B (Service Discovery Protocol).
+"""
+
+import socket
+import struct
+import uuid
+
+from .protocol import SPP_UUID
+
+# L2CAP PSM of the SDP server.
+SDP_PSM = 1
+
+# PDU ids
+_ERROR_RESPONSE = 0x01
+_SERVICE_SEARCH_ATTRIBUTE_REQUEST = 0x06
+_SERVICE_SEARCH_ATTRIBUTE_RESPONSE = 0x07
+
+# Attribute ids
+SERVICE_CLASS_ID_LIST = 0x0001
+PROTOCOL_DESCRIPTOR_LIST = 0x0004
+
+# Protocol UUID of RFCOMM (16-bit alias)
+_RFCOMM_UUID16 = 0x0003
+
+# Bluetooth base UUID: 16/32-bit aliases expand to 0000xxxx-0000-1000-8000-00805F9B34FB.
+_BASE_UUID = uuid.UUID("00000000-0000-1000-8000-00805F9B34FB")
+
+# Stop following continuation states after this many responses.
+_MAX_CONTINUATIONS = 32
+
+# Largest SDP response we accept in one L2CAP packet.
+SDP_MTU = 1024
+
+# Data element type descriptors (upper 5 bits of the header byte).
+_NIL, _UINT, _INT, _UUID, _TEXT, _BOOL, _SEQUENCE, _ALTERNATIVE, _URL = range(9)
+_FIXED_SIZES = (1, 2, 4, 8, 16)
+
+
+class SdpError(Exception):
+    """Malformed SDP data or an error response from the SDP server."""
+
+
+def uuid16(value: int) -> uuid.UUID:
+    """Expand a 16- or 32-bit Bluetooth UUID alias to a full UUID."""
+    return uuid.UUID(int=_BASE_UUID.int | (value << 96))
+
+
+# --- Data elements ---
+
+
+def parse_data_element(data: bytes):
+    """Decode one SDP data element.
+
+    Unsigned and signed integers become int, UUIDs become uuid.UUID (short
+    aliases expanded), text and URLs become str, sequences and alternatives
+    become lists.
+    """
+    view = memoryview(data)
+    value, end = _parse_element(view, 0)
+    if end != len(view):
+        raise SdpError(f"{len(view) - end} trailing bytes after data element")
+    return value
+
+
+def _parse_element(buf: memoryview, pos: int):
+    if pos >= len(buf):
+        raise SdpError("truncated data element header")
+    descriptor = buf[pos]
+    kind = descriptor >> 3
+    size_index = descriptor & 0x07
+    pos += 1
+
+    if kind == _NIL:
+        return None, pos
+    if size_index < 5:
+        size = _FIXED_SIZES[size_index]
+    else:
+        n = 1 << (size_index - 5)  # 1, 2 or 4 length bytes
+        if pos + n > len(buf):
+            raise SdpError("truncated data element length")
+        size = int.from_bytes(buf[pos : pos + n], "big")
+        pos += n
+    end = pos + size
+    if end > len(buf):
+        raise SdpError("data element overruns buffer")
+
+    if kind == _UINT:
+        return int.from_bytes(buf[pos:end], "big"), end
+    if kind == _INT:
+        return int.from_bytes(buf[pos:end], "big", signed=True), end
+    if kind == _UUID:
+        raw = int.from_bytes(buf[pos:end], "big")
+        if size == 16:
+            return uuid.UUID(int=raw), end
+        return uuid16(raw), end
+    if kind in (_TEXT, _URL):
+        return bytes(buf[pos:end]).decode("utf-8", errors="replace"), end
+    if kind == _BOOL:
+        return buf[pos] != 0, end
+    if kind in (_SEQUENCE, _ALTERNATIVE):
+        items = []
+        while pos < end:
+            item, pos = _parse_element(buf[:end], pos)
+            items.append(item)
+        return items, end
+    raise SdpError(f"unknown data element type {kind}")
+
+
+def _encode_sequence(body: bytes) -> bytes:
+    if len(body) < 0x100:
+        return bytes([(_SEQUENCE << 3) | 5, len(body)]) + body
+    return bytes([(_SEQUENCE << 3) | 6]) + struct.pack(">H", len(body)) + body
+
+
+def _encode_uuid(value: uuid.UUID) -> bytes:
+    short, base = divmod(value.int, 1 << 96)
+    if base == _BASE_UUID.int and short <= 0xFFFF:
+        return bytes([(_UUID << 3) | 1]) + struct.pack(">H", short)
+    return bytes([(_UUID << 3) | 4]) + value.bytes
+
+
+def _encode_attribute_id(attr: int | tuple[int, int]) -> bytes:
+    if isinstance(attr, tuple):
+        low, high = attr
+        return bytes([(_UINT << 3) | 2]) + struct.pack(">HH", low, high)
+    return bytes([(_UINT << 3) | 1]) + struct.pack(">H", attr)
+
+
+# --- PDUs ---
+
+
+def build_search_attribute_request(
+    transaction_id: int,
+    service_uuids: list[uuid.UUID],
+    attribute_ids: list[int | tuple[int, int]],
+    max_bytes: int = 0xFFFF,
+    continuation: bytes = b"",
+) -> bytes:
+    """Encode a ServiceSearchAttributeRequest PDU.
+
+    attribute_ids holds single ids or inclusive (low, high) ranges.
+    """
+    params = (
+        _encode_sequence(b"".join(_encode_uuid(u) for u in service_uuids))
+        + struct.pack(">H", max_bytes)
+        + _encode_sequence(b"".join(_encode_attribute_id(a) for a in attribute_ids))
+        + bytes([len(continuation)])
+        + continuation
+    )
+    header = struct.pack(">BHH", _SERVICE_SEARCH_ATTRIBUTE_REQUEST, transaction_id, len(params))
+    return header + params
+
+
+def parse_search_attribute_response(pdu: bytes) -> tuple[int, bytes, bytes]:
+    """Decode a ServiceSearchAttributeResponse PDU.
+
+    Returns (transaction_id, attribute_list_bytes, continuation_state).
+    Raises SdpError for error responses and malformed PDUs.
+    """
+    if len(pdu) < 5:
+        raise SdpError("truncated SDP PDU header")
+    pdu_id, transaction_id, length = struct.unpack_from(">BHH", pdu)
+    if len(pdu) < 5 + length:
+        raise SdpError("truncated SDP PDU")
+    if pdu_id == _ERROR_RESPONSE:
+        code = struct.unpack_from(">H", pdu, 5)[0] if length >= 2 else 0
+        raise SdpError(f"SDP error response 0x{code:04X}")
+    if pdu_id != _SERVICE_SEARCH_ATTRIBUTE_RESPONSE:
+        raise SdpError(f"unexpected SDP PDU 0x{pdu_id:02X}")
+
+    count = struct.unpack_from(">H", pdu, 5)[0]
+    lists_end = 7 + count
+    if lists_end + 1 > 5 + length:
+        raise SdpError("SDP attribute lists overrun PDU")
+    cont_len = pdu[lists_end]
+    continuation = bytes(pdu[lists_end + 1 : lists_end + 1 + cont_len])
+    if len(continuation) != cont_len:
+        raise SdpError("truncated continuation state")
+    return transaction_id, bytes(pdu[7:lists_end]), continuation
+
+
+def parse_attribute_lists(data: bytes) -> list[dict[int, object]]:
+    """Decode the AttributeLists of a complete response into one dict per record."""
+    records = parse_data_element(data)
+    if not isinstance(records, list):
+        raise SdpError("attribute lists are not a sequence")
+    result = []
+    for record in records:
+        if not isinstance(record, list) or len(record) % 2:
+            raise SdpError("malformed attribute list")
+        result.append(dict(zip(record[::2], record[1::2])))
+    return result
+
+
+def rfcomm_channel(records: list[dict[int, object]]) -> int | None:
+    """Return the RFCOMM channel from the first record that declares one."""
+    rfcomm = uuid16(_RFCOMM_UUID16)
+    for record in records:
+        stack = record.get(PROTOCOL_DESCRIPTOR_LIST)
+        if not isinstance(stack, list):
+            continue
+        for layer in stack:
+            if isinstance(layer, list) and len(layer) >= 2 and layer[0] == rfcomm:
+                if isinstance(layer[1], int):
+                    return layer[1]
+    return None
+
+
+def search_transaction(
+    service_uuids: list[uuid.UUID],
+    attribute_ids: list[int | tuple[int, int]],
+):
+    """Sans-I/O ServiceSearchAttribute exchange.
+
+    A generator that yields request PDUs and expects each response PDU to be
+    sent back in; it follows continuation states and finally returns the
+    decoded records (via StopIteration.value).
+    """
+    chunks = []
+    continuation = b""
+    for transaction_id in range(1, _MAX_CONTINUATIONS + 1):
+        request = build_search_attribute_request(
+            transaction_id, service_uuids, attribute_ids, continuation=continuation
+        )
+        response = yield request
+        reply_id, data, continuation = parse_search_attribute_response(response)
+        if reply_id != transaction_id:
+            raise SdpError(f"transaction id mismatch ({reply_id} != {transaction_id})")
+        chunks.append(data)
+        if not continuation:
+            return parse_attribute_lists(b"".join(chunks))
+    raise SdpError("too many SDP continuation responses")
+
+
+# --- Socket layer ---
+
+
+def is_available() -> bool:
+    """True if this Python can open Bluetooth L2CAP sockets."""
+    return hasattr(socket, "AF_BLUETOOTH") and hasattr(socket, "BTPROTO_L2CAP")
+
+
+def find_rfcomm_channel(
+    mac_address: str,
+    service_uuid: str = SPP_UUID,
+    timeout: float = 5.0,
+    on_start=None,
+) -> int | None:
+    """Look up the RFCOMM channel of a service on a remote device.
+
+    Returns the channel number or None if the lookup fails. on_start, if
+    given, is called before connecting with a function that aborts the lookup
+    from another thread.
+    """
+    exchange = search_transaction([uuid.UUID(service_uuid)], [PROTOCOL_DESCRIPTOR_LIST])
+    try:
+        with socket.socket(
+            socket.AF_BLUETOOTH, socket.SOCK_SEQPACKET, socket.BTPROTO_L2CAP
+        ) as sock:
+            sock.settimeout(timeout)
+            if on_start is not None:
+                on_start(lambda: sock.shutdown(socket.SHUT_RDWR))
+            sock.connect((mac_address, SDP_PSM))
+            request = next(exchange)
+            while True:
+                sock.send(request)
+                request = exchange.send(sock.recv(SDP_MTU))
+    except StopIteration as done:
+        return rfcomm_channel(done.value)
+    except (OSError, SdpError):
+        return None
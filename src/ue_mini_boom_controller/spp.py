@@ -1,76 +1,658 @@
 """SPP (RFCOMM) transport for UE Mini Boom — Classic Bluetooth."""
 
+import contextlib
+import queue
 import socket
 import subprocess
+import threading
 import time
-
-from .protocol import SPP_UUID, UECommand, build_spp_command
+from collections import defaultdict, deque
+from concurrent.futures import FIRST_COMPLETED, Future, wait
+
+from . import sdp
+from .adapters import get_adapter_pool
+from .channel_cache import get_channel_cache
+from .latency import CLOSE, CONNECT, FIRST_BYTE, RESPONSE, SDP, get_latency_recorder
+from .locks import DEFAULT_TIMEOUT, SpeakerLock
+from .metrics import CONNECT_ERRORS, CONNECTS, LINK_DROPS, RECONNECTS, get_link_counters
+from .pacing import get_pacer
+from .protocol import SPP_UUID, Frame, FrameDecoder, UECommand, build_spp_command
+from .ratelimit import get_rate_limiter
 
 # Default RFCOMM channel for the LWACP service on UE speakers.
 _DEFAULT_RFCOMM_CHANNEL = 5
 
 
-def _find_rfcomm_channel(mac_address: str) -> int | None:
-    """Discover the RFCOMM channel for the SPP service via sdptool.
+def _sdptool_command(mac_address: str) -> list[str]:
+    return ["sdptool", "search", "--bdaddr", mac_address, "SP"]
+
 
-    Returns the channel number or None if lookup fails.
+def _parse_sdptool_channel(stdout: str) -> int | None:
+    """Extract the RFCOMM channel from `sdptool search` output."""
+    for line in stdout.splitlines():
+        line = line.strip()
+        if line.startswith("Channel:"):
+            try:
+                return int(line.split(":")[1].strip())
+            except ValueError:
+                return None
+    return None
+
+
+def _find_rfcomm_channel(mac_address: str, on_start=None) -> int | None:
+    """Discover the RFCOMM channel for the SPP service.
+
+    Uses the in-process SDP client; sdptool is only used where Python has no
+    L2CAP socket support. Returns the channel number or None if lookup fails.
+    on_start is passed to sdp.find_rfcomm_channel; sdptool runs cannot be aborted.
     """
+    if sdp.is_available():
+        return sdp.find_rfcomm_channel(mac_address, on_start=on_start)
+
     try:
         result = subprocess.run(
-            ["sdptool", "search", "--bdaddr", mac_address, "SP"],
+            _sdptool_command(mac_address),
             capture_output=True,
             text=True,
             timeout=10,
         )
-        for line in result.stdout.splitlines():
-            line = line.strip()
-            if line.startswith("Channel:"):
-                return int(line.split(":")[1].strip())
-    except (FileNotFoundError, subprocess.TimeoutExpired, ValueError):
-        pass
-    return None
+    except (FileNotFoundError, subprocess.TimeoutExpired):
+        return None
+    return _parse_sdptool_channel(result.stdout)
+
+
+def _hex(data: bytes) -> str:
+    return " ".join(f"{b:02X}" for b in data)
+
+
+class SppSession:
+    """Long-lived RFCOMM link to one speaker.
+
+    Connects on first use and keeps the socket open so that many commands share
+    a single link. If the link drops, the next command reconnects transparently.
 
+    While connected the session holds the speaker's SpeakerLock, so other
+    processes wait for it (up to lock_timeout; 0 fails fast) instead of
+    fighting over the speaker's single RFCOMM channel.
 
-def send_spp_command(mac_address: str, command: bytes, verbose: bool = True):
+    Usable as a context manager::
+
+        with SppSession(mac) as session:
+            send_spp_command(mac, COMMANDS["battery_announce"], session=session)
+            query_spp_values(mac, [UECommand.EQ_PRESET], session=session)
+    """
+
+    def __init__(
+        self,
+        mac_address: str,
+        channel: int | None = None,
+        verbose: bool = False,
+        adapter: str | None = None,
+        lock_timeout: float | None = DEFAULT_TIMEOUT,
+    ):
+        self.mac_address = mac_address
+        self.channel = channel
+        # A caller-chosen channel bypasses the channel cache and SDP lookup.
+        self._pinned = channel is not None
+        self.verbose = verbose
+        # Local adapter (name or address) to connect from; None lets AdapterPool choose.
+        self.adapter = adapter
+        self._local = None
+        self._lock = SpeakerLock(mac_address, timeout=lock_timeout)
+        self._pacing = None
+        self.latency = get_latency_recorder()
+        self.counters = get_link_counters()
+        self._sock = None
+        # Whether the link was lost to an error, so the next connect is a reconnect.
+        self._dropped = False
+        self._decoder = FrameDecoder()
+        # When the first bytes after the last send arrived (for latency).
+        self._first_byte_at = None
+        # (command id, time sent) of send_nowait() packets not yet answered.
+        self._awaiting: deque[tuple[int | None, float]] = deque()
+
+    def __enter__(self):
+        self.connect()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    @property
+    def pacing(self):
+        """Response-time estimator shared by every session to this speaker.
+
+        Resolved on first use, so building a session never waits on BlueZ
+        for the speaker's profile.
+        """
+        if self._pacing is None:
+            self._pacing = get_pacer().for_speaker(self.mac_address)
+        return self._pacing
+
+    @property
+    def connected(self) -> bool:
+        return self._sock is not None
+
+    def connect(self):
+        """Open the RFCOMM link if it is not already open.
+
+        Goes straight to the cached channel for this speaker when there is one.
+        Otherwise (or if the cached channel refuses the connection) it races a
+        connect to the default channel against the SDP lookup; see _connect_racing.
+        The winning channel is cached. On hosts with several adapters the link
+        goes out through the least busy adapter the speaker is paired with.
+        Raises OSError if the speaker cannot be reached, or SpeakerBusyError if
+        another process keeps it past lock_timeout.
+        """
+        if self._sock is not None:
+            return
+
+        self._lock.acquire(on_wait=self._report_wait)
+        pool = get_adapter_pool()
+        started = time.monotonic()
+        try:
+            self._local = pool.choose(self.mac_address, self.adapter)
+            with pool.connecting(self._local):
+                sock = self._connect_channel()
+        except BaseException as e:
+            if isinstance(e, OSError):
+                self.counters.increment(self.mac_address, CONNECT_ERRORS)
+            self._lock.release()
+            raise
+        self._sock = sock
+        self._decoder.clear()
+        self._awaiting.clear()
+        self.counters.increment(self.mac_address, CONNECTS)
+        if self._dropped:
+            self.counters.increment(self.mac_address, RECONNECTS)
+            self._dropped = False
+        self.latency.record(self.mac_address, CONNECT, time.monotonic() - started)
+
+    def _report_wait(self):
+        if self.verbose:
+            print(f"{self.mac_address} is in use by another process, waiting...")
+
+    def _connect_channel(self):
+        if self._pinned:
+            return self._open(self.channel)
+        cache = get_channel_cache()
+        channel = cache.get(self.mac_address)
+        sock = None
+        if channel is not None:
+            try:
+                sock = self._open(channel)
+            except OSError:
+                # Stale cache entry — forget it and discover the channel again.
+                cache.invalidate(self.mac_address)
+        if sock is None:
+            sock, channel = self._connect_racing()
+        self.channel = channel
+        cache.put(self.mac_address, channel)
+        return sock
+
+    def _connect_racing(self):
+        """Race a connect to the default channel against the SDP lookup.
+
+        "Happy eyeballs": starts connecting to _DEFAULT_RFCOMM_CHANNEL and runs
+        the SDP lookup at the same time, so a slow lookup no longer delays the
+        connect. If SDP
+        reports a different channel, that channel is tried too. The first
+        connect to succeed wins. Connects still in progress and the lookup are
+        then aborted by shutting their sockets down; a loser that connects
+        anyway is closed.
+
+        Returns (socket, channel). Raises the last connect error if every
+        attempt fails.
+        """
+        events = queue.Queue()
+        lock = threading.Lock()
+        settled = False
+        # How to abort each attempt or lookup still running, by thread.
+        aborts = {}
+
+        def on_start(abort):
+            with lock:
+                if not settled:
+                    aborts[threading.get_ident()] = abort
+                    return
+            with contextlib.suppress(OSError):
+                abort()
+
+        def finished():
+            with lock:
+                aborts.pop(threading.get_ident(), None)
+
+        def attempt(channel: int):
+            try:
+                sock = self._open(channel, on_start)
+            except Exception as e:
+                events.put(("failed", channel, e))
+                return
+            finally:
+                finished()
+            with lock:
+                if not settled:
+                    events.put(("connected", channel, sock))
+                    return
+            sock.close()  # lost the race
+
+        def lookup():
+            started = time.monotonic()
+            try:
+                channel = _find_rfcomm_channel(self.mac_address, on_start=on_start)
+            except Exception:
+                channel = None
+            finally:
+                finished()
+            self.latency.record(self.mac_address, SDP, time.monotonic() - started)
+            events.put(("sdp", channel, None))
+
+        def start(target, *args):
+            thread = threading.Thread(target=target, args=args, name=f"spp-{target.__name__}")
+            thread.daemon = True
+            thread.start()
+
+        channel = _DEFAULT_RFCOMM_CHANNEL
+        start(attempt, channel)
+        start(lookup)
+        tried = {channel}
+        attempts = 1
+        sdp_done = False
+        error: Exception = OSError(f"Could not connect to {self.mac_address}")
+
+        while True:
+            kind, channel, value = events.get()
+            if kind == "connected":
+                with lock:
+                    settled = True
+                    losers = list(aborts.values())
+                    aborts.clear()
+                for abort in losers:
+                    with contextlib.suppress(OSError):
+                        abort()
+                # Close any other attempt that connected before we settled.
+                while not events.empty():
+                    other_kind, _, other = events.get_nowait()
+                    if other_kind == "connected":
+                        other.close()
+                return value, channel
+            if kind == "failed":
+                attempts -= 1
+                error = value
+            elif kind == "sdp":
+                sdp_done = True
+                if channel is None:
+                    if self.verbose:
+                        print("SDP lookup failed")
+                elif channel not in tried:
+                    tried.add(channel)
+                    attempts += 1
+                    start(attempt, channel)
+            if attempts == 0 and sdp_done:
+                raise error
+
+    def _open(self, channel: int, on_start=None):
+        """Create an RFCOMM socket connected to channel.
+
+        on_start, if given, is called before connecting with a function that
+        aborts the connect (see _connect_racing).
+        """
+        if self.verbose:
+            print(f"Connecting to {self.mac_address} on RFCOMM channel {channel}...")
+
+        sock = socket.socket(socket.AF_BLUETOOTH, socket.SOCK_STREAM, socket.BTPROTO_RFCOMM)
+        try:
+            if on_start is not None:
+                on_start(lambda: sock.shutdown(socket.SHUT_RDWR))
+            if self._local is not None:
+                sock.bind((self._local.address, 0))
+            sock.connect((self.mac_address, channel))
+        except BaseException:
+            sock.close()
+            raise
+        return sock
+
+    def close(self):
+        """Close the link and release the speaker. The next command will reconnect."""
+        if self._sock is not None and self.latency.enabled:
+            started = time.monotonic()
+            self._close_socket()
+            self.latency.record(self.mac_address, CLOSE, time.monotonic() - started)
+        else:
+            self._close_socket()
+        self._dropped = False
+        self._lock.release()
+
+    def _close_socket(self):
+        sock, self._sock = self._sock, None
+        if sock is not None:
+            sock.close()
+
+    def _drop_link(self):
+        """Close the socket after an error but keep the speaker's lock (it is reopened next)."""
+        if self._sock is not None:
+            self.counters.increment(self.mac_address, LINK_DROPS)
+            self._dropped = True
+        self._close_socket()
+
+    def _record_response(self, command_id: int, sent_at: float, received_at: float):
+        """Record first-byte and response latency of an exchange sent at sent_at."""
+        if self._first_byte_at is not None:
+            self.latency.record(
+                self.mac_address, FIRST_BYTE, self._first_byte_at - sent_at, command_id
+            )
+        self.latency.record(self.mac_address, RESPONSE, received_at - sent_at, command_id)
+
+    def _send(self, data: bytes):
+        """Send data, reconnecting once if the link has dropped.
+
+        Waits for the speaker's rate limiter first (see ratelimit).
+        """
+        self.connect()
+        get_rate_limiter().wait(self.mac_address)
+        try:
+            self._sock.send(data)
+        except OSError:
+            if self.verbose:
+                print("Link dropped, reconnecting...")
+            self._drop_link()
+            self.connect()
+            self._sock.send(data)
+
+    def _read_frame(self, command_id: int | None, timeout: float) -> Frame | None:
+        """Wait for the next response packet for command_id (any packet if None).
+
+        Returns as soon as a complete packet has arrived, or None after timeout.
+        Packets for other commands are discarded.
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            while (frame := self._decoder.next_frame()) is not None:
+                if command_id is None or frame.command_id == command_id:
+                    return frame
+
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or self._sock is None:
+                return None
+            try:
+                self._sock.settimeout(remaining)
+                n = self._sock.recv_into(self._decoder.recv_buffer())
+            except TimeoutError:
+                return None
+            except OSError:
+                # Link is gone — drop it so the next command reconnects.
+                self._drop_link()
+                return None
+            if not n:
+                self._drop_link()
+                return None
+            if self._first_byte_at is None:
+                self._first_byte_at = time.monotonic()
+            self._decoder.commit(n)
+
+    def send(self, command: bytes) -> Frame | None:
+        """Send one command packet and return the speaker's response, if any.
+
+        Many commands are never answered, so a missing response here does not
+        count as a timeout for pacing.
+        """
+        self._decoder.clear()
+        self._first_byte_at = None
+        self._send(command)
+        sent_at = time.monotonic()
+        frame = self._read_frame(None, timeout=self.pacing.timeout)
+        if frame is not None:
+            received_at = time.monotonic()
+            self.pacing.observe(received_at - sent_at)
+            if self.latency.enabled:
+                self._record_response(frame.command_id, sent_at, received_at)
+        return frame
+
+    def send_nowait(self, command: bytes) -> float:
+        """Send one command packet without waiting for the response.
+
+        Collect responses with read_response(). Several packets may go out
+        before reading; the first of them drops bytes left over from earlier
+        exchanges. Waits for the rate limiter like every send. Returns the
+        time.monotonic() at which the packet went out.
+        """
+        if not self._awaiting:
+            self._decoder.clear()
+            self._first_byte_at = None
+        self._send(command)
+        sent_at = time.monotonic()
+        self._awaiting.append((command[2] if len(command) > 2 else None, sent_at))
+        return sent_at
+
+    def read_response(
+        self, command_id: int | None = None, timeout: float | None = None
+    ) -> Frame | None:
+        """Wait for the response to a packet sent with send_nowait().
+
+        Waits for command_id's response (the next packet if None), up to
+        timeout (the pacer's if None). An answer feeds the pacer and the
+        latency recorder. Returns None on timeout or if the link drops; the
+        packets still unanswered are then given up on.
+        """
+        frame = self._read_frame(command_id, self.pacing.timeout if timeout is None else timeout)
+        if frame is None:
+            self._awaiting.clear()
+            return None
+        received_at = time.monotonic()
+        for i, (awaited, sent_at) in enumerate(self._awaiting):
+            if awaited == frame.command_id:
+                del self._awaiting[i]
+                self.pacing.observe(received_at - sent_at)
+                if self.latency.enabled:
+                    self._record_response(frame.command_id, sent_at, received_at)
+                break
+        return frame
+
+    def _exchange(self, command_id: int, timeout: float | None) -> Frame | None:
+        """Send one query and wait for its response, feeding the pacer."""
+        # Leftovers of an earlier exchange (a corrupt length byte) must not
+        # swallow this response.
+        self._decoder.clear()
+        self._first_byte_at = None
+        self._send(bytes([0x02, 0x01, command_id]))
+        sent_at = time.monotonic()
+        frame = self._read_frame(command_id, self.pacing.timeout if timeout is None else timeout)
+        if frame is not None:
+            received_at = time.monotonic()
+            self.pacing.observe(received_at - sent_at)
+            if self.latency.enabled:
+                self._record_response(command_id, sent_at, received_at)
+        elif self.connected:
+            self.pacing.timed_out()
+        return frame
+
+    def query(
+        self,
+        command_ids: list[int],
+        window: int = 1,
+        timeout: float | None = None,
+    ) -> dict[int, int | None]:
+        """Query LWACP values over this link.
+
+        With window=1, each query is sent once the previous response has
+        arrived and the speaker's pacing gap has passed. With window>1, up to
+        `window` queries are sent back to back and responses are matched by
+        command id (see _query_pipelined). Either way the speaker's rate
+        limiter paces the sends. timeout defaults to the recv timeout the
+        pacer has learned for this speaker (see pacing).
+
+        Returns a dict mapping command_id -> value (or None on failure).
+        """
+        results = {cid: None for cid in command_ids}
+        if not command_ids:
+            return results
+
+        try:
+            if not self.connected:
+                self.connect()
+                time.sleep(self.pacing.gap)
+
+            if window > 1:
+                self._query_pipelined(results, window, timeout)
+                return results
+
+            for i, command_id in enumerate(command_ids):
+                if i:
+                    time.sleep(self.pacing.gap)
+                frame = self._exchange(command_id, timeout)
+                if frame is not None and frame.params:
+                    results[command_id] = frame.params[0]
+        except OSError:
+            pass  # keep whatever was read before the link failed
+        return results
+
+    def _query_pipelined(self, results: dict[int, int | None], window: int, timeout: float | None):
+        """Send queries back to back with at most `window` awaiting a response.
+
+        A background reader decodes response packets and resolves the oldest
+        pending future for that command id. It stops as soon as the last
+        query's response is in, or after `timeout` of silence once everything
+        is sent. A query that gets no response within `timeout` (the pacer's
+        timeout if None) is given up on and frees its slot. Fills `results`.
+        """
+        if timeout is None:
+            timeout = self.pacing.timeout
+        # The reader works on this socket only; a drop is handled here after it stops.
+        sock = self._sock
+        sock.settimeout(timeout)
+        pending: dict[int, deque[Future]] = defaultdict(deque)
+        lock = threading.Lock()
+        stop = threading.Event()
+        # Set under lock once the last query is queued (or sending gave up).
+        sent_all = threading.Event()
+        broken = threading.Event()
+        futures: dict[Future, int] = {}
+        sent_at: dict[Future, float] = {}
+
+        def resolve(frame: Frame):
+            with lock:
+                queue = pending.get(frame.command_id)
+                future = queue.popleft() if queue else None
+            if future is not None:
+                rtt = time.monotonic() - sent_at[future]
+                self.pacing.observe(rtt)
+                # Responses overlap here, so there is no first byte of one's own.
+                self.latency.record(self.mac_address, RESPONSE, rtt, frame.command_id)
+                future.set_result(frame)
+
+        def reader():
+            try:
+                while True:
+                    while (frame := self._decoder.next_frame()) is not None:
+                        resolve(frame)
+                    with lock:
+                        if sent_all.is_set() and not any(pending.values()):
+                            return
+                    try:
+                        n = sock.recv_into(self._decoder.recv_buffer())
+                    except TimeoutError:
+                        if sent_all.is_set():
+                            return  # whatever is still pending has timed out
+                        continue
+                    except OSError:
+                        n = 0
+                    if not n:
+                        broken.set()
+                        return
+                    self._decoder.commit(n)
+            finally:
+                # Fail everything still waiting so the sender returns now.
+                with lock:
+                    stop.set()
+                    for queue in pending.values():
+                        for future in queue:
+                            future.cancel()
+                    pending.clear()
+
+        thread = threading.Thread(target=reader, name=f"spp-reader-{self.mac_address}")
+        thread.daemon = True
+        thread.start()
+
+        in_flight: set[Future] = set()
+        last = len(results) - 1
+        try:
+            for i, command_id in enumerate(results):
+                while len(in_flight) >= window:
+                    done, in_flight = wait(in_flight, timeout=timeout, return_when=FIRST_COMPLETED)
+                    if not done:
+                        in_flight = set()  # all outstanding queries timed out
+
+                get_rate_limiter().wait(self.mac_address)
+                future = Future()
+                sent_at[future] = time.monotonic()
+                with lock:
+                    if stop.is_set():
+                        break  # reader saw the link drop
+                    pending[command_id].append(future)
+                    if i == last:
+                        sent_all.set()
+                futures[future] = command_id
+                in_flight.add(future)
+                try:
+                    sock.send(bytes([0x02, 0x01, command_id]))
+                except OSError:
+                    broken.set()
+                    # The link is dropped anyway; wake the reader instead of letting it time out.
+                    with contextlib.suppress(OSError):
+                        sock.shutdown(socket.SHUT_RDWR)
+                    break
+
+            with lock:
+                sent_all.set()
+            wait(in_flight, timeout=timeout)
+            if not broken.is_set() and not all(future.done() for future in futures):
+                self.pacing.timed_out()  # one backoff per batch, as for a TCP RTO
+        finally:
+            with lock:
+                sent_all.set()
+            thread.join()
+            if broken.is_set():
+                self._drop_link()
+
+        for future, command_id in futures.items():
+            if future.done() and not future.cancelled():
+                frame = future.result()
+                if frame.params:
+                    results[command_id] = frame.params[0]
+
+
+def send_spp_command(
+    mac_address: str,
+    command: bytes,
+    verbose: bool = True,
+    session: SppSession | None = None,
+):
     """
     Send a command to the UE Mini Boom over Bluetooth SPP (RFCOMM).
 
     Uses Python's native AF_BLUETOOTH socket (Linux kernel support).
     Falls back to pybluez if native sockets are unavailable.
+
+    Pass an open SppSession to reuse its link instead of connecting for this
+    command alone.
     """
     if not hasattr(socket, "AF_BLUETOOTH"):
         # Fallback: try pybluez
         return _send_spp_pybluez(mac_address, command, verbose)
 
-    channel = _find_rfcomm_channel(mac_address)
-    if channel is None:
-        if verbose:
-            print(f"sdptool lookup failed, using default channel {_DEFAULT_RFCOMM_CHANNEL}")
-        channel = _DEFAULT_RFCOMM_CHANNEL
-
-    if verbose:
-        print(f"Connecting to {mac_address} on RFCOMM channel {channel}...")
+    owned = session is None
+    if owned:
+        session = SppSession(mac_address, verbose=verbose)
 
-    sock = None
     try:
-        sock = socket.socket(socket.AF_BLUETOOTH, socket.SOCK_STREAM, socket.BTPROTO_RFCOMM)
-        sock.connect((mac_address, channel))
+        session.connect()
 
         if verbose:
-            hex_str = " ".join(f"{b:02X}" for b in command)
-            print(f"Sending: {hex_str}")
+            print(f"Sending: {_hex(command)}")
 
-        sock.send(command)
-        time.sleep(0.3)
-
-        try:
-            sock.settimeout(1.0)
-            response = sock.recv(1024)
-            if verbose and response:
-                hex_resp = " ".join(f"{b:02X}" for b in response)
-                print(f"Response: {hex_resp}")
-        except (TimeoutError, OSError):
-            pass
+        response = session.send(command)
+        if verbose and response is not None:
+            print(f"Response: {_hex(response.to_bytes())}")
 
         if verbose:
             print("Command sent successfully.")
@@ -80,8 +662,8 @@ def send_spp_command(mac_address: str, command: bytes, verbose: bool = True):
         print(f"ERROR: Could not connect — {e}")
         return False
     finally:
-        if sock is not None:
-            sock.close()
+        if owned:
+            session.close()
 
 
 def _send_spp_pybluez(mac_address: str, command: bytes, verbose: bool = True):
@@ -97,7 +679,10 @@ def _send_spp_pybluez(mac_address: str, command: bytes, verbose: bool = True):
     if verbose:
         print(f"Searching for SPP service on {mac_address}...")
 
+    latency = get_latency_recorder()
+    started = time.monotonic()
     service_matches = find_service(uuid=SPP_UUID, address=mac_address)
+    latency.record(mac_address, SDP, time.monotonic() - started)
 
     if not service_matches:
         print(f"ERROR: No SPP service found on {mac_address}")
@@ -109,23 +694,39 @@ def _send_spp_pybluez(mac_address: str, command: bytes, verbose: bool = True):
         print(f"Found service: {match['name']} on port {match['port']}")
 
     sock = None
+    lock = SpeakerLock(mac_address)
     try:
+        lock.acquire()
         sock = BluetoothSocket(RFCOMM)
-        sock.connect((match["host"], match["port"]))
+        started = time.monotonic()
+        try:
+            sock.connect((match["host"], match["port"]))
+        except Exception:
+            get_link_counters().increment(mac_address, CONNECT_ERRORS)
+            raise
+        latency.record(mac_address, CONNECT, time.monotonic() - started)
+        get_link_counters().increment(mac_address, CONNECTS)
 
         if verbose:
-            hex_str = " ".join(f"{b:02X}" for b in command)
-            print(f"Sending: {hex_str}")
+            print(f"Sending: {_hex(command)}")
 
+        get_rate_limiter().wait(mac_address)
+        pacing = get_pacer().for_speaker(mac_address)
         sock.send(command)
-        time.sleep(0.3)
+        sent_at = time.monotonic()
+        time.sleep(pacing.gap)
 
         try:
-            sock.settimeout(1.0)
+            sock.settimeout(pacing.timeout)
             response = sock.recv(1024)
+            if response:
+                # One read after a fixed gap: first byte and response coincide.
+                elapsed = time.monotonic() - sent_at
+                command_id = command[2] if len(command) > 2 else None
+                latency.record(mac_address, FIRST_BYTE, elapsed, command_id)
+                latency.record(mac_address, RESPONSE, elapsed, command_id)
             if verbose and response:
-                hex_resp = " ".join(f"{b:02X}" for b in response)
-                print(f"Response: {hex_resp}")
+                print(f"Response: {_hex(response)}")
         except Exception:
             pass
 
@@ -138,53 +739,48 @@ def _send_spp_pybluez(mac_address: str, command: bytes, verbose: bool = True):
         return False
     finally:
         if sock is not None:
+            started = time.monotonic()
             sock.close()
+            latency.record(mac_address, CLOSE, time.monotonic() - started)
+        lock.release()
 
 
-def query_spp_values(mac_address: str, command_ids: list[int]) -> dict[int, int | None]:
+def query_spp_values(
+    mac_address: str,
+    command_ids: list[int],
+    session: SppSession | None = None,
+    window: int = 1,
+) -> dict[int, int | None]:
     """Query multiple LWACP values in a single RFCOMM connection.
 
-    Sends each command with a delay between them to avoid overwhelming the speaker.
+    By default, sends each command once the previous one has been answered.
+    Set window>1 to pipeline up to that many queries at once, so reading N
+    values takes a round trip or two instead of N. The speaker's rate limiter
+    keeps either mode within safe throughput.
+
     Returns a dict mapping command_id -> value (or None on failure).
+    Pass an open SppSession to reuse its link.
     """
     results = {cid: None for cid in command_ids}
 
     if not hasattr(socket, "AF_BLUETOOTH") or not command_ids:
         return results
 
-    channel = _find_rfcomm_channel(mac_address)
-    if channel is None:
-        channel = _DEFAULT_RFCOMM_CHANNEL
-
-    sock = None
+    owned = session is None
+    if owned:
+        session = SppSession(mac_address)
     try:
-        sock = socket.socket(socket.AF_BLUETOOTH, socket.SOCK_STREAM, socket.BTPROTO_RFCOMM)
-        sock.connect((mac_address, channel))
-        time.sleep(0.3)
-
-        for command_id in command_ids:
-            query = bytes([0x02, 0x01, command_id])
-            sock.send(query)
-            time.sleep(1.0)  # 1s delay between queries — safe pacing
-            try:
-                sock.settimeout(2.0)
-                resp = sock.recv(1024)
-                for i in range(len(resp) - 1):
-                    if resp[i] == command_id:
-                        results[command_id] = resp[i + 1]
-                        break
-            except (TimeoutError, OSError):
-                pass
+        results = session.query(command_ids, window=window)
     except Exception:
         pass
     finally:
-        if sock is not None:
-            sock.close()
+        if owned:
+            session.close()
     return results
 
 
-def set_speaker_name(mac_address: str, name: str):
+def set_speaker_name(mac_address: str, name: str, session: SppSession | None = None):
     """Set the speaker's display name via SPP."""
     name_bytes = name.encode("utf-8")[:32]  # Max 32 bytes
     cmd = build_spp_command(UECommand.SET_NAME, *name_bytes)
-    return send_spp_command(mac_address, cmd)
+    return send_spp_command(mac_address, cmd, session=session)
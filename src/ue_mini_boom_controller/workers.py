@@ -0,0 +1,325 @@
+"""One worker process per Bluetooth adapter, fed through multiprocessing queues.
+
+A single process serialises its Bluetooth work on blocking connects and query
+pacing, so it cannot keep several adapters busy. Supervisor starts a worker
+per adapter; each worker owns the SppSessions of the speakers routed to it and
+works through its own request queue, with requests for different speakers
+running concurrently on a thread pool. Replies come back on one shared queue
+and resolve the caller's Future. A worker that dies is restarted, and the
+requests it was holding fail with WorkerError rather than being replayed,
+since a command may already have reached the speaker.
+
+    with Supervisor() as supervisor:
+        supervisor.send_spp_command(mac, COMMANDS["battery_announce"])
+        supervisor.query_spp_values(mac, [UECommand.EQ_PRESET])
+"""
+
+import itertools
+import multiprocessing
+import threading
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from .adapters import get_adapter_pool
+from .fleet import DEFAULT_CONCURRENCY
+from .spp import SppSession
+
+# Worker name used when the host has no more than one adapter.
+DEFAULT_WORKER = "default"
+
+# How often the supervisor checks for dead workers (seconds).
+_WATCH_INTERVAL = 0.5
+
+
+class WorkerError(Exception):
+    """A request failed inside a worker, or the worker died while holding it."""
+
+
+def _worker_main(
+    adapter: str | None,
+    requests,
+    replies,
+    session_factory,
+    concurrency: int = DEFAULT_CONCURRENCY,
+):
+    """Worker process: serve (request_id, op, mac, payload) requests until None.
+
+    Requests for different speakers run on up to `concurrency` threads; each
+    speaker's requests run one at a time, in the order they arrived.
+    """
+    sessions = {}
+    # Requests queued behind the running one for each busy speaker.
+    backlog: dict[str, deque] = {}
+    lock = threading.Lock()
+    idle = threading.Condition(lock)
+    pool = ThreadPoolExecutor(concurrency, thread_name_prefix="ueboom-worker")
+
+    def session_for(mac_address: str):
+        session = sessions.get(mac_address)
+        if session is None:
+            session = sessions[mac_address] = session_factory(mac_address, adapter=adapter)
+        return session
+
+    def handle(request):
+        request_id, op, mac_address, payload = request
+        try:
+            if op == "send":
+                frame = session_for(mac_address).send(payload)
+                result = frame.to_bytes() if frame is not None else None
+            elif op == "query":
+                command_ids, window = payload
+                result = session_for(mac_address).query(command_ids, window=window)
+            elif op == "close":
+                session = sessions.pop(mac_address, None)
+                if session is not None:
+                    session.close()
+                result = None
+            else:
+                raise ValueError(f"unknown worker request {op!r}")
+        except Exception as e:
+            replies.put((request_id, False, f"{type(e).__name__}: {e}"))
+        else:
+            replies.put((request_id, True, result))
+        finally:
+            key = mac_address.upper()
+            with lock:
+                waiting = backlog[key]
+                following = waiting.popleft() if waiting else None
+                if following is None:
+                    del backlog[key]
+                    idle.notify_all()
+            if following is not None:
+                pool.submit(handle, following)
+
+    try:
+        while True:
+            request = requests.get()
+            if request is None:
+                break
+            key = request[2].upper()
+            with lock:
+                if key in backlog:
+                    backlog[key].append(request)
+                    continue
+                backlog[key] = deque()
+            pool.submit(handle, request)
+        with lock:
+            while backlog:
+                idle.wait()
+    finally:
+        pool.shutdown(wait=True)
+        for session in sessions.values():
+            session.close()
+
+
+class _Worker:
+    def __init__(self, name: str, adapter: str | None):
+        self.name = name
+        self.adapter = adapter
+        self.process = None
+        self.requests = None
+        self.in_flight: set[int] = set()
+        self.restarts = 0
+
+
+class Supervisor:
+    """Routes SPP requests to per-adapter worker processes.
+
+    adapters defaults to the adapters AdapterPool knows; with one or none a
+    single worker uses the default adapter. session_factory(mac, adapter=...)
+    builds the per-speaker session inside a worker and must be importable by
+    name (it is passed to the child process). Each worker talks to up to
+    `concurrency` of its speakers at once.
+    """
+
+    def __init__(
+        self,
+        adapters: list[str] | None = None,
+        session_factory=SppSession,
+        start_method: str = "spawn",
+        concurrency: int = DEFAULT_CONCURRENCY,
+    ):
+        if adapters is None:
+            known = get_adapter_pool().adapters()
+            adapters = [a.name for a in known] if len(known) > 1 else []
+        self._context = multiprocessing.get_context(start_method)
+        self._session_factory = session_factory
+        self.concurrency = concurrency
+        self._workers = {name: _Worker(name, name) for name in adapters}
+        if not self._workers:
+            self._workers[DEFAULT_WORKER] = _Worker(DEFAULT_WORKER, None)
+        self._routes: dict[str, str] = {}
+        self._futures: dict[int, Future] = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        # Held while a worker process starts, so stop() never races a restart.
+        self._spawning = threading.Lock()
+        self._replies = None
+        self._threads = []
+        self._running = False
+        self._stopping = threading.Event()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    @property
+    def workers(self) -> list[str]:
+        return list(self._workers)
+
+    @property
+    def restarts(self) -> dict[str, int]:
+        """How often each worker has been restarted."""
+        return {name: worker.restarts for name, worker in self._workers.items()}
+
+    def start(self):
+        if self._running:
+            return
+        self._running = True
+        self._stopping.clear()
+        self._replies = self._context.Queue()
+        for worker in self._workers.values():
+            worker.requests = self._context.Queue()
+            self._spawn(worker)
+        for target in (self._collect, self._watch):
+            thread = threading.Thread(target=target, name=f"supervisor-{target.__name__}")
+            thread.daemon = True
+            thread.start()
+            self._threads.append(thread)
+
+    def _spawn(self, worker: _Worker):
+        worker.process = self._context.Process(
+            target=_worker_main,
+            args=(
+                worker.adapter,
+                worker.requests,
+                self._replies,
+                self._session_factory,
+                self.concurrency,
+            ),
+            name=f"ueboom-worker-{worker.name}",
+            daemon=True,
+        )
+        worker.process.start()
+
+    def stop(self, timeout: float = 5.0):
+        """Ask every worker to finish its queue and exit; fail what is left."""
+        if not self._running:
+            return
+        with self._lock:
+            self._running = False
+        self._stopping.set()
+        with self._spawning:
+            for worker in self._workers.values():
+                worker.requests.put(None)
+            for worker in self._workers.values():
+                worker.process.join(timeout)
+                if worker.process.is_alive():
+                    worker.process.kill()
+                    worker.process.join()
+        self._replies.put(None)  # wake the collector
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+        with self._lock:
+            futures, self._futures = self._futures, {}
+        for future in futures.values():
+            if not future.done():
+                future.set_exception(WorkerError("supervisor stopped"))
+
+    def _collect(self):
+        while True:
+            reply = self._replies.get()
+            if reply is None:
+                return
+            request_id, ok, result = reply
+            with self._lock:
+                future = self._futures.pop(request_id, None)
+                for worker in self._workers.values():
+                    worker.in_flight.discard(request_id)
+            if future is None or future.done():
+                continue
+            if ok:
+                future.set_result(result)
+            else:
+                future.set_exception(WorkerError(result))
+
+    def _watch(self):
+        while not self._stopping.wait(_WATCH_INTERVAL):
+            for worker in self._workers.values():
+                if not worker.process.is_alive():
+                    self._restart(worker)
+
+    def _restart(self, worker: _Worker):
+        exitcode = worker.process.exitcode
+        with self._lock:
+            if not self._running:
+                return
+            lost = [self._futures.pop(rid, None) for rid in worker.in_flight]
+            worker.in_flight.clear()
+            worker.restarts += 1
+            # Requests submitted from now on wait here for the replacement.
+            worker.requests = self._context.Queue()
+        # Starting a spawn-method process takes a whole interpreter start-up;
+        # submit() and the collector must not wait for it.
+        with self._spawning:
+            if self._running:
+                self._spawn(worker)
+        for future in lost:
+            if future is not None and not future.done():
+                future.set_exception(WorkerError(f"worker {worker.name} died (exit {exitcode})"))
+
+    def route(self, mac_address: str) -> str:
+        """The worker that owns mac_address; chosen on first use, then sticky."""
+        key = mac_address.upper()
+        with self._lock:
+            name = self._routes.get(key)
+            if name is not None:
+                return name
+        chosen = None
+        if len(self._workers) > 1:
+            adapter = get_adapter_pool().select(mac_address)
+            if adapter is not None and adapter.name in self._workers:
+                chosen = adapter.name
+        with self._lock:
+            if chosen is None:
+                # Least requests routed so far.
+                owned = {name: 0 for name in self._workers}
+                for name in self._routes.values():
+                    owned[name] += 1
+                chosen = min(owned, key=lambda name: (owned[name], name))
+            return self._routes.setdefault(key, chosen)
+
+    def submit(self, op: str, mac_address: str, payload=None) -> Future:
+        """Queue a request on the speaker's worker; returns a Future for its result."""
+        if not self._running:
+            raise WorkerError("supervisor is not running")
+        worker = self._workers[self.route(mac_address)]
+        future = Future()
+        request_id = next(self._ids)
+        with self._lock:
+            self._futures[request_id] = future
+            worker.in_flight.add(request_id)
+            worker.requests.put((request_id, op, mac_address, payload))
+        return future
+
+    def send_spp_command(self, mac_address: str, command: bytes, timeout: float | None = None):
+        """Send a command through the speaker's worker; returns the response packet or None."""
+        return self.submit("send", mac_address, command).result(timeout)
+
+    def query_spp_values(
+        self,
+        mac_address: str,
+        command_ids: list[int],
+        window: int = 1,
+        timeout: float | None = None,
+    ) -> dict[int, int | None]:
+        """Query LWACP values through the speaker's worker (see spp.query_spp_values)."""
+        return self.submit("query", mac_address, (list(command_ids), window)).result(timeout)
+
+    def close_session(self, mac_address: str):
+        """Drop the worker's link to a speaker."""
+        self.submit("close", mac_address).result()
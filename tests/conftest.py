@@ -0,0 +1,149 @@
+"""Shared fixtures: keep every test away from real hardware and the user's files."""
+
+import shutil
+import subprocess
+
+import pytest
+
+from ue_mini_boom_controller import (
+    adapters,
+    channel_cache,
+    dbus,
+    latency,
+    locks,
+    metrics,
+    pacing,
+    profiles,
+    ratelimit,
+    sdp,
+)
+
+_BUS_CONFIG = """<!DOCTYPE busconfig PUBLIC "-//freedesktop//DTD D-Bus Bus Configuration 1.0//EN"
+ "http://www.freedesktop.org/standards/dbus/1.0/busconfig.dtd">
+<busconfig>
+  <type>system</type>
+  <listen>unix:path={socket}</listen>
+  <auth>EXTERNAL</auth>
+  <policy context="default">
+    <allow user="*"/>
+    <allow own="*"/>
+    <allow send_destination="*"/>
+    <allow receive_sender="*"/>
+  </policy>
+</busconfig>
+"""
+
+
+@pytest.fixture(autouse=True)
+def _isolated_state(tmp_path, monkeypatch):
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "cache"))
+    # No ueboomd socket here, so the CLI never forwards to a daemon on the host.
+    monkeypatch.setenv("XDG_RUNTIME_DIR", str(tmp_path / "run"))
+    monkeypatch.setattr(channel_cache, "_default", None)
+    monkeypatch.setattr(adapters, "_default", None)
+    monkeypatch.setattr(adapters, "_SYSFS_BLUETOOTH", tmp_path / "sys-class-bluetooth")
+    # No test reaches the real system bus; live D-Bus tests point this at a private daemon.
+    monkeypatch.setenv("DBUS_SYSTEM_BUS_ADDRESS", f"unix:path={tmp_path / 'no-system-bus'}")
+    monkeypatch.setattr(dbus, "_system_bus", None)
+    monkeypatch.setattr(locks, "_stats", {})
+    monkeypatch.setattr(ratelimit, "_default", None)
+    monkeypatch.setattr(pacing, "_default", None)
+    monkeypatch.setattr(profiles, "_default", None)
+    monkeypatch.setattr(latency, "_default", None)
+    monkeypatch.setattr(metrics, "_default", None)
+    # Channel lookups go through the (mocked) sdptool path unless a test opts in.
+    monkeypatch.setattr(sdp, "is_available", lambda: False)
+
+
+@pytest.fixture
+def private_bus(tmp_path, monkeypatch):
+    """Address of a dbus-daemon started for this test, also used as the system bus."""
+    daemon = shutil.which("dbus-daemon")
+    if daemon is None:
+        pytest.skip("dbus-daemon not installed")
+    config = tmp_path / "bus.conf"
+    config.write_text(_BUS_CONFIG.format(socket=tmp_path / "bus.sock"))
+    proc = subprocess.Popen(
+        [daemon, f"--config-file={config}", "--nofork", "--print-address"],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+        text=True,
+    )
+    address = proc.stdout.readline().strip()
+    if not address:
+        proc.kill()
+        pytest.skip("dbus-daemon failed to start")
+    monkeypatch.setenv("DBUS_SYSTEM_BUS_ADDRESS", address)
+    yield address
+    if dbus._system_bus is not None:
+        dbus._system_bus.close()
+    proc.terminate()
+    proc.wait(timeout=5)
+    proc.stdout.close()
+
+
+def _variant(value):
+    if isinstance(value, bool):
+        return dbus.Variant("b", value)
+    if isinstance(value, int):
+        return dbus.Variant("y", value)
+    return dbus.Variant("s", value)
+
+
+class FakeBluez:
+    """org.bluez on a private bus, serving `objects` (plain values) via ObjectManager."""
+
+    def __init__(self, address: str, objects: dict):
+        self.objects = objects
+        self.bus = dbus.Connection(address)
+        self.bus.on_method_call = self._answer
+        self.bus.connect()
+        self.bus.call(
+            dbus.BUS_NAME, dbus.BUS_PATH, dbus.BUS_NAME, "RequestName", "su", ("org.bluez", 0)
+        )
+
+    def _answer(self, call):
+        if call.member == "GetManagedObjects":
+            wrapped = {
+                path: {
+                    iface: {name: _variant(v) for name, v in props.items()}
+                    for iface, props in interfaces.items()
+                }
+                for path, interfaces in self.objects.items()
+            }
+            self.bus.send_reply(call, "a{oa{sa{sv}}}", (wrapped,))
+        elif call.member == "Get":
+            iface, name = call.body
+            value = self.objects.get(call.path, {}).get(iface, {}).get(name)
+            if value is None:
+                self.bus.send_error(
+                    call, "org.freedesktop.DBus.Error.InvalidArgs", "No such property"
+                )
+            else:
+                self.bus.send_reply(call, "v", (_variant(value),))
+        else:
+            self.bus.send_error(call, "org.freedesktop.DBus.Error.UnknownMethod")
+
+    def properties_changed(self, path: str, interface: str, changed: dict):
+        self.bus.emit_signal(
+            path,
+            dbus.PROPERTIES,
+            "PropertiesChanged",
+            "sa{sv}as",
+            (interface, {k: _variant(v) for k, v in changed.items()}, []),
+        )
+
+
+@pytest.fixture
+def fake_bluez(private_bus):
+    """Factory for a FakeBluez on the private system bus."""
+    started = []
+
+    def start(objects: dict) -> FakeBluez:
+        bluez = FakeBluez(private_bus, objects)
+        started.append(bluez)
+        return bluez
+
+    yield start
+    for bluez in started:
+        bluez.bus.close()
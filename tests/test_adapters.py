@@ -0,0 +1,130 @@
+"""Tests for adapter enumeration and link balancing."""
+
+from unittest.mock import MagicMock, patch
+
+from ue_mini_boom_controller import adapters
+from ue_mini_boom_controller.adapters import (
+    Adapter,
+    AdapterPool,
+    get_adapter_pool,
+    parse_adapters,
+    parse_speaker_adapters,
+    sysfs_link_counts,
+)
+from ue_mini_boom_controller.spp import SppSession
+
+_SPEAKER = "88:C6:26:20:33:40"
+_NEW_SPEAKER = "88:C6:26:AA:BB:CC"
+
+
+def _objects(connected=()):
+    """Three dongles; the speaker is paired on hci0 and hci2, seen unpaired on hci1."""
+    objects = {
+        f"/org/bluez/hci{i}": {
+            "org.bluez.Adapter1": {"Address": f"00:1A:7D:DA:71:1{i}", "Powered": i != 3}
+        }
+        for i in range(4)
+    }
+    for i, paired in ((0, True), (1, False), (2, True)):
+        objects[f"/org/bluez/hci{i}/dev_88_C6_26_20_33_40"] = {
+            "org.bluez.Device1": {"Address": _SPEAKER, "Paired": paired}
+        }
+    for n, adapter in enumerate(connected):
+        objects[f"/org/bluez/{adapter}/dev_00_00_00_00_00_{n:02X}"] = {
+            "org.bluez.Device1": {"Address": f"00:00:00:00:00:{n:02X}", "Connected": True}
+        }
+    return objects
+
+
+def _pool(connected=()):
+    pool = AdapterPool()
+    pool.refresh(_objects(connected))
+    return pool
+
+
+class TestParsing:
+    def test_parse_adapters(self):
+        found = parse_adapters(_objects())
+        assert [a.name for a in found] == ["hci0", "hci1", "hci2", "hci3"]
+        assert found[1] == Adapter("hci1", "00:1A:7D:DA:71:11", "/org/bluez/hci1", True)
+        assert found[3].powered is False
+
+    def test_speaker_adapters_paired_first(self):
+        assert parse_speaker_adapters(_objects())[_SPEAKER] == ["hci0", "hci2", "hci1"]
+
+    def test_sysfs_link_counts(self, tmp_path):
+        for name in ("hci0", "hci1", "hci0:11", "hci0:12", "hci1:3"):
+            (tmp_path / name).mkdir()
+        assert sysfs_link_counts(tmp_path) == {"hci0": 2, "hci1": 1}
+        assert sysfs_link_counts(tmp_path / "missing") is None
+
+
+class TestSelection:
+    def test_least_loaded_paired_adapter(self):
+        pool = _pool(connected=["hci0", "hci0", "hci2"])
+        assert pool.select(_SPEAKER).name == "hci2"
+
+    def test_unknown_speaker_uses_any_powered_adapter(self):
+        pool = _pool(connected=["hci0", "hci1", "hci2"])
+        # hci3 has no links but is powered off.
+        assert pool.select(_NEW_SPEAKER).name == "hci0"
+
+    def test_live_sysfs_counts_win_over_snapshot(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(adapters, "_SYSFS_BLUETOOTH", tmp_path)
+        for name in ("hci0", "hci2", "hci2:1", "hci2:2"):
+            (tmp_path / name).mkdir()
+        pool = _pool(connected=["hci0", "hci0", "hci2"])
+        assert pool.link_counts()["hci2"] == 2
+        assert pool.select(_SPEAKER).name == "hci0"
+
+    def test_connects_in_flight_spread_out(self):
+        pool = _pool()
+        first = pool.select(_SPEAKER)
+        with pool.connecting(first):
+            second = pool.select(_SPEAKER)
+        assert {first.name, second.name} == {"hci0", "hci2"}
+
+    def test_single_adapter_keeps_default_routing(self):
+        pool = AdapterPool()
+        pool.refresh({"/org/bluez/hci0": {"org.bluez.Adapter1": {"Address": "00:1A:7D:DA:71:10"}}})
+        assert pool.select(_SPEAKER) is None
+
+    def test_no_bus_means_no_adapters(self):
+        assert get_adapter_pool().select(_SPEAKER) is None
+
+    def test_resolve(self):
+        pool = _pool()
+        assert pool.resolve("hci2").address == "00:1A:7D:DA:71:12"
+        assert pool.resolve("00:1a:7d:da:71:11").name == "hci1"
+        assert pool.resolve("hci9") is None
+        assert pool.choose(_SPEAKER, "hci1").name == "hci1"
+
+    def test_refresh_from_bus(self, fake_bluez):
+        fake_bluez(_objects(connected=["hci0"]))
+        pool = AdapterPool()
+        assert [a.name for a in pool.adapters()] == ["hci0", "hci1", "hci2", "hci3"]
+        assert pool.adapters_for(_SPEAKER) == ["hci0", "hci2", "hci1"]
+        assert pool.select(_SPEAKER).name == "hci2"
+
+
+class TestSessionBinding:
+    def _connect(self, **kwargs):
+        mock_sock = MagicMock()
+        with (
+            patch("ue_mini_boom_controller.spp.socket") as mock_socket_mod,
+            patch.object(adapters, "_default", _pool(connected=["hci0"])),
+        ):
+            mock_socket_mod.socket.return_value = mock_sock
+            with SppSession(_SPEAKER, channel=5, **kwargs) as session:
+                adapter = session._local
+        return mock_sock, adapter
+
+    def test_connect_binds_least_loaded_adapter(self):
+        mock_sock, adapter = self._connect()
+        assert adapter.name == "hci2"
+        mock_sock.bind.assert_called_once_with(("00:1A:7D:DA:71:12", 0))
+        mock_sock.connect.assert_called_once_with((_SPEAKER, 5))
+
+    def test_caller_chosen_adapter(self):
+        mock_sock, _ = self._connect(adapter="hci1")
+        mock_sock.bind.assert_called_once_with(("00:1A:7D:DA:71:11", 0))
@@ -0,0 +1,217 @@
+"""Tests for the asyncio transport."""
+
+import asyncio
+import socket
+import sys
+import time
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from ue_mini_boom_controller import aio
+from ue_mini_boom_controller.aio import AsyncSppSession
+from ue_mini_boom_controller.channel_cache import get_channel_cache
+from ue_mini_boom_controller.protocol import COMMANDS, UECommand, build_spp_command
+from ue_mini_boom_controller.ratelimit import get_rate_limiter
+
+_MAC = "AA:BB:CC:DD:EE:FF"
+
+
+async def _fake_speaker(sock, values, reverse=False):
+    """Answer 3-byte LWACP queries on sock from a value table until EOF."""
+    loop = asyncio.get_running_loop()
+    while True:
+        data = await loop.sock_recv(sock, 3 if not reverse else 6)
+        if not data:
+            return
+        ids = [data[i + 2] for i in range(0, len(data) - 2, 3)]
+        if reverse:
+            ids.reverse()
+        reply = b"".join(build_spp_command(cid, values[cid]) for cid in ids if cid in values)
+        await loop.sock_sendall(sock, reply)
+
+
+def _linked_session():
+    """AsyncSppSession already 'connected' to the other end of a socketpair."""
+    ours, theirs = socket.socketpair()
+    ours.setblocking(False)
+    theirs.setblocking(False)
+    session = AsyncSppSession(_MAC, channel=5)
+    session._sock = ours
+    return session, theirs
+
+
+class TestSubprocess:
+    async def test_run_returns_output(self):
+        result = await aio._run([sys.executable, "-c", "print('Channel: 4')"], timeout=10)
+        assert result == (0, "Channel: 4\n")
+
+    async def test_run_timeout_kills_process(self):
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        result = await aio._run([sys.executable, "-c", "import time; time.sleep(30)"], 0.2)
+        assert result is None
+        assert loop.time() - started < 5
+
+    async def test_run_missing_binary(self):
+        assert await aio._run(["definitely-not-a-real-binary"], timeout=1) is None
+
+    async def test_find_rfcomm_channel(self):
+        with patch.object(aio, "_run", AsyncMock(return_value=(0, "  Channel: 4\n"))):
+            assert await aio.find_rfcomm_channel(_MAC) == 4
+
+    async def test_get_battery(self):
+        stdout = "method return time=1 sender=:1.5\n   variant       byte 87\n"
+        with patch.object(aio, "_run", AsyncMock(return_value=(0, stdout))):
+            assert await aio.get_battery(_MAC) == 87
+
+    async def test_get_battery_failure(self):
+        with patch.object(aio, "_run", AsyncMock(return_value=(1, ""))):
+            assert await aio.get_battery(_MAC) == -1
+
+    async def test_get_paired_ue_devices(self):
+        stdout = "Device 88:C6:26:AA:BB:CC SpeakerRight\nDevice FF:EE:DD:CC:BB:AA Headphones\n"
+        with patch.object(aio, "_run", AsyncMock(return_value=(0, stdout))):
+            assert await aio.get_paired_ue_devices() == [("88:C6:26:AA:BB:CC", "SpeakerRight")]
+
+    async def test_getters_use_managed_objects_snapshot(self):
+        stdout = (
+            '{"type":"a{oa{sa{sv}}}","data":[{"/org/bluez/hci0/dev_88_C6_26_AA_BB_CC":'
+            '{"org.bluez.Device1":{"Address":{"type":"s","data":"88:C6:26:AA:BB:CC"},'
+            '"Alias":{"type":"s","data":"SpeakerRight"},"Paired":{"type":"b","data":true}},'
+            '"org.bluez.Battery1":{"Percentage":{"type":"y","data":64}}}}]}'
+        )
+        run = AsyncMock(return_value=(0, stdout))
+        with patch.object(aio, "_run", run):
+            assert await aio.get_battery("88:c6:26:aa:bb:cc") == 64
+            assert await aio.get_paired_ue_devices() == [("88:C6:26:AA:BB:CC", "SpeakerRight")]
+        assert all(call.args[0] == aio._MANAGED_OBJECTS_COMMAND for call in run.await_args_list)
+
+
+class TestAsyncSppSession:
+    async def test_connect_default_channel_wins_over_slow_sdp(self):
+        ours, theirs = socket.socketpair()
+        mock_socket_mod = MagicMock()
+        mock_socket_mod.socket.return_value = ours
+        loop = asyncio.get_running_loop()
+        lookup_cancelled = asyncio.Event()
+
+        async def slow_lookup(mac):
+            try:
+                await asyncio.sleep(30)
+            except asyncio.CancelledError:
+                lookup_cancelled.set()
+                raise
+
+        with (
+            patch.object(aio, "socket", mock_socket_mod),
+            patch.object(aio, "find_rfcomm_channel", slow_lookup),
+            patch.object(loop, "sock_connect", AsyncMock()) as mock_connect,
+        ):
+            async with asyncio.timeout(5):
+                async with AsyncSppSession(_MAC) as session:
+                    assert session.connected
+
+        mock_connect.assert_awaited_once_with(ours, (_MAC, 5))
+        assert lookup_cancelled.is_set()
+        assert get_channel_cache().get(_MAC) == 5
+        assert ours.fileno() == -1
+        theirs.close()
+
+    async def test_connect_falls_back_to_sdp_channel(self):
+        pairs = [socket.socketpair() for _ in range(2)]
+        mock_socket_mod = MagicMock()
+        mock_socket_mod.socket.side_effect = [ours for ours, _ in pairs]
+        loop = asyncio.get_running_loop()
+
+        async def sock_connect(sock, addr):
+            if addr[1] == 5:
+                raise ConnectionRefusedError
+
+        with (
+            patch.object(aio, "socket", mock_socket_mod),
+            patch.object(aio, "find_rfcomm_channel", AsyncMock(return_value=4)),
+            patch.object(loop, "sock_connect", sock_connect),
+        ):
+            async with AsyncSppSession(_MAC) as session:
+                assert session.channel == 4
+
+        assert get_channel_cache().get(_MAC) == 4
+        for ours, theirs in pairs:
+            ours.close()
+            theirs.close()
+
+    async def test_send_returns_response(self):
+        session, speaker = _linked_session()
+        loop = asyncio.get_running_loop()
+
+        async def ack():
+            await loop.sock_recv(speaker, 16)
+            await loop.sock_sendall(speaker, build_spp_command(UECommand.BATTERY_ANNOUNCE))
+
+        task = asyncio.create_task(ack())
+        with patch.object(aio.socket, "AF_BLUETOOTH", 31, create=True):
+            ok = await aio.send_spp_command(_MAC, COMMANDS["battery_announce"], session=session)
+        await asyncio.wait_for(task, 5)
+
+        assert ok is True
+        session.close()
+        speaker.close()
+
+    async def test_sequential_query(self):
+        session, speaker = _linked_session()
+        task = asyncio.create_task(_fake_speaker(speaker, {UECommand.EQ_PRESET: 2}))
+
+        values = await session.query([UECommand.EQ_PRESET])
+
+        assert values == {UECommand.EQ_PRESET: 2}
+        session.close()
+        await asyncio.wait_for(task, 5)
+        speaker.close()
+
+    async def test_pipelined_query(self):
+        ids = [UECommand.EQ_PRESET, UECommand.SONIFICATION, UECommand.DOUBLE_UP_MODE]
+        values = {cid: i for i, cid in enumerate(ids)}
+        session, speaker = _linked_session()
+        task = asyncio.create_task(_fake_speaker(speaker, values))
+
+        results = await session.query(ids, window=3)
+
+        assert results == values
+        session.close()
+        await asyncio.wait_for(task, 5)
+        speaker.close()
+
+    async def test_pipelined_query_link_drop(self):
+        session, speaker = _linked_session()
+        speaker.close()
+
+        results = await session.query([UECommand.EQ_PRESET, UECommand.SONIFICATION], window=2)
+
+        assert results == {UECommand.EQ_PRESET: None, UECommand.SONIFICATION: None}
+        session.close()
+
+    async def test_pipelined_answer_at_the_timeout_boundary(self):
+        """A reply read in the same loop pass as the timeout must not kill the reader."""
+        get_rate_limiter().configure(None, 1)
+        session, speaker = _linked_session()
+        loop = asyncio.get_running_loop()
+        timeout = 0.05
+
+        def answer_then_stall():
+            speaker.send(build_spp_command(UECommand.EQ_PRESET, 2))
+            # Hold the loop past the deadline: the next pass sees the reply
+            # and the expired timeout together, and wakes the reader first.
+            time.sleep(timeout)
+
+        async def late_speaker():
+            await loop.sock_recv(speaker, 6)
+            loop.call_later(timeout - 0.01, answer_then_stall)
+
+        task = asyncio.create_task(late_speaker())
+        results = await session.query(
+            [UECommand.EQ_PRESET, UECommand.SONIFICATION], window=2, timeout=timeout
+        )
+
+        assert results == {UECommand.EQ_PRESET: None, UECommand.SONIFICATION: None}
+        await asyncio.wait_for(task, 5)
+        session.close()
+        speaker.close()
@@ -0,0 +1,170 @@
+"""Tests for the benchmark runner, baselines and the suite itself."""
+
+import json
+
+import pytest
+
+from ue_mini_boom_controller import ble
+from ue_mini_boom_controller.benchmarks import (
+    Result,
+    benchmark,
+    benchmarks,
+    cases,
+    compare,
+    load_baseline,
+    mann_whitney,
+    measure,
+    runner,
+    save_baseline,
+)
+
+
+@pytest.fixture
+def registry(monkeypatch):
+    """An empty benchmark registry (the suite itself is not loaded)."""
+    monkeypatch.setattr(runner, "_registry", {})
+    monkeypatch.setattr(runner, "benchmarks", _registered)
+    return runner._registry
+
+
+def _registered(patterns=None):
+    return [b for b in runner._registry.values() if not patterns or b.name in patterns]
+
+
+class TestStatistics:
+    def test_identical_samples_are_not_different(self):
+        samples = [1.0, 1.1, 0.9, 1.05, 0.95, 1.0, 1.02, 0.98]
+        assert mann_whitney(samples, samples) == 1.0
+
+    def test_separated_samples_are_different(self):
+        fast = [1.0 + i / 100 for i in range(10)]
+        slow = [2.0 + i / 100 for i in range(10)]
+        assert mann_whitney(fast, slow) < 0.001
+        assert mann_whitney(fast, slow) == mann_whitney(slow, fast)
+
+    def test_empty_samples(self):
+        assert mann_whitney([], [1.0]) == 1.0
+
+    def test_verdicts(self):
+        base = Result("x", 1, [1.0 + i / 100 for i in range(10)])
+        slower = Result("x", 1, [1.5 + i / 100 for i in range(10)])
+        faster = Result("x", 1, [0.5 + i / 100 for i in range(10)])
+        noisy = Result("x", 1, [1.0 + i / 100 for i in range(1, 11)])
+        assert compare(slower, base).verdict == "slower"
+        assert compare(faster, base).verdict == "faster"
+        assert compare(noisy, base).verdict == "same"
+        assert compare(slower, base).change == pytest.approx(0.5 / 1.045)
+
+    def test_small_significant_change_is_same(self):
+        base = Result("x", 1, [1.0 + i / 1000 for i in range(10)])
+        slightly = Result("x", 1, [1.02 + i / 1000 for i in range(10)])
+        assert compare(slightly, base).verdict == "same"
+        assert compare(slightly, base, threshold=0.01).verdict == "slower"
+
+
+class TestMeasure:
+    def test_autorange_and_samples(self, registry):
+        now = [0.0]
+        events = []
+
+        @benchmark("fake")
+        def fake():
+            """A fake benchmark."""
+            events.append("setup")
+
+            def op():
+                now[0] += 0.01
+
+            yield op
+            events.append("teardown")
+
+        [bench] = runner.benchmarks()
+        assert bench.description == "A fake benchmark."
+        result = measure(bench, repeat=3, min_time=0.05, clock=lambda: now[0])
+        assert result.number == 8
+        assert result.samples == pytest.approx([0.01] * 3)
+        assert events == ["setup", "teardown"]
+
+    def test_baseline_round_trip(self, tmp_path):
+        results = [Result("a", 4, [1e-6, 2e-6]), Result("b", 1, [0.5, 0.6])]
+        path = tmp_path / "sub" / "baseline.json"
+        save_baseline(results, path)
+        assert load_baseline(path) == {r.name: r for r in results}
+        assert json.loads(path.read_text())["python"]
+
+    def test_bad_baselines(self, tmp_path):
+        path = tmp_path / "baseline.json"
+        path.write_text("{}")
+        with pytest.raises(ValueError, match="not a benchmark baseline"):
+            load_baseline(path)
+        path.write_text(json.dumps({"version": 99, "results": {}}))
+        with pytest.raises(ValueError, match="version 99"):
+            load_baseline(path)
+
+
+class TestMain:
+    @pytest.fixture
+    def fake(self, registry):
+        @benchmark("fake")
+        def fake():
+            """Does nothing."""
+            yield lambda: None
+
+    def test_list(self, fake, capsys):
+        runner.main(["--list"])
+        assert "fake" in capsys.readouterr().out
+
+    def test_save_then_compare(self, fake, tmp_path, capsys):
+        path = tmp_path / "baseline.json"
+        runner.main(["--repeat", "3", "--min-time", "0.001", "--save", str(path)])
+        assert set(load_baseline(path)) == {"fake"}
+        runner.main(["--repeat", "3", "--min-time", "0.001", "--compare", str(path)])
+        assert "vs" in capsys.readouterr().out
+
+    def test_regression_exits_nonzero(self, fake, tmp_path, capsys):
+        path = tmp_path / "baseline.json"
+        save_baseline([Result("fake", 1, [1e-12] * 10)], path)
+        with pytest.raises(SystemExit) as exc:
+            runner.main(["--repeat", "10", "--min-time", "0.001", "--compare", str(path)])
+        assert exc.value.code == 1
+        assert "1 regression(s): fake" in capsys.readouterr().out
+
+    def test_unknown_name(self, fake, capsys):
+        with pytest.raises(SystemExit):
+            runner.main(["nothing"])
+        assert "no benchmark matches" in capsys.readouterr().out
+
+    def test_missing_baseline(self, fake, tmp_path, capsys):
+        with pytest.raises(SystemExit):
+            runner.main(["--compare", str(tmp_path / "missing.json")])
+        assert "ERROR" in capsys.readouterr().out
+
+
+class TestSuite:
+    def test_synthetic_bluez_sources_agree(self):
+        devices = cases.synthetic_devices(200)
+        found = {}
+        for source in ("dbus", "busctl", "bluetoothctl"):
+            with cases._bluez(source, devices):
+                found[source] = sorted(ble.get_paired_ue_devices())
+                status = ble.get_device_status(devices[0]["address"])
+            assert status["name"] == "UE MINI BOOM"
+            assert status["battery"] == 0
+        assert found["dbus"] == found["busctl"] == found["bluetoothctl"]
+        assert len(found["dbus"]) == sum(1 for d in devices[::5] if d["paired"])
+
+    def test_every_benchmark_runs(self):
+        suite = benchmarks()
+        assert {b.name.split(".")[0] for b in suite} == {
+            "protocol",
+            "ble",
+            "emulator",
+            "workers",
+            "metrics",
+        }
+        for bench in suite:
+            assert bench.description
+            if bench.name.startswith("ble."):
+                assert f" {cases.DEVICES} " in bench.description
+            with bench.setup() as op:
+                op()
@@ -1,14 +1,74 @@
 """Tests for BlueZ D-Bus transport and device discovery."""
 
+import json
 from unittest.mock import MagicMock, patch
 
 from ue_mini_boom_controller.ble import (
+    _MANAGED_OBJECTS_COMMAND,
+    _parse_managed_objects,
     get_battery,
     get_device_status,
+    get_managed_devices,
     get_paired_ue_devices,
     is_ue_device,
 )
 
+
+def _variant(kind, data):
+    return {"type": kind, "data": data}
+
+
+# Shape of `busctl --json=short call org.bluez / ...ObjectManager GetManagedObjects`.
+_MANAGED_OBJECTS_JSON = json.dumps(
+    {
+        "type": "a{oa{sa{sv}}}",
+        "data": [
+            {
+                "/org/bluez": {"org.bluez.AgentManager1": {}},
+                "/org/bluez/hci0": {
+                    "org.bluez.Adapter1": {"Address": _variant("s", "00:1A:7D:DA:71:13")}
+                },
+                "/org/bluez/hci0/dev_88_C6_26_20_33_40": {
+                    "org.bluez.Device1": {
+                        "Address": _variant("s", "88:C6:26:20:33:40"),
+                        "Name": _variant("s", "UE MINI BOOM"),
+                        "Alias": _variant("s", "JoretapoL"),
+                        "Paired": _variant("b", True),
+                        "Connected": _variant("b", True),
+                        "Modalias": _variant("s", "usb:v046DpBA20dFF0A"),
+                        "Adapter": _variant("o", "/org/bluez/hci0"),
+                        "UUIDs": _variant("as", ["00001101-0000-1000-8000-00805f9b34fb"]),
+                    },
+                    "org.bluez.Battery1": {"Percentage": _variant("y", 87)},
+                },
+                "/org/bluez/hci1/dev_88_C6_26_AA_BB_CC": {
+                    "org.bluez.Device1": {
+                        "Address": _variant("s", "88:C6:26:AA:BB:CC"),
+                        "Name": _variant("s", "UE MINI BOOM"),
+                        "Paired": _variant("b", False),
+                        "Connected": _variant("b", False),
+                    }
+                },
+                "/org/bluez/hci0/dev_FF_EE_DD_CC_BB_AA": {
+                    "org.bluez.Device1": {
+                        "Address": _variant("s", "FF:EE:DD:CC:BB:AA"),
+                        "Alias": _variant("s", "Some Headphones"),
+                        "Paired": _variant("b", True),
+                    }
+                },
+            }
+        ],
+    }
+)
+
+
+def _busctl_result():
+    result = MagicMock()
+    result.returncode = 0
+    result.stdout = _MANAGED_OBJECTS_JSON
+    return result
+
+
 # --- get_device_status tests ---
 
 
@@ -148,3 +208,66 @@ def test_get_paired_ue_devices_bluetoothctl_missing():
         devices = get_paired_ue_devices()
 
     assert devices == []
+
+
+# --- D-Bus ObjectManager snapshot tests ---
+
+
+def test_get_managed_devices_single_call():
+    """One busctl call should describe every device, adapter and battery."""
+    with patch("ue_mini_boom_controller.ble.subprocess.run", return_value=_busctl_result()) as run:
+        devices = get_managed_devices()
+
+    run.assert_called_once()
+    assert run.call_args[0][0] == _MANAGED_OBJECTS_COMMAND
+    assert set(devices) == {"88:C6:26:20:33:40", "88:C6:26:AA:BB:CC", "FF:EE:DD:CC:BB:AA"}
+    speaker = devices["88:C6:26:20:33:40"]
+    assert speaker["name"] == "UE MINI BOOM"
+    assert speaker["alias"] == "JoretapoL"
+    assert speaker["connected"] is True
+    assert speaker["battery"] == 87
+    assert speaker["modalias"] == "usb:v046DpBA20dFF0A"
+    assert speaker["adapter"] == "hci0"
+    assert devices["88:C6:26:AA:BB:CC"]["adapter"] == "hci1"
+
+
+def test_snapshot_backs_status_battery_and_paired():
+    with patch("ue_mini_boom_controller.ble.subprocess.run", return_value=_busctl_result()):
+        status = get_device_status("88:c6:26:20:33:40")
+        battery = get_battery("88:C6:26:20:33:40")
+        missing = get_battery("88:C6:26:AA:BB:CC")
+        paired = get_paired_ue_devices()
+
+    assert status["paired"] is True
+    assert battery == 87
+    assert missing == -1
+    assert paired == [("88:C6:26:20:33:40", "JoretapoL")]
+
+
+def test_get_managed_devices_bus_unavailable():
+    """A failing busctl call should report None so callers can fall back."""
+    failed = MagicMock(returncode=1, stdout="")
+    with patch("ue_mini_boom_controller.ble.subprocess.run", return_value=failed):
+        assert get_managed_devices() is None
+
+
+def test_speaker_paired_on_two_adapters():
+    """The adapter holding the link describes the speaker, whatever the path order."""
+
+    def device(adapter, connected, battery=None):
+        interfaces = {
+            "org.bluez.Device1": {
+                "Address": "88:C6:26:20:33:40",
+                "Adapter": f"/org/bluez/{adapter}",
+                "Paired": True,
+                "Connected": connected,
+            }
+        }
+        if battery is not None:
+            interfaces["org.bluez.Battery1"] = {"Percentage": battery}
+        return f"/org/bluez/{adapter}/dev_88_C6_26_20_33_40", interfaces
+
+    stale, live = device("hci0", False), device("hci1", True, battery=64)
+    for order in ([stale, live], [live, stale]):
+        speaker = _parse_managed_objects(dict(order))["88:C6:26:20:33:40"]
+        assert (speaker["adapter"], speaker["connected"], speaker["battery"]) == ("hci1", True, 64)
@@ -0,0 +1,108 @@
+"""Tests for pacing calibration (fake speaker, no hardware)."""
+
+import sys
+import time
+from unittest.mock import patch
+
+import pytest
+
+from ue_mini_boom_controller.calibration import calibrate
+from ue_mini_boom_controller.cli import main
+from ue_mini_boom_controller.pacing import get_pacer
+from ue_mini_boom_controller.profiles import get_profile_store
+from ue_mini_boom_controller.protocol import Frame, UECommand
+from ue_mini_boom_controller.ratelimit import get_rate_limiter
+
+MAC = "AA:BB:CC:DD:EE:FF"
+MODALIAS = "bluetooth:v000Dp1234d0100"
+
+
+class _FakeSpeaker:
+    """SppSession stand-in that drops every other answer above max_rate."""
+
+    def __init__(self, max_rate: float):
+        self.max_rate = max_rate
+        self.pacing = get_pacer().for_speaker(MAC)
+        self._answers = 0
+        self.sent = 0
+        self.closed = False
+
+    def connect(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def send_nowait(self, data):
+        assert data == bytes([0x02, 0x01, UECommand.EQ_PRESET])
+        self.sent += 1
+        if get_rate_limiter().bucket(MAC).rate <= self.max_rate or self.sent % 2:
+            self._answers += 1
+        return time.monotonic()
+
+    def read_response(self, command_id=None, timeout=None):
+        if not self._answers:
+            return None
+        self._answers -= 1
+        self.pacing.observe(0.01)
+        return Frame(command_id, b"\x01")
+
+
+@pytest.fixture(autouse=True)
+def _no_sleep():
+    with patch("ue_mini_boom_controller.calibration.time.sleep"):
+        yield
+
+
+def _status(modalias=MODALIAS):
+    return patch(
+        "ue_mini_boom_controller.calibration.get_device_status",
+        return_value={"modalias": modalias} if modalias else {},
+    )
+
+
+def test_finds_last_clean_rate_and_saves_profile():
+    steps = []
+    with _status():
+        profile = calibrate(
+            MAC, rates=(2, 4, 8, 16), rounds=2, session=_FakeSpeaker(4), on_step=steps.append
+        )
+    assert [s.rate for s in steps] == [2, 4, 8]
+    assert [s.clean for s in steps] == [True, True, False]
+    assert steps[0].sent == 8 and steps[0].answered == 8
+    assert (profile.modalias, profile.rate, profile.burst) == (MODALIAS, 4, 4)
+    assert get_profile_store().get(MODALIAS) == profile
+    assert get_profile_store().for_speaker(MAC) == profile
+    # The limiter keeps the calibrated rate for this speaker.
+    assert get_rate_limiter().bucket(MAC).rate == 4
+
+
+def test_nothing_saved_when_slowest_rate_drops():
+    with _status():
+        assert calibrate(MAC, rates=(8, 16), rounds=1, session=_FakeSpeaker(2)) is None
+    assert get_profile_store().get(MODALIAS) is None
+    assert get_rate_limiter().bucket(MAC).rate == get_rate_limiter().rate
+
+
+def test_profile_without_modalias_is_not_saved():
+    with _status(modalias=None):
+        profile = calibrate(MAC, rates=(2,), rounds=1, session=_FakeSpeaker(4))
+    assert profile.rate == 2 and profile.modalias == ""
+    assert get_profile_store().get("") is None
+
+
+def test_cli_calibrate(capsys):
+    with patch.object(sys, "argv", ["ueboom", "--mac", MAC, "--calibrate"]):
+        with patch(
+            "ue_mini_boom_controller.calibration.calibrate",
+            side_effect=lambda mac, on_step: calibrate(
+                mac, rates=(2, 4), rounds=1, session=_FakeSpeaker(2), on_step=on_step
+            ),
+        ):
+            with _status():
+                main()
+    out = capsys.readouterr().out
+    assert "2 cmd/s: 4/4 answered" in out
+    assert "responses dropping" in out
+    assert "Reliable up to 2 cmd/s (burst 4)" in out
+    assert f"Saved profile for {MODALIAS}" in out
@@ -0,0 +1,100 @@
+"""Tests for the RFCOMM channel cache."""
+
+import json
+from unittest.mock import MagicMock, patch
+
+from ue_mini_boom_controller.channel_cache import ChannelCache, get_channel_cache
+from ue_mini_boom_controller.protocol import COMMANDS
+from ue_mini_boom_controller.spp import send_spp_command
+
+_MAC = "88:C6:26:AA:BB:CC"
+
+
+class TestChannelCache:
+    def test_put_get(self, tmp_path):
+        cache = ChannelCache(tmp_path / "channels.json")
+        assert cache.get(_MAC) is None
+        cache.put(_MAC, 4)
+        assert cache.get(_MAC.lower()) == 4
+        assert (cache.hits, cache.misses) == (1, 1)
+
+    def test_persisted_across_instances(self, tmp_path):
+        path = tmp_path / "channels.json"
+        ChannelCache(path).put(_MAC, 4)
+        assert ChannelCache(path).get(_MAC) == 4
+        assert json.loads(path.read_text())[_MAC]["channel"] == 4
+
+    def test_ttl_expiry(self, tmp_path):
+        cache = ChannelCache(tmp_path / "channels.json", ttl=60)
+        with patch("ue_mini_boom_controller.channel_cache.time.time", return_value=1000.0):
+            cache.put(_MAC, 4)
+        with patch("ue_mini_boom_controller.channel_cache.time.time", return_value=1061.0):
+            assert cache.get(_MAC) is None
+
+    def test_invalidate(self, tmp_path):
+        path = tmp_path / "channels.json"
+        cache = ChannelCache(path)
+        cache.put(_MAC, 4)
+        cache.invalidate(_MAC)
+        assert cache.get(_MAC) is None
+        assert ChannelCache(path).get(_MAC) is None
+
+    def test_corrupt_file_ignored(self, tmp_path):
+        path = tmp_path / "channels.json"
+        path.write_text("{not json")
+        assert ChannelCache(path).get(_MAC) is None
+
+    def test_default_cache_under_xdg_cache_home(self, tmp_path):
+        get_channel_cache().put(_MAC, 4)
+        assert (tmp_path / "cache" / "ue-mini-boom-controller" / "channels.json").exists()
+
+
+def _channel_sockets(refused: set[int]):
+    """Mock socket module whose sockets refuse connects to the given channels."""
+    created = []
+
+    def make_socket(*args):
+        sock = MagicMock()
+        sock.recv_into.side_effect = TimeoutError
+
+        def connect(addr):
+            if addr[1] in refused:
+                raise ConnectionRefusedError(f"channel {addr[1]}")
+
+        sock.connect.side_effect = connect
+        created.append(sock)
+        return sock
+
+    mock_socket_mod = MagicMock()
+    mock_socket_mod.socket.side_effect = make_socket
+    return mock_socket_mod, created
+
+
+class TestSppUsesCache:
+    def test_second_command_skips_sdp(self):
+        mock_socket_mod, created = _channel_sockets(refused={5})
+        with (
+            patch("ue_mini_boom_controller.spp.socket", mock_socket_mod),
+            patch("ue_mini_boom_controller.spp._find_rfcomm_channel", return_value=4) as lookup,
+        ):
+            assert send_spp_command(_MAC, COMMANDS["battery_announce"], verbose=False)
+            assert send_spp_command(_MAC, COMMANDS["battery_announce"], verbose=False)
+
+        lookup.assert_called_once()
+        assert get_channel_cache().get(_MAC) == 4
+        # Second command went straight to the cached channel.
+        created[-1].connect.assert_called_once_with((_MAC, 4))
+        assert len(created) == 3
+
+    def test_failed_connect_invalidates_entry(self):
+        get_channel_cache().put(_MAC, 9)
+        mock_socket_mod, created = _channel_sockets(refused={9, 5})
+
+        with (
+            patch("ue_mini_boom_controller.spp.socket", mock_socket_mod),
+            patch("ue_mini_boom_controller.spp._find_rfcomm_channel", return_value=4),
+        ):
+            assert send_spp_command(_MAC, COMMANDS["battery_announce"], verbose=False)
+
+        created[0].connect.assert_called_once_with((_MAC, 9))
+        assert get_channel_cache().get(_MAC) == 4
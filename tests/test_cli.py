@@ -177,3 +177,66 @@ class TestCLIStereoSetup:
         captured = capsys.readouterr()
         assert "cancelled" in captured.out.lower()
         assert mock_spp.call_count == 0
+
+
+class TestCLIFleet:
+    def _result(self, mac, ok=True, error=None):
+        from ue_mini_boom_controller.fleet import SpeakerResult
+
+        return SpeakerResult(mac, ok, 0.5, error=error)
+
+    def test_all_targets_every_paired_speaker(self, capsys):
+        devices = [("88:C6:26:AA:BB:CC", "SpeakerRight"), ("88:C6:26:DD:EE:FF", "SpeakerLeft")]
+        results = [self._result(devices[0][0]), self._result(devices[1][0], False, "Host is down")]
+        argv = ["ueboom", "--all", "--command", "sound_power_on", "--jobs", "4"]
+        with patch.object(sys, "argv", argv):
+            with patch("ue_mini_boom_controller.cli.get_paired_ue_devices", return_value=devices):
+                with patch("ue_mini_boom_controller.fleet.fan_out", return_value=results) as fan:
+                    main()
+        fan.assert_called_once_with(
+            [devices[0][0], devices[1][0]], COMMANDS["sound_power_on"], concurrency=4
+        )
+        captured = capsys.readouterr()
+        assert "1/2 succeeded" in captured.out
+        assert "Host is down" in captured.out
+
+    def test_repeated_mac_with_raw(self, capsys):
+        macs = ["AA:BB:CC:DD:EE:01", "AA:BB:CC:DD:EE:02"]
+        argv = ["ueboom", "--mac", macs[0], "--mac", macs[1], "--raw", "02 01 6B"]
+        with patch.object(sys, "argv", argv):
+            with patch(
+                "ue_mini_boom_controller.fleet.fan_out",
+                return_value=[self._result(m) for m in macs],
+            ) as fan:
+                main()
+        fan.assert_called_once_with(macs, bytes([0x02, 0x01, 0x6B]), concurrency=8)
+        assert "2/2 succeeded" in capsys.readouterr().out
+
+    def test_fleet_requires_command(self, capsys):
+        with patch.object(sys, "argv", ["ueboom", "--mac", "A", "--mac", "B"]):
+            with patch("ue_mini_boom_controller.fleet.fan_out") as fan:
+                main()
+        fan.assert_not_called()
+        assert "need a command" in capsys.readouterr().out
+
+    def test_single_mac_command(self):
+        with patch.object(sys, "argv", ["ueboom", "--mac", "A", "--command", "battery_announce"]):
+            with patch("ue_mini_boom_controller.cli.send_spp_command") as send:
+                main()
+        send.assert_called_once_with("A", COMMANDS["battery_announce"])
+
+    def test_sync_reports_skew(self, capsys):
+        from ue_mini_boom_controller.fleet import SyncReport
+
+        macs = ["AA:BB:CC:DD:EE:01", "AA:BB:CC:DD:EE:02"]
+        report = SyncReport([self._result(m) for m in macs], skew=0.0123)
+        argv = ["ueboom", "--mac", macs[0], "--mac", macs[1], "--command", "sound_power_on"]
+        with patch.object(sys, "argv", argv + ["--sync"]):
+            with patch(
+                "ue_mini_boom_controller.fleet.synchronized_send", return_value=report
+            ) as sync:
+                main()
+        sync.assert_called_once_with(macs, COMMANDS["sound_power_on"], concurrency=8)
+        out = capsys.readouterr().out
+        assert "Send skew: 12.30 ms (target 5 ms)" in out
+        assert "WARNING" in out
@@ -0,0 +1,371 @@
+"""Tests for ueboomd and its client."""
+
+import asyncio
+import sys
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from ue_mini_boom_controller import aio
+from ue_mini_boom_controller.cli import main
+from ue_mini_boom_controller.daemon import (
+    Daemon,
+    DaemonClient,
+    DaemonError,
+    SingleFlight,
+    connect_client,
+    socket_path,
+)
+from ue_mini_boom_controller.daemon import main as daemon_main
+from ue_mini_boom_controller.emulator import EmulatorServer, emulated_transport
+from ue_mini_boom_controller.fleet import SpeakerResult
+from ue_mini_boom_controller.protocol import Frame, UECommand, build_spp_command
+from ue_mini_boom_controller.ratelimit import get_rate_limiter
+from ue_mini_boom_controller.spp import SppSession
+
+_MAC = "88:C6:26:20:33:40"
+
+
+class _FakeSession:
+    """AsyncSppSession stand-in that records what the daemon sends."""
+
+    instances = []
+
+    def __init__(self, mac_address, verbose=False):
+        self.mac_address = mac_address
+        self.sent = []
+        self.connects = 0
+        self.closed = False
+        _FakeSession.instances.append(self)
+
+    async def connect(self):
+        if self.mac_address == "00:00:00:00:00:00":
+            raise OSError("Host is down")
+        self.connects += 1
+
+    async def send(self, command):
+        self.sent.append(command)
+        return Frame(command[2], b"\x01")
+
+    async def query(self, command_ids, window=1):
+        return {cid: 2 for cid in command_ids}
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture
+async def running(tmp_path):
+    _FakeSession.instances = []
+    path = tmp_path / "ueboomd.sock"
+    server = Daemon(path)
+    with patch.object(aio, "AsyncSppSession", _FakeSession):
+        await server.start()
+        try:
+            yield server, path
+        finally:
+            await server.close()
+
+
+async def _call(path, method, **params):
+    def call():
+        with DaemonClient(path, timeout=5) as client:
+            return client.call(method, **params)
+
+    return await asyncio.to_thread(call)
+
+
+class TestDaemon:
+    async def test_ping(self, running):
+        server, path = running
+        reply = await _call(path, "ping")
+        assert reply["sessions"] == []
+        assert oct(path.stat().st_mode & 0o777) == "0o600"
+
+    async def test_battery_and_status_without_signals(self, running):
+        _, path = running
+        with (
+            patch.object(aio, "get_battery", AsyncMock(return_value=87)),
+            patch.object(aio, "get_device_status", AsyncMock(return_value={"paired": True})),
+            patch.object(aio, "get_paired_ue_devices", AsyncMock(return_value=[(_MAC, "UE")])),
+        ):
+            assert await _call(path, "battery", mac=_MAC) == 87
+            assert await _call(path, "status", mac=_MAC) == {"paired": True}
+            assert await _call(path, "list") == [[_MAC, "UE"]]
+
+    async def test_reads_come_from_live_device_cache(self, running):
+        server, path = running
+        server.devices.load(
+            {
+                "/org/bluez/hci0/dev_88_C6_26_20_33_40": {
+                    "org.bluez.Device1": {"Address": _MAC, "Paired": True},
+                    "org.bluez.Battery1": {"Percentage": 64},
+                }
+            }
+        )
+        with (
+            patch.object(type(server.devices), "live", True),
+            patch.object(aio, "get_battery", AsyncMock()) as polled,
+        ):
+            assert await _call(path, "battery", mac=_MAC.lower()) == 64
+        polled.assert_not_awaited()
+
+    async def test_link_closes_after_each_request(self, running):
+        server, path = running
+        command = build_spp_command(UECommand.BATTERY_ANNOUNCE)
+        first = await _call(path, "send", mac=_MAC, command=command.hex())
+        second = await _call(path, "query", mac=_MAC, ids=[UECommand.EQ_PRESET])
+
+        assert first == {
+            "ok": True,
+            "response": build_spp_command(UECommand.BATTERY_ANNOUNCE, 1).hex(),
+        }
+        assert second == {str(UECommand.EQ_PRESET): 2}
+        first_session, second_session = _FakeSession.instances
+        assert first_session.sent == [command]
+        assert first_session.closed and second_session.closed
+        assert server._sessions == {}
+
+    async def test_queued_requests_share_the_link(self, running):
+        server, _ = running
+
+        async def request():
+            async with server._link(_MAC) as session:
+                await asyncio.sleep(0.01)
+                return session
+
+        first, second = await asyncio.gather(request(), request())
+        assert first is second
+        assert first.closed
+        assert server._sessions == {}
+
+    async def test_direct_session_right_after_a_daemon_request(self, tmp_path):
+        get_rate_limiter().configure(None, 1)
+        path = tmp_path / "ueboomd.sock"
+        server = Daemon(path)
+
+        def connect_directly():
+            with SppSession(_MAC, lock_timeout=0) as session:
+                return session.query([UECommand.EQ_PRESET])
+
+        with EmulatorServer() as emulator, emulated_transport(emulator.address):
+            emulator.add_speaker(_MAC).eq_preset = 1
+            await server.start()
+            try:
+                await _call(path, "query", mac=_MAC, ids=[UECommand.EQ_PRESET])
+                assert await asyncio.to_thread(connect_directly) == {UECommand.EQ_PRESET: 1}
+            finally:
+                await server.close()
+
+    async def test_connect_failure_is_reported(self, running):
+        _, path = running
+        result = await _call(path, "send", mac="00:00:00:00:00:00", command="020164")
+        assert result == {"ok": False, "error": "Host is down", "response": None}
+
+    async def test_bad_requests(self, running):
+        server, path = running
+        with pytest.raises(DaemonError, match="unknown method"):
+            await _call(path, "bogus")
+        with pytest.raises(DaemonError, match="mac"):
+            await _call(path, "battery")
+        assert "bad request" in (await server.handle_line(b"{not json"))["error"]
+
+    @pytest.mark.parametrize(
+        "method, params, message",
+        [
+            ("query", {"mac": _MAC, "ids": [0x64], "window": None}, "window"),
+            ("query", {"mac": _MAC, "ids": [0x64], "window": [2]}, "window"),
+            ("query", {"mac": _MAC, "ids": [0x64], "window": 0}, "window"),
+            ("query", {"mac": _MAC, "ids": [True]}, "ids"),
+            ("query", {"mac": _MAC, "ids": [0x100]}, "ids"),
+            ("query", {"mac": _MAC, "ids": [-1]}, "ids"),
+            ("latency", {"mac": 7}, "mac"),
+            ("send", {"mac": _MAC, "command": ["02"]}, "command"),
+            ("set_name", {"mac": _MAC, "name": {"first": "x"}}, "name"),
+        ],
+    )
+    async def test_wrong_parameter_types(self, running, method, params, message):
+        _, path = running
+
+        def call():
+            with DaemonClient(path, timeout=5) as client:
+                with pytest.raises(DaemonError, match=message):
+                    client.call(method, **params)
+                # The connection survives and still answers.
+                return client.call("ping")
+
+        assert (await asyncio.to_thread(call))["pid"]
+
+    async def test_handler_type_errors_are_bad_requests(self, running):
+        server, _ = running
+
+        async def broken(params):
+            return params["x"].upper()
+
+        server._handlers["broken"] = broken
+        line = b'{"id": 3, "method": "broken", "params": {"x": 1}}'
+        assert (await server.handle_line(line))["error"].startswith("bad request")
+
+    async def test_refuses_second_daemon(self, running):
+        _, path = running
+        with pytest.raises(DaemonError, match="already running"):
+            await Daemon(path).start()
+
+
+class TestCoalescing:
+    async def test_concurrent_battery_reads_share_one_bluez_read(self, running):
+        server, path = running
+
+        async def slow_battery(mac):
+            await asyncio.sleep(0.2)
+            return 87
+
+        read = AsyncMock(side_effect=slow_battery)
+        with patch.object(aio, "get_battery", read):
+            results = await asyncio.gather(*(_call(path, "battery", mac=_MAC) for _ in range(5)))
+            other = await _call(path, "battery", mac="88:C6:26:AA:BB:CC")
+
+        assert results == [87] * 5
+        assert other == 87
+        assert read.await_count == 2  # one shared read, then the other speaker
+        assert (await _call(path, "ping"))["coalesced"] == 4
+
+    async def test_concurrent_queries_share_one_rfcomm_query(self, running):
+        server, _ = running
+        calls = []
+
+        async def slow_query(self, command_ids, window=1):
+            calls.append(tuple(command_ids))
+            await asyncio.sleep(0.1)
+            return {cid: 2 for cid in command_ids}
+
+        request = b'{"id": 1, "method": "query", "params": {"mac": "%s", "ids": [%d]}}' % (
+            _MAC.encode(),
+            UECommand.EQ_PRESET,
+        )
+        with patch.object(_FakeSession, "query", slow_query):
+            replies = await asyncio.gather(*(server.handle_line(request) for _ in range(3)))
+            different = await server.handle_line(
+                request.replace(b"[%d]" % UECommand.EQ_PRESET, b"[1]")
+            )
+
+        assert all(r["result"] == {str(UECommand.EQ_PRESET): 2} for r in replies)
+        assert different["result"] == {"1": 2}
+        assert calls == [(UECommand.EQ_PRESET,), (1,)]
+
+    async def test_failure_reaches_every_waiter_then_clears(self):
+        flight = SingleFlight()
+        started = asyncio.Event()
+
+        async def failing():
+            started.set()
+            await asyncio.sleep(0.05)
+            raise OSError("link lost")
+
+        first = asyncio.ensure_future(flight.run(("battery", _MAC), failing))
+        await started.wait()
+        second = asyncio.ensure_future(flight.run(("battery", _MAC), failing))
+        results = await asyncio.gather(first, second, return_exceptions=True)
+        assert all(isinstance(r, OSError) for r in results)
+        assert await flight.run(("battery", _MAC), AsyncMock(return_value=5)) == 5
+
+    async def test_cancelled_caller_does_not_cancel_shared_read(self):
+        flight = SingleFlight()
+
+        async def read():
+            await asyncio.sleep(0.05)
+            return 42
+
+        impatient = asyncio.ensure_future(flight.run(("list",), read))
+        patient = asyncio.ensure_future(flight.run(("list",), read))
+        await asyncio.sleep(0)
+        impatient.cancel()
+        assert await patient == 42
+
+
+class TestClient:
+    def test_no_daemon(self):
+        assert connect_client() is None
+        assert socket_path().parent.name == "ue-mini-boom-controller"
+
+    def test_cli_forwards_to_running_daemon(self, capsys):
+        client = MagicMock()
+        client.get_battery.return_value = 91
+        with (
+            patch.object(sys, "argv", ["ueboom", "--mac", _MAC, "--battery"]),
+            patch("ue_mini_boom_controller.daemon.connect_client", return_value=client),
+            patch("ue_mini_boom_controller.cli.get_battery") as local,
+        ):
+            main()
+        assert "Battery: 91%" in capsys.readouterr().out
+        local.assert_not_called()
+        client.close.assert_called_once()
+
+    def test_cli_no_daemon_flag(self):
+        with (
+            patch.object(sys, "argv", ["ueboom", "--mac", _MAC, "--battery", "--no-daemon"]),
+            patch("ue_mini_boom_controller.daemon.connect_client") as connect,
+            patch("ue_mini_boom_controller.cli.get_battery", return_value=50),
+        ):
+            main()
+        connect.assert_not_called()
+
+    @pytest.mark.parametrize(
+        "argv",
+        [
+            ["--all", "--command", "sound_power_on"],
+            ["--mac", _MAC, "--mac", "88:C6:26:20:33:41", "--raw", "02016B"],
+            ["--mac", _MAC, "--calibrate"],
+        ],
+    )
+    def test_cli_runs_direct_flows_in_process(self, argv):
+        client = MagicMock()
+        with (
+            patch.object(sys, "argv", ["ueboom", *argv]),
+            patch("ue_mini_boom_controller.daemon.connect_client", return_value=client),
+            patch("ue_mini_boom_controller.cli.get_paired_ue_devices", return_value=[(_MAC, "UE")]),
+            patch(
+                "ue_mini_boom_controller.fleet.fan_out",
+                return_value=[SpeakerResult(_MAC, True, 0.1)],
+            ) as fan_out,
+            patch("ue_mini_boom_controller.calibration.calibrate", return_value=None) as calibrate,
+        ):
+            main()
+        client.call.assert_not_called()
+        client.close.assert_called_once()
+        assert fan_out.called or calibrate.called
+
+    def test_main_help_without_a_usable_runtime_dir(self, capsys):
+        unsafe = PermissionError("/tmp/ue-mini-boom-controller-0 is not a private directory")
+        with patch("ue_mini_boom_controller.daemon.runtime_dir", side_effect=unsafe):
+            with pytest.raises(SystemExit) as help_exit:
+                daemon_main(["--help"])
+            assert help_exit.value.code == 0
+            assert "--socket" in capsys.readouterr().out
+            with pytest.raises(SystemExit) as run_exit:
+                daemon_main([])
+        assert run_exit.value.code == 1
+        assert "ERROR: /tmp/ue-mini-boom-controller-0" in capsys.readouterr().out
+
+    def test_client_prints_like_local_send(self, capsys):
+        client = DaemonClient()
+        with patch.object(client, "call", return_value={"ok": True, "response": "03010c01"}):
+            assert client.send_spp_command(_MAC, bytes.fromhex("02010c"))
+        out = capsys.readouterr().out
+        assert "Sending: 02 01 0C" in out
+        assert "Response: 03 01 0C 01" in out
+
+    def test_stale_socket_is_replaced(self, tmp_path):
+        path = tmp_path / "ueboomd.sock"
+        path.touch()
+
+        async def start_and_ping():
+            server = Daemon(path)
+            await server.start()
+            try:
+                return await _call(path, "ping")
+            finally:
+                await server.close()
+
+        assert "pid" in asyncio.run(start_and_ping())
+        assert not path.exists()
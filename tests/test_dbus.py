@@ -0,0 +1,178 @@
+"""Tests for the built-in D-Bus wire client."""
+
+import threading
+
+import pytest
+
+from ue_mini_boom_controller import ble, dbus
+from ue_mini_boom_controller.dbus import (
+    METHOD_CALL,
+    Connection,
+    DBusError,
+    Message,
+    Variant,
+    decode_message,
+    encode_message,
+    marshal,
+    message_length,
+    split_signature,
+    unmarshal,
+)
+
+_SPEAKER = "/org/bluez/hci0/dev_88_C6_26_20_33_40"
+
+_OBJECTS = {
+    "/org/bluez/hci0": {"org.bluez.Adapter1": {"Address": "00:1A:7D:DA:71:13"}},
+    _SPEAKER: {
+        "org.bluez.Device1": {
+            "Address": "88:C6:26:20:33:40",
+            "Name": "UE MINI BOOM",
+            "Paired": True,
+            "Connected": True,
+        },
+        "org.bluez.Battery1": {"Percentage": 73},
+    },
+}
+
+
+class TestMarshalling:
+    def test_split_signature(self):
+        assert split_signature("sa{sv}as") == ["s", "a{sv}", "as"]
+        assert split_signature("a{oa{sa{sv}}}") == ["a{oa{sa{sv}}}"]
+        assert split_signature("(ia(yv))d") == ["(ia(yv))", "d"]
+        with pytest.raises(DBusError):
+            split_signature("a{sv")
+
+    def test_basic_types_layout(self):
+        # byte, then uint32 aligned to 4, then a string aligned to 4.
+        data = marshal("yus", (7, 0x01020304, "hi"))
+        assert data == bytes([7, 0, 0, 0, 4, 3, 2, 1, 2, 0, 0, 0]) + b"hi\0"
+
+    def test_array_of_dict_entries_aligns_to_8(self):
+        data = marshal("a{sy}", ({"a": 1},))
+        # length, padding to 8, then the entry: string "a" and byte 1.
+        assert data == bytes([7, 0, 0, 0, 0, 0, 0, 0, 1, 0, 0, 0]) + b"a\0" + bytes([1])
+
+    def test_round_trip_bluez_shapes(self):
+        value = {
+            _SPEAKER: {
+                "org.bluez.Device1": {
+                    "Address": Variant("s", "88:C6:26:20:33:40"),
+                    "Paired": Variant("b", True),
+                    "RSSI": Variant("n", -60),
+                    "UUIDs": Variant("as", ["0000110b", "00001101"]),
+                    "ManufacturerData": Variant("a{qv}", {0x046D: Variant("ay", b"\x01\x02")}),
+                },
+                "org.bluez.Battery1": {"Percentage": Variant("y", 73)},
+            }
+        }
+        (decoded,) = unmarshal("a{oa{sa{sv}}}", marshal("a{oa{sa{sv}}}", (value,)))
+        device = decoded[_SPEAKER]["org.bluez.Device1"]
+        assert device["Address"] == "88:C6:26:20:33:40"
+        assert device["Paired"] is True
+        assert device["RSSI"] == -60
+        assert device["UUIDs"] == ["0000110b", "00001101"]
+        assert device["ManufacturerData"] == {0x046D: b"\x01\x02"}
+        assert decoded[_SPEAKER]["org.bluez.Battery1"] == {"Percentage": 73}
+
+    def test_structs_and_wide_numbers(self):
+        values = ((1, "x"), -(2**40), 2**63, 1.5, "/a/b", "a{sv}")
+        assert unmarshal("(is)xtdog", marshal("(is)xtdog", values)) == values
+
+    def test_wrong_value_count(self):
+        with pytest.raises(DBusError):
+            marshal("ss", ("only one",))
+
+    def test_message_round_trip(self):
+        message = Message(
+            METHOD_CALL,
+            42,
+            path="/org/bluez/hci0",
+            interface=dbus.PROPERTIES,
+            member="Get",
+            destination="org.bluez",
+            signature="ss",
+            body=("org.bluez.Adapter1", "Powered"),
+        )
+        data = encode_message(message)
+        assert data[:4] == b"l\x01\x00\x01"
+        assert message_length(data[:16]) == len(data)
+        assert decode_message(data) == message
+
+    def test_big_endian_message(self):
+        # A Ping call to "/" as a big-endian peer would send it.
+        data = bytes.fromhex(
+            "42010001 00000000 00000001 0000001d"  # header, 29 bytes of fields
+            "01016f00 00000001 2f00 000000000000"  # PATH "/"
+            "03017300 00000004 50696e6700 000000"  # MEMBER "Ping"
+        )
+        assert message_length(data[:16]) == len(data)
+        message = decode_message(data)
+        assert (message.type, message.serial) == (METHOD_CALL, 1)
+        assert (message.path, message.member) == ("/", "Ping")
+
+
+class TestConnection:
+    def test_hello_and_bus_errors(self, private_bus):
+        with Connection(private_bus) as bus:
+            assert bus.unique_name.startswith(":")
+            names = bus.call(dbus.BUS_NAME, dbus.BUS_PATH, dbus.BUS_NAME, "ListNames")[0]
+            assert bus.unique_name in names
+            with pytest.raises(DBusError) as error:
+                bus.call(dbus.BUS_NAME, dbus.BUS_PATH, dbus.BUS_NAME, "NoSuchMethod")
+            assert error.value.name == "org.freedesktop.DBus.Error.UnknownMethod"
+        assert not bus.connected
+
+    def test_unreachable_bus(self, tmp_path):
+        with pytest.raises(OSError):
+            Connection(f"unix:path={tmp_path / 'missing'}").connect()
+
+    def test_property_get_and_managed_objects(self, fake_bluez, private_bus):
+        fake_bluez(_OBJECTS)
+        with Connection(private_bus) as bus:
+            battery = bus.get_property("org.bluez", _SPEAKER, "org.bluez.Battery1", "Percentage")
+            objects = bus.get_managed_objects("org.bluez")
+            with pytest.raises(DBusError):
+                bus.get_property("org.bluez", _SPEAKER, "org.bluez.Battery1", "Missing")
+        assert battery == 73
+        assert objects == _OBJECTS
+
+    def test_signal_match(self, fake_bluez, private_bus):
+        bluez = fake_bluez(_OBJECTS)
+        received = []
+        arrived = threading.Event()
+
+        def on_signal(message):
+            received.append(message)
+            arrived.set()
+
+        with Connection(private_bus) as bus:
+            rule = f"type='signal',sender='org.bluez',interface='{dbus.PROPERTIES}'"
+            bus.add_match(rule, on_signal)
+            bluez.properties_changed(_SPEAKER, "org.bluez.Device1", {"Connected": False})
+            assert arrived.wait(5)
+            bus.remove_match(rule, on_signal)
+
+        (message,) = received
+        assert message.path == _SPEAKER
+        assert message.member == "PropertiesChanged"
+        assert message.body == ("org.bluez.Device1", {"Connected": False}, [])
+
+    def test_pending_call_fails_when_bus_goes_away(self, private_bus):
+        bus = Connection(private_bus)
+        bus.connect()
+        bus._sock.shutdown(2)
+        with pytest.raises(OSError):
+            bus.call(dbus.BUS_NAME, dbus.BUS_PATH, dbus.BUS_NAME, "ListNames", timeout=5)
+        bus.close()
+
+
+class TestSystemBus:
+    def test_one_connection_per_process(self, private_bus):
+        assert dbus.system_bus() is dbus.system_bus()
+
+    def test_ble_reads_through_system_bus(self, fake_bluez):
+        fake_bluez(_OBJECTS)
+        assert ble.get_battery("88:c6:26:20:33:40") == 73
+        assert ble.get_device_status("88:C6:26:20:33:40")["connected"] is True
+        assert ble.get_paired_ue_devices() == [("88:C6:26:20:33:40", "UE MINI BOOM")]
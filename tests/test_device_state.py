@@ -0,0 +1,178 @@
+"""Tests for the signal-driven BlueZ device state cache."""
+
+import time
+from unittest.mock import MagicMock
+
+from ue_mini_boom_controller.dbus import DBusError
+from ue_mini_boom_controller.device_state import DeviceStateCache
+
+_SPEAKER = "/org/bluez/hci0/dev_88_C6_26_20_33_40"
+
+_OBJECTS = {
+    "/org/bluez/hci0": {"org.bluez.Adapter1": {"Address": "00:1A:7D:DA:71:13"}},
+    _SPEAKER: {
+        "org.bluez.Device1": {
+            "Address": "88:C6:26:20:33:40",
+            "Name": "UE MINI BOOM",
+            "Alias": "Kitchen",
+            "Paired": True,
+            "Connected": False,
+        },
+        "org.freedesktop.DBus.Introspectable": {},
+    },
+}
+
+
+def _seeded():
+    cache = DeviceStateCache()
+    cache.load(_OBJECTS)
+    return cache
+
+
+class TestApplySignal:
+    def test_load_tracks_devices_only(self):
+        cache = _seeded()
+        assert list(cache.devices()) == ["88:C6:26:20:33:40"]
+        assert cache.get_paired_ue_devices() == [("88:C6:26:20:33:40", "Kitchen")]
+        assert cache.get_battery("88:c6:26:20:33:40") == -1
+
+    def test_properties_changed_updates_in_place(self):
+        cache = _seeded()
+        changed = cache.apply_signal(
+            _SPEAKER,
+            "org.freedesktop.DBus.Properties",
+            "PropertiesChanged",
+            ["org.bluez.Device1", {"Connected": True, "Alias": "Patio"}, []],
+        )
+        status = cache.get_device_status("88:C6:26:20:33:40")
+        assert changed
+        assert status["connected"] is True
+        assert status["alias"] == "Patio"
+        assert cache.updates == 1
+
+    def test_invalidated_property_is_dropped(self):
+        cache = _seeded()
+        cache.apply_signal(
+            _SPEAKER,
+            "org.freedesktop.DBus.Properties",
+            "PropertiesChanged",
+            ["org.bluez.Device1", {}, ["Alias"]],
+        )
+        assert "alias" not in cache.get_device_status("88:C6:26:20:33:40")
+
+    def test_battery_interface_added_and_removed(self):
+        cache = _seeded()
+        manager = "org.freedesktop.DBus.ObjectManager"
+        cache.apply_signal(
+            "/", manager, "InterfacesAdded", [_SPEAKER, {"org.bluez.Battery1": {"Percentage": 55}}]
+        )
+        assert cache.get_battery("88:C6:26:20:33:40") == 55
+
+        cache.apply_signal(
+            _SPEAKER,
+            "org.freedesktop.DBus.Properties",
+            "PropertiesChanged",
+            ["org.bluez.Battery1", {"Percentage": 54}, []],
+        )
+        assert cache.get_battery("88:C6:26:20:33:40") == 54
+
+        cache.apply_signal("/", manager, "InterfacesRemoved", [_SPEAKER, ["org.bluez.Battery1"]])
+        assert cache.get_battery("88:C6:26:20:33:40") == -1
+
+    def test_device_added_and_removed(self):
+        cache = _seeded()
+        manager = "org.freedesktop.DBus.ObjectManager"
+        path = "/org/bluez/hci1/dev_88_C6_26_AA_BB_CC"
+        device = {"Address": "88:C6:26:AA:BB:CC", "Name": "UE MINI BOOM", "Paired": True}
+        cache.apply_signal("/", manager, "InterfacesAdded", [path, {"org.bluez.Device1": device}])
+        assert cache.get_device_status("88:C6:26:AA:BB:CC")["adapter"] == "hci1"
+
+        cache.apply_signal("/", manager, "InterfacesRemoved", [path, ["org.bluez.Device1"]])
+        assert cache.get_device_status("88:C6:26:AA:BB:CC") == {}
+
+    def test_untracked_signals_are_ignored(self):
+        cache = _seeded()
+        assert not cache.apply_signal(
+            "/org/bluez/hci0",
+            "org.freedesktop.DBus.Properties",
+            "PropertiesChanged",
+            ["org.bluez.Adapter1", {"Discovering": True}, []],
+        )
+        assert not cache.apply_signal(
+            "/org/bluez/hci0",
+            "org.freedesktop.DBus.ObjectManager",
+            "InterfacesAdded",
+            ["/org/bluez/hci0/dev_X", {"org.bluez.MediaTransport1": {}}],
+        )
+        assert cache.updates == 0
+
+    def test_link_moving_to_another_adapter(self):
+        second = "/org/bluez/hci1/dev_88_C6_26_20_33_40"
+        cache = DeviceStateCache()
+        cache.load(
+            {
+                **_OBJECTS,
+                second: {
+                    "org.bluez.Device1": {
+                        "Address": "88:C6:26:20:33:40",
+                        "Paired": True,
+                        "Connected": False,
+                    }
+                },
+            }
+        )
+        assert cache.get_device_status("88:C6:26:20:33:40")["path"] == _SPEAKER
+
+        assert cache.apply_signal(
+            second,
+            "org.freedesktop.DBus.Properties",
+            "PropertiesChanged",
+            ["org.bluez.Device1", {"Connected": True}, []],
+        )
+        status = cache.get_device_status("88:C6:26:20:33:40")
+        assert (status["path"], status["connected"]) == (second, True)
+
+        assert cache.apply_signal(
+            "/org/bluez/hci1",
+            "org.freedesktop.DBus.ObjectManager",
+            "InterfacesRemoved",
+            [second, ["org.bluez.Device1"]],
+        )
+        status = cache.get_device_status("88:C6:26:20:33:40")
+        assert (status["path"], status["connected"]) == (_SPEAKER, False)
+
+
+class TestSignalFeed:
+    def test_start_seeds_then_follows_signals(self, fake_bluez):
+        bluez = fake_bluez(_OBJECTS)
+        cache = DeviceStateCache()
+        assert cache.start()
+        assert cache.live
+        assert cache.get_device_status("88:C6:26:20:33:40")["connected"] is False
+
+        bluez.properties_changed(_SPEAKER, "org.bluez.Device1", {"Connected": True})
+        bluez.properties_changed(_SPEAKER, "org.bluez.Device1", {"Alias": "Patio"})
+        deadline = time.monotonic() + 5
+        while cache.updates < 2 and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+        status = cache.get_device_status("88:C6:26:20:33:40")
+        assert status["connected"] is True
+        assert status["alias"] == "Patio"
+
+        cache.stop()
+        assert not cache.live
+
+    def test_start_fails_without_bus(self):
+        cache = DeviceStateCache()
+        assert not cache.start()
+        assert not cache.live
+
+    def test_failed_start_removes_the_rules_it_added(self):
+        bus = MagicMock()
+        bus.add_match.side_effect = [None, DBusError("org.freedesktop.DBus.Error.LimitsExceeded")]
+        cache = DeviceStateCache()
+        assert not cache.start(bus)
+        assert not cache.live
+        first, callback = bus.add_match.call_args_list[0].args
+        bus.remove_match.assert_called_once_with(first, callback)
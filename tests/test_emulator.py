@@ -0,0 +1,147 @@
+"""Tests for the LWACP speaker emulator, driven through the real transport code."""
+
+import asyncio
+import socket
+import time
+
+import pytest
+
+from ue_mini_boom_controller import aio
+from ue_mini_boom_controller.ble import is_ue_device
+from ue_mini_boom_controller.emulator import (
+    EmulatedSpeaker,
+    EmulatorServer,
+    emulated_macs,
+    emulated_transport,
+)
+from ue_mini_boom_controller.protocol import (
+    COMMANDS,
+    Frame,
+    UECommand,
+    build_spp_command,
+)
+from ue_mini_boom_controller.spp import (
+    SppSession,
+    query_spp_values,
+    send_spp_command,
+    set_speaker_name,
+)
+
+MAC = "88:C6:26:00:00:01"
+
+
+class TestEmulatedSpeaker:
+    def test_queries_read_state(self):
+        speaker = EmulatedSpeaker(MAC)
+        speaker.eq_preset = 3
+        assert speaker.handle(Frame(UECommand.EQ_PRESET, b"")) == Frame(
+            UECommand.EQ_PRESET, b"\x03"
+        )
+        assert speaker.handle(Frame(UECommand.DOUBLE_UP_ROLE, b"")) == Frame(
+            UECommand.DOUBLE_UP_ROLE, b"\x00"
+        )
+
+    def test_settings_change_state_without_answer(self):
+        speaker = EmulatedSpeaker(MAC)
+        assert speaker.handle(Frame(UECommand.EQ_PRESET, b"\x02")) is None
+        assert speaker.handle(Frame(UECommand.SET_NAME, "Küche".encode())) is None
+        speaker.handle(Frame(UECommand.VOLUME_ADJUST, b"\x01\x03"))
+        speaker.handle(Frame(UECommand.VOLUME_ADJUST, b"\x00\x40"))
+        state = speaker.snapshot()
+        assert (state["eq_preset"], state["name"], state["volume"]) == (2, "Küche", 0)
+        assert (state["received"], state["answered"]) == (4, 0)
+
+    def test_double_up_lock_query_starts_discovery(self):
+        speaker = EmulatedSpeaker(MAC)
+        speaker.handle(Frame(UECommand.DOUBLE_UP_LOCK, b""))
+        assert speaker.discovering
+
+    def test_jitter_is_seeded(self):
+        a = EmulatedSpeaker(MAC, latency=0.05, jitter=0.02, seed=7)
+        b = EmulatedSpeaker(MAC, latency=0.05, jitter=0.02, seed=7)
+        delays = [a.delay() for _ in range(20)]
+        assert delays == [b.delay() for _ in range(20)]
+        assert all(0.03 <= d <= 0.07 for d in delays)
+        assert len(set(delays)) > 1
+
+    def test_generated_macs_look_like_ue_speakers(self):
+        macs = emulated_macs(300)
+        assert len(set(macs)) == 300
+        assert all(is_ue_device(mac, "") for mac in macs)
+
+
+@pytest.fixture
+def server():
+    with EmulatorServer() as server:
+        server.add_speaker(MAC)
+        with emulated_transport(server.address):
+            yield server
+
+
+class TestSppAgainstEmulator:
+    def test_query_and_set(self, server):
+        # A first query teaches the pacer the emulator's RTT, so unanswered
+        # settings below wait the short learned timeout.
+        assert query_spp_values(MAC, [UECommand.EQ_PRESET]) == {UECommand.EQ_PRESET: 0}
+        assert send_spp_command(MAC, build_spp_command(UECommand.EQ_PRESET, 1), verbose=False)
+        assert set_speaker_name(MAC, "Garden")
+        values = query_spp_values(MAC, [UECommand.EQ_PRESET, UECommand.DOUBLE_UP_MODE])
+        assert values == {UECommand.EQ_PRESET: 1, UECommand.DOUBLE_UP_MODE: 0}
+        assert server.speaker(MAC).name == "Garden"
+
+    def test_pipelined_query(self, server):
+        ids = [UECommand.EQ_PRESET, UECommand.DOUBLE_UP_MODE, UECommand.DOUBLE_UP_ROLE]
+        with SppSession(MAC) as session:
+            assert session.query(ids, window=3) == dict.fromkeys(ids, 0)
+        assert server.connections == 1
+
+    def test_unknown_speaker_is_refused(self, server):
+        with pytest.raises(ConnectionRefusedError):
+            SppSession("88:C6:26:FF:FF:FF", channel=5).connect()
+
+    def test_wrong_channel_is_refused(self, server):
+        with pytest.raises(ConnectionRefusedError):
+            SppSession(MAC, channel=3).connect()
+
+    def test_one_link_per_speaker(self, server):
+        with SppSession(MAC, channel=5):
+            with pytest.raises(ConnectionRefusedError):
+                # A second process would queue on the speaker lock; go under it.
+                SppSession(MAC, channel=5)._open(5)
+
+    def test_latency(self):
+        with EmulatorServer(latency=0.05) as server:
+            server.add_speaker(MAC)
+            with emulated_transport(server.address), SppSession(MAC) as session:
+                started = time.monotonic()
+                assert session.send(bytes([0x02, 0x01, UECommand.EQ_PRESET])) is not None
+                assert time.monotonic() - started >= 0.05
+
+    def test_unix_socket(self, tmp_path):
+        with EmulatorServer(tmp_path / "emu.sock", auto_create=True) as server:
+            with emulated_transport(server.address):
+                assert query_spp_values(MAC, [UECommand.EQ_PRESET]) == {UECommand.EQ_PRESET: 0}
+        assert server.speaker(MAC) is not None
+
+    def test_other_sockets_untouched(self, server):
+        from ue_mini_boom_controller import spp
+
+        with spp.socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+            assert type(sock) is socket.socket
+
+
+class TestAioAgainstEmulator:
+    async def test_many_speakers_concurrently(self):
+        macs = emulated_macs(50)
+        with EmulatorServer(latency=0.01, jitter=0.005) as server:
+            for mac in macs:
+                server.add_speaker(mac).eq_preset = 2
+            with emulated_transport(server.address):
+                results = [
+                    await aio.query_spp_values(mac, [UECommand.EQ_PRESET]) for mac in macs[:2]
+                ]
+                assert await aio.send_spp_command(macs[0], COMMANDS["battery_announce"], False)
+                results += await asyncio.gather(
+                    *(aio.query_spp_values(mac, [UECommand.EQ_PRESET]) for mac in macs[2:])
+                )
+        assert results == [{UECommand.EQ_PRESET: 2}] * 50
@@ -0,0 +1,105 @@
+"""Tests for fault injection on emulated links."""
+
+import pytest
+
+from ue_mini_boom_controller.emulator import (
+    EmulatorServer,
+    FaultInjector,
+    emulated_transport,
+)
+from ue_mini_boom_controller.pacing import get_pacer
+from ue_mini_boom_controller.protocol import UECommand
+from ue_mini_boom_controller.ratelimit import get_rate_limiter
+from ue_mini_boom_controller.spp import SppSession
+
+MAC = "88:C6:26:00:00:01"
+_IDS = [UECommand.EQ_PRESET, UECommand.DOUBLE_UP_MODE, UECommand.DOUBLE_UP_ROLE]
+_RESPONSE = bytes([0x03, 0x01, UECommand.EQ_PRESET, 0x02])
+
+
+@pytest.fixture(autouse=True)
+def _unlimited():
+    get_rate_limiter().configure(None, 1)
+
+
+def _run(faults: FaultInjector, rounds: int = 3, window: int = 1, timeout=None):
+    results = []
+    with EmulatorServer(faults=faults) as server:
+        server.add_speaker(MAC).eq_preset = 2
+        with emulated_transport(server.address), SppSession(MAC) as session:
+            for _ in range(rounds):
+                results.append(session.query(_IDS, window=window, timeout=timeout))
+    return results, server
+
+
+class TestLinkFaults:
+    def test_same_seed_same_schedule(self):
+        def schedule(seed):
+            link = FaultInjector(seed, fragment=0.5, stall=0.3, drop=0.2).for_link(MAC)
+            return [link.deliver(_RESPONSE) for _ in range(50)]
+
+        assert schedule(1) == schedule(1)
+        assert schedule(1) != schedule(2)
+
+    def test_fragments_reassemble(self):
+        faults = FaultInjector(fragment=1.0)
+        link = faults.for_link(MAC)
+        for _ in range(20):
+            delivery = link.deliver(_RESPONSE)
+            assert len(delivery.chunks) > 1
+            assert b"".join(delivery.chunks) == _RESPONSE
+        assert faults.counts() == {"fragment": 20}
+
+    def test_links_get_their_own_schedule(self):
+        faults = FaultInjector(7, drop=0.5)
+        first, second = faults.for_link(MAC), faults.for_link(MAC)
+        assert [first.deliver(_RESPONSE) for _ in range(20)] != [
+            second.deliver(_RESPONSE) for _ in range(20)
+        ]
+
+
+class TestSessionsUnderFaults:
+    def test_fragmented_responses_are_reassembled(self):
+        expected = {
+            UECommand.EQ_PRESET: 2,
+            UECommand.DOUBLE_UP_MODE: 0,
+            UECommand.DOUBLE_UP_ROLE: 0,
+        }
+        faults = FaultInjector(fragment=1.0)
+        results, _ = _run(faults, rounds=2)
+        assert results == [expected] * 2
+        results, _ = _run(FaultInjector(fragment=1.0), rounds=2, window=3)
+        assert results == [expected] * 2
+        assert faults.counts()["fragment"] == 6
+
+    def test_dropped_responses_time_out_and_back_off(self):
+        results, _ = _run(FaultInjector(drop=1.0), rounds=1, timeout=0.05)
+        assert results == [dict.fromkeys(_IDS)]
+        assert get_pacer().for_speaker(MAC).timeouts == 3
+
+    def test_stall_delays_the_response(self):
+        faults = FaultInjector(stall=1.0, max_stall=0.05)
+        results, _ = _run(faults, rounds=1)
+        assert results[0][UECommand.EQ_PRESET] == 2
+        assert faults.counts() == {"stall": 3}
+        assert all(0 <= event.detail[0] <= 0.05 for event in faults.events)
+
+    def test_session_recovers_from_reset(self):
+        faults = FaultInjector(reset=1.0)
+        with EmulatorServer(faults=faults) as server:
+            server.add_speaker(MAC).eq_preset = 2
+            with emulated_transport(server.address), SppSession(MAC) as session:
+                assert session.query([UECommand.EQ_PRESET]) == {UECommand.EQ_PRESET: None}
+                assert not session.connected
+                faults.reset = 0.0
+                assert session.query([UECommand.EQ_PRESET]) == {UECommand.EQ_PRESET: 2}
+        assert server.connections == 2
+        assert [(e.link, e.kind) for e in faults.events] == [(0, "reset")]
+
+    def test_runs_repeat_with_the_same_seed(self):
+        def events(seed):
+            faults = FaultInjector(seed, fragment=0.5, stall=0.5, max_stall=0.01)
+            _run(faults, rounds=3)
+            return faults.events
+
+        assert events(3) == events(3)
@@ -0,0 +1,124 @@
+"""Tests for parallel fan-out to several speakers."""
+
+import threading
+import time
+from unittest.mock import patch
+
+from ue_mini_boom_controller.fleet import fan_out, synchronized_send
+from ue_mini_boom_controller.protocol import COMMANDS, Frame, UECommand
+
+_MACS = [f"88:C6:26:00:00:{i:02X}" for i in range(6)]
+
+
+class _FakeSession:
+    """SppSession stand-in that records concurrency and fails for one MAC."""
+
+    lock = threading.Lock()
+    active = 0
+    peak = 0
+    sent = []
+
+    def __init__(self, mac_address):
+        self.mac_address = mac_address
+
+    def __enter__(self):
+        if self.mac_address == _MACS[2]:
+            raise ConnectionRefusedError("Connection refused")
+        with _FakeSession.lock:
+            _FakeSession.active += 1
+            _FakeSession.peak = max(_FakeSession.peak, _FakeSession.active)
+        return self
+
+    def __exit__(self, *exc):
+        with _FakeSession.lock:
+            _FakeSession.active -= 1
+
+    def send(self, command):
+        time.sleep(0.05)
+        _FakeSession.sent.append((self.mac_address, command))
+        return Frame(command[2], b"")
+
+
+def _reset():
+    _FakeSession.active = _FakeSession.peak = 0
+    _FakeSession.sent = []
+
+
+def test_results_in_order_with_failure():
+    _reset()
+    with patch("ue_mini_boom_controller.fleet.SppSession", _FakeSession):
+        results = fan_out(_MACS, COMMANDS["sound_power_on"], concurrency=3)
+
+    assert [r.mac_address for r in results] == _MACS
+    assert [r.ok for r in results] == [True, True, False, True, True, True]
+    assert "refused" in results[2].error
+    assert results[0].response == bytes([0x02, 0x01, UECommand.EMIT_SOUND])
+    assert len(_FakeSession.sent) == 5
+
+
+def test_concurrency_is_bounded():
+    _reset()
+    with patch("ue_mini_boom_controller.fleet.SppSession", _FakeSession):
+        fan_out(_MACS, COMMANDS["battery_announce"], concurrency=2)
+
+    assert 1 <= _FakeSession.peak <= 2
+
+
+def test_runs_in_parallel():
+    _reset()
+    with patch("ue_mini_boom_controller.fleet.SppSession", _FakeSession):
+        started = time.monotonic()
+        fan_out(_MACS, COMMANDS["battery_announce"], concurrency=6)
+        elapsed = time.monotonic() - started
+
+    assert elapsed < 0.05 * len(_MACS)
+
+
+def test_duplicates_and_empty():
+    _reset()
+    with patch("ue_mini_boom_controller.fleet.SppSession", _FakeSession):
+        assert fan_out([], COMMANDS["battery_announce"]) == []
+        results = fan_out([_MACS[0], _MACS[0]], COMMANDS["battery_announce"])
+    assert len(results) == 1
+
+
+class _SyncSession:
+    """SppSession stand-in for synchronized sends; records event order."""
+
+    events = []
+    lock = threading.Lock()
+
+    def __init__(self, mac_address):
+        self.mac_address = mac_address
+
+    def connect(self):
+        if self.mac_address == _MACS[1]:
+            raise TimeoutError("timed out")
+        time.sleep(0.02)
+        with _SyncSession.lock:
+            _SyncSession.events.append(("connect", self.mac_address))
+
+    def send_nowait(self, command):
+        with _SyncSession.lock:
+            _SyncSession.events.append(("send", self.mac_address))
+        return time.monotonic()
+
+    def read_response(self, command_id=None, timeout=None):
+        return None
+
+    def close(self):
+        pass
+
+
+def test_synchronized_send_releases_after_all_connects():
+    _SyncSession.events = []
+    with patch("ue_mini_boom_controller.fleet.SppSession", _SyncSession):
+        report = synchronized_send(_MACS, COMMANDS["sound_power_on"], concurrency=2)
+
+    kinds = [kind for kind, _ in _SyncSession.events]
+    assert kinds == ["connect"] * 5 + ["send"] * 5
+    assert [r.ok for r in report.results] == [True, False, True, True, True, True]
+    assert "timed out" in report.results[1].error
+    # Generous bound: a thread release on a loaded CI box, not Bluetooth timing.
+    assert 0 <= report.skew < 0.5
+    assert all(r.elapsed >= 0 for r in report.results if r.ok)
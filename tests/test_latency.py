@@ -0,0 +1,200 @@
+"""Tests for per-phase latency histograms."""
+
+import sys
+from unittest.mock import patch
+
+import pytest
+
+from ue_mini_boom_controller.aio import AsyncSppSession
+from ue_mini_boom_controller.cli import _print_latency, main
+from ue_mini_boom_controller.daemon import Daemon, DaemonClient
+from ue_mini_boom_controller.emulator import EmulatorServer, FaultInjector, emulated_transport
+from ue_mini_boom_controller.latency import (
+    CLOSE,
+    CONNECT,
+    FIRST_BYTE,
+    RESPONSE,
+    SDP,
+    Histogram,
+    LatencyRecorder,
+    LatencySummary,
+    get_latency_recorder,
+)
+from ue_mini_boom_controller.protocol import UECommand
+from ue_mini_boom_controller.ratelimit import get_rate_limiter
+from ue_mini_boom_controller.spp import SppSession
+
+MAC = "88:C6:26:00:00:01"
+_IDS = [UECommand.EQ_PRESET, UECommand.DOUBLE_UP_MODE]
+
+
+class TestHistogram:
+    def test_percentiles_are_within_one_percent_and_never_low(self):
+        histogram = Histogram()
+        values = [i / 1000 for i in range(1, 1001)]  # 1 ms .. 1 s
+        for value in values:
+            histogram.record(value)
+        for percent, exact in ((50, 0.5), (95, 0.95), (99, 0.99), (100, 1.0)):
+            assert exact <= histogram.percentile(percent) <= exact * 1.01
+        assert histogram.count == 1000
+        assert histogram.mean == pytest.approx(0.5005)
+        assert (histogram.min, histogram.max) == (1000, 1_000_000)
+
+    def test_buckets_cover_microseconds_to_minutes(self):
+        histogram = Histogram()
+        for micros in (0, 1, 255, 256, 257, 10_000, 123_456, 60_000_000, 600_000_123):
+            index = histogram._index(micros)
+            upper = histogram._upper(index)
+            assert micros <= upper <= micros * 1.008 + 1
+            assert histogram._index(upper) == index
+
+    def test_empty(self):
+        assert Histogram().percentile(99) == 0.0
+        assert Histogram().mean == 0.0
+
+    def test_merge(self):
+        a, b = Histogram(), Histogram()
+        a.record(0.001)
+        b.record(0.002)
+        b.record(0.010)
+        a.merge(b)
+        assert a.count == 3
+        assert (a.min, a.max) == (1000, 10_000)
+        assert sum(count for _, count in a.buckets()) == 3
+
+
+class TestRecorder:
+    def test_disabled_records_nothing(self):
+        recorder = LatencyRecorder()
+        recorder.record(MAC, CONNECT, 0.5)
+        assert recorder.summary() == []
+
+    def test_summary_per_speaker_phase_and_command(self):
+        recorder = LatencyRecorder(enabled=True)
+        recorder.record(MAC, RESPONSE, 0.02, UECommand.EQ_PRESET)
+        recorder.record(MAC.lower(), CONNECT, 0.5)
+        recorder.record(MAC, RESPONSE, 0.04, UECommand.EQ_PRESET)
+        recorder.record("88:C6:26:00:00:02", CLOSE, 0.01)
+        rows = recorder.summary(MAC)
+        assert [(r.phase, r.command_id, r.count) for r in rows] == [
+            (CONNECT, None, 1),
+            (RESPONSE, UECommand.EQ_PRESET, 2),
+        ]
+        assert rows[1].p50 == pytest.approx(0.02, rel=0.01)
+        assert rows[1].p99 == pytest.approx(0.04, rel=0.01)
+        assert len(recorder.summary()) == 3
+
+    def test_histogram_is_a_copy(self):
+        recorder = LatencyRecorder(enabled=True)
+        recorder.record(MAC, CONNECT, 0.5)
+        copy = recorder.histogram(MAC, CONNECT)
+        copy.record(1.0)
+        assert recorder.histogram(MAC, CONNECT).count == 1
+        assert recorder.histogram(MAC, SDP) is None
+        recorder.reset()
+        assert recorder.histograms() == {}
+
+
+@pytest.fixture
+def emulator():
+    get_latency_recorder().enabled = True
+    get_rate_limiter().configure(None, 1)
+    with EmulatorServer(latency=0.005) as server:
+        server.add_speaker(MAC)
+        with emulated_transport(server.address):
+            yield server
+
+
+def _phases(recorder=None):
+    recorder = recorder or get_latency_recorder()
+    return {(r.phase, r.command_id): r.count for r in recorder.summary(MAC)}
+
+
+class TestSessions:
+    def test_spp_session_phases(self, emulator):
+        with SppSession(MAC) as session:
+            session.query(_IDS)
+            session.query(_IDS, window=2)
+        phases = _phases()
+        assert phases[(SDP, None)] == 1
+        assert phases[(CONNECT, None)] == 1
+        assert phases[(CLOSE, None)] == 1
+        # One-at-a-time queries time the first byte; pipelined ones only the response.
+        assert phases[(FIRST_BYTE, UECommand.EQ_PRESET)] == 1
+        assert phases[(RESPONSE, UECommand.EQ_PRESET)] == 2
+        response = get_latency_recorder().histogram(MAC, RESPONSE, UECommand.EQ_PRESET)
+        assert response.min >= 5000
+
+    async def test_aio_session_phases(self, emulator):
+        session = AsyncSppSession(MAC)
+        await session.query(_IDS)
+        await session.query(_IDS, window=2)
+        session.close()
+        phases = _phases()
+        assert phases[(CONNECT, None)] == 1
+        assert phases[(CLOSE, None)] == 1
+        assert phases[(FIRST_BYTE, UECommand.DOUBLE_UP_MODE)] == 1
+        assert phases[(RESPONSE, UECommand.DOUBLE_UP_MODE)] == 2
+
+    def test_first_byte_precedes_fragmented_response(self):
+        get_latency_recorder().enabled = True
+        faults = FaultInjector(fragment=1.0, fragment_gap=0.02)
+        with EmulatorServer(faults=faults) as server:
+            server.add_speaker(MAC)
+            with emulated_transport(server.address), SppSession(MAC) as session:
+                session.query([UECommand.EQ_PRESET])
+        recorder = get_latency_recorder()
+        first = recorder.histogram(MAC, FIRST_BYTE, UECommand.EQ_PRESET)
+        full = recorder.histogram(MAC, RESPONSE, UECommand.EQ_PRESET)
+        assert full.max - first.max >= 15_000
+
+    def test_disabled_by_default(self, emulator):
+        get_latency_recorder().enabled = False
+        with SppSession(MAC) as session:
+            session.query(_IDS)
+        assert get_latency_recorder().summary() == []
+
+
+class TestReporting:
+    async def test_daemon_serves_summary(self, tmp_path):
+        recorder = get_latency_recorder()
+        recorder.enabled = True
+        recorder.record(MAC, CONNECT, 0.25)
+        server = Daemon(tmp_path / "ueboomd.sock")
+        reply = await server.handle_line(b'{"id": 1, "method": "latency", "params": {}}')
+        assert reply["result"]["enabled"]
+        [row] = reply["result"]["summary"]
+        assert LatencySummary(**row).p50 == pytest.approx(0.25, rel=0.01)
+
+    def test_client_reports_recording_off(self):
+        client = DaemonClient()
+        with patch.object(client, "call", return_value={"enabled": False, "summary": []}):
+            assert client.latency_summary() is None
+
+    def test_print_latency(self, capsys):
+        _print_latency(
+            [
+                LatencySummary(MAC, CONNECT, None, 1, 0.5, 0.5, 0.5, 0.5, 0.5),
+                LatencySummary(MAC, RESPONSE, 0x64, 3, 0.02, 0.02, 0.03, 0.03, 0.03),
+            ]
+        )
+        out = capsys.readouterr().out
+        assert MAC in out
+        assert "response 0x64" in out
+        assert "500.00" in out
+        _print_latency(None)
+        assert "ueboomd with --latency" in capsys.readouterr().out
+
+    def test_cli_flag_prints_local_latency(self, capsys):
+        def fake_battery(mac):
+            get_latency_recorder().record(mac, CONNECT, 0.1)
+            return 80
+
+        with (
+            patch.object(sys, "argv", ["ueboom", "--mac", MAC, "--battery", "--latency"]),
+            patch("ue_mini_boom_controller.cli.get_battery", side_effect=fake_battery),
+        ):
+            main()
+        out = capsys.readouterr().out
+        assert "Battery: 80%" in out
+        assert "connect" in out
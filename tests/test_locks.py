@@ -0,0 +1,170 @@
+"""Tests for cross-process speaker locks."""
+
+import asyncio
+import os
+import stat
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from ue_mini_boom_controller.locks import SpeakerBusyError, SpeakerLock, lock_path, wait_stats
+from ue_mini_boom_controller.paths import runtime_dir
+from ue_mini_boom_controller.spp import SppSession
+
+MAC = "AA:BB:CC:DD:EE:FF"
+
+# Holds the lock from another process until stdin closes.
+_HOLDER = """
+import fcntl, os, sys
+fd = os.open(sys.argv[1], os.O_RDWR | os.O_CREAT, 0o600)
+fcntl.flock(fd, fcntl.LOCK_EX)
+print("locked", flush=True)
+sys.stdin.read()
+"""
+
+
+class TestSpeakerLock:
+    def test_lock_file_under_runtime_dir(self, tmp_path):
+        path = lock_path("aa:bb:cc:dd:ee:ff")
+        assert path == tmp_path / "run" / "ue-mini-boom-controller" / "locks" / "AABBCCDDEEFF.lock"
+
+    def test_fallback_runtime_dir_is_private(self, tmp_path, monkeypatch):
+        monkeypatch.delenv("XDG_RUNTIME_DIR")
+        monkeypatch.setattr(tempfile, "tempdir", str(tmp_path))
+        path = runtime_dir()
+        assert path == tmp_path / f"ue-mini-boom-controller-{os.getuid()}"
+        assert stat.S_IMODE(path.stat().st_mode) == 0o700
+        assert runtime_dir() == path
+
+    @pytest.mark.parametrize("setup", ["open", "foreign", "symlink"])
+    def test_fallback_runtime_dir_rejects_unsafe(self, tmp_path, monkeypatch, setup):
+        monkeypatch.delenv("XDG_RUNTIME_DIR")
+        monkeypatch.setattr(tempfile, "tempdir", str(tmp_path))
+        path = tmp_path / f"ue-mini-boom-controller-{os.getuid()}"
+        if setup == "symlink":
+            (tmp_path / "elsewhere").mkdir(mode=0o700)
+            path.symlink_to(tmp_path / "elsewhere")
+        else:
+            path.mkdir()
+            path.chmod(0o777 if setup == "open" else 0o700)
+        if setup == "foreign":
+            monkeypatch.setattr(os, "getuid", lambda: path.stat().st_uid + 1)
+            path = path.rename(tmp_path / f"ue-mini-boom-controller-{os.getuid()}")
+        with pytest.raises(PermissionError, match="not a private directory"):
+            runtime_dir()
+
+    def test_fail_fast_when_held(self):
+        with SpeakerLock(MAC):
+            other = SpeakerLock(MAC, timeout=0)
+            with pytest.raises(SpeakerBusyError):
+                other.acquire()
+            assert not other.held
+        with SpeakerLock(MAC, timeout=0) as again:
+            assert again.held
+
+    def test_gives_up_at_deadline(self):
+        with SpeakerLock(MAC):
+            started = time.monotonic()
+            with pytest.raises(SpeakerBusyError):
+                SpeakerLock(MAC, timeout=0.1).acquire()
+            assert 0.1 <= time.monotonic() - started < 1.0
+
+    def test_waiter_gets_lock_on_release(self):
+        holder = SpeakerLock(MAC)
+        holder.acquire()
+        waiter = SpeakerLock(MAC, timeout=5)
+        waits = []
+        thread = threading.Thread(target=waiter.acquire, args=(lambda: waits.append(1),))
+        thread.start()
+        time.sleep(0.1)
+        assert thread.is_alive()
+        holder.release()
+        thread.join(5)
+        assert waiter.held
+        assert waits == [1]
+        assert waiter.waited >= 0.1
+        waiter.release()
+
+    async def test_async_waiter(self):
+        holder = SpeakerLock(MAC)
+        holder.acquire()
+        waiter = SpeakerLock(MAC, timeout=5)
+        task = asyncio.create_task(waiter.acquire_async())
+        await asyncio.sleep(0.05)
+        assert not task.done()
+        holder.release()
+        await asyncio.wait_for(task, 5)
+        assert waiter.held
+        waiter.release()
+
+    def test_held_by_other_process(self):
+        path = lock_path(MAC)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        proc = subprocess.Popen(
+            [sys.executable, "-c", _HOLDER, str(path)],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            text=True,
+        )
+        try:
+            assert proc.stdout.readline().strip() == "locked"
+            with pytest.raises(SpeakerBusyError):
+                SpeakerLock(MAC, timeout=0).acquire()
+        finally:
+            proc.stdin.close()
+            proc.wait(10)
+        # The holder exited, so the kernel dropped its lock.
+        with SpeakerLock(MAC, timeout=0) as lock:
+            assert lock.held
+
+    def test_wait_stats(self):
+        with SpeakerLock(MAC):
+            with pytest.raises(SpeakerBusyError):
+                SpeakerLock(MAC, timeout=0.05).acquire()
+        stats = wait_stats()[MAC]
+        assert stats.acquisitions == 2
+        assert stats.contended == 1
+        assert stats.max_wait >= 0.05
+        assert stats.total_wait >= stats.max_wait
+
+
+class TestSessionLocking:
+    def _patch_socket(self):
+        mock_socket_mod = MagicMock()
+        mock_socket_mod.socket.side_effect = lambda *a: MagicMock()
+        return patch("ue_mini_boom_controller.spp.socket", mock_socket_mod)
+
+    def test_session_holds_lock_while_connected(self):
+        with self._patch_socket():
+            session = SppSession(MAC, channel=5)
+            session.connect()
+            with pytest.raises(SpeakerBusyError):
+                SppSession(MAC, channel=5, lock_timeout=0).connect()
+            session.close()
+            with SppSession(MAC, channel=5, lock_timeout=0) as other:
+                assert other.connected
+
+    def test_failed_connect_releases_lock(self):
+        mock_socket_mod = MagicMock()
+        mock_socket_mod.socket.return_value.connect.side_effect = ConnectionRefusedError
+        with patch("ue_mini_boom_controller.spp.socket", mock_socket_mod):
+            with pytest.raises(ConnectionRefusedError):
+                SppSession(MAC, channel=5).connect()
+        assert SpeakerLock(MAC, timeout=0).try_acquire()
+
+    def test_reconnect_keeps_lock(self):
+        dead = MagicMock()
+        dead.send.side_effect = ConnectionResetError
+        fresh = MagicMock()
+        mock_socket_mod = MagicMock()
+        mock_socket_mod.socket.side_effect = [dead, fresh]
+        with patch("ue_mini_boom_controller.spp.socket", mock_socket_mod):
+            with SppSession(MAC, channel=5) as session:
+                session._send(b"\x02\x01\x0c")
+                assert not SpeakerLock(MAC, timeout=0).try_acquire()
+        fresh.send.assert_called_once()
@@ -0,0 +1,208 @@
+"""Tests for link counters and the OpenMetrics exporter."""
+
+import asyncio
+import re
+import socket
+import sys
+import urllib.error
+import urllib.request
+from unittest.mock import patch
+
+import pytest
+
+from ue_mini_boom_controller.aio import AsyncSppSession
+from ue_mini_boom_controller.channel_cache import get_channel_cache
+from ue_mini_boom_controller.cli import main
+from ue_mini_boom_controller.daemon import Daemon, DaemonError
+from ue_mini_boom_controller.emulator import EmulatorServer, FaultInjector, emulated_transport
+from ue_mini_boom_controller.latency import CONNECT, RESPONSE, get_latency_recorder
+from ue_mini_boom_controller.metrics import (
+    CONNECT_ERRORS,
+    CONNECTS,
+    CONTENT_TYPE,
+    LINK_DROPS,
+    RECONNECTS,
+    MetricsExporter,
+    MetricsServer,
+    get_link_counters,
+)
+from ue_mini_boom_controller.pacing import get_pacer
+from ue_mini_boom_controller.protocol import UECommand
+from ue_mini_boom_controller.ratelimit import get_rate_limiter
+from ue_mini_boom_controller.spp import SppSession
+
+MAC = "88:C6:26:00:00:01"
+OTHER = "88:C6:26:00:00:02"
+_SAMPLE = re.compile(r'^[a-z_]+(\{[a-z]+="(?:[^"\\]|\\.)*"(?:,[a-z]+="(?:[^"\\]|\\.)*")*\})? \S+$')
+
+
+class FakeDevices:
+    """Stands in for a live DeviceStateCache."""
+
+    live = True
+
+    def __init__(self, table):
+        self.table = table
+
+    def devices(self):
+        return self.table
+
+
+def _counts():
+    counters = get_link_counters()
+    return {event: counters.get(MAC, event) for event in (CONNECTS, RECONNECTS, LINK_DROPS)}
+
+
+@pytest.fixture
+def emulator():
+    get_rate_limiter().configure(None, 1)
+    faults = FaultInjector()
+    with EmulatorServer(faults=faults) as server:
+        server.add_speaker(MAC).eq_preset = 2
+        with emulated_transport(server.address):
+            yield faults
+
+
+class TestLinkCounters:
+    def test_reset_counts_a_drop_and_a_reconnect(self, emulator):
+        emulator.reset = 1.0
+        with SppSession(MAC) as session:
+            session.query([UECommand.EQ_PRESET])
+            emulator.reset = 0.0
+            assert session.query([UECommand.EQ_PRESET]) == {UECommand.EQ_PRESET: 2}
+        assert _counts() == {CONNECTS: 2, RECONNECTS: 1, LINK_DROPS: 1}
+
+    def test_close_is_not_a_drop(self, emulator):
+        for _ in range(2):
+            with SppSession(MAC) as session:
+                session.query([UECommand.EQ_PRESET])
+        assert _counts() == {CONNECTS: 2, RECONNECTS: 0, LINK_DROPS: 0}
+
+    def test_refused_connect_counts_an_error(self, emulator):
+        with pytest.raises(OSError):
+            SppSession(OTHER).connect()
+        assert get_link_counters().get(OTHER, CONNECT_ERRORS) == 1
+        assert get_link_counters().get(OTHER, CONNECTS) == 0
+
+    async def test_aio_session(self, emulator):
+        emulator.reset = 1.0
+        session = AsyncSppSession(MAC)
+        await session.query([UECommand.EQ_PRESET])
+        emulator.reset = 0.0
+        assert await session.query([UECommand.EQ_PRESET]) == {UECommand.EQ_PRESET: 2}
+        session.close()
+        assert _counts() == {CONNECTS: 2, RECONNECTS: 1, LINK_DROPS: 1}
+
+
+class TestExporter:
+    def test_render(self):
+        devices = FakeDevices(
+            {
+                MAC: {"name": "UE MINI BOOM", "paired": True, "connected": True, "battery": 80},
+                OTHER: {"name": "UE MINI BOOM", "paired": True, "connected": False},
+                "00:1A:7D:00:00:01": {"name": "Headset", "paired": True, "battery": 50},
+            }
+        )
+        recorder = get_latency_recorder()
+        recorder.enabled = True
+        for seconds in (0.003, 0.02, 0.04):
+            recorder.record(MAC, RESPONSE, seconds, UECommand.EQ_PRESET)
+        recorder.record(MAC, CONNECT, 0.4)
+        get_link_counters().increment(MAC, CONNECTS)
+        get_pacer().for_speaker(MAC).timeouts = 2
+        cache = get_channel_cache()
+        cache.hits, cache.misses = 3, 1
+
+        text = MetricsExporter(devices).render()
+        lines = text.splitlines()
+        assert text.endswith("# EOF\n")
+        assert all(_SAMPLE.match(line) for line in lines if not line.startswith("#")), text
+        assert f'ueboom_speaker_battery_percent{{mac="{MAC}",name="UE MINI BOOM"}} 80' in lines
+        assert f'ueboom_speaker_connected{{mac="{OTHER}",name="UE MINI BOOM"}} 0' in lines
+        assert not any("Headset" in line for line in lines)
+        assert not any(OTHER in line for line in lines if "battery" in line)
+        assert f'ueboom_link_connects_total{{mac="{MAC}"}} 1' in lines
+        assert f'ueboom_response_timeouts_total{{mac="{MAC}"}} 2' in lines
+        assert 'ueboom_sdp_cache_lookups_total{result="hit"} 3' in lines
+        assert "ueboom_sdp_cache_hit_ratio 0.75" in lines
+
+        labels = f'mac="{MAC}",phase="response",command="0x64"'
+        buckets = [
+            line for line in lines if line.startswith(f"ueboom_latency_seconds_bucket{{{labels}")
+        ]
+        counts = [int(line.rsplit(" ", 1)[1]) for line in buckets]
+        assert counts == sorted(counts)
+        assert f'ueboom_latency_seconds_bucket{{{labels},le="0.005"}} 1' in lines
+        assert f'ueboom_latency_seconds_bucket{{{labels},le="0.05"}} 3' in lines
+        assert buckets[-1] == f'ueboom_latency_seconds_bucket{{{labels},le="+Inf"}} 3'
+        assert f"ueboom_latency_seconds_count{{{labels}}} 3" in lines
+        assert f'ueboom_latency_seconds_count{{mac="{MAC}",phase="connect"}} 1' in lines
+
+    def test_label_values_are_escaped(self):
+        name = 'Den "big" \\ one\nUE BOOM'
+        devices = FakeDevices({MAC: {"name": name, "paired": True, "connected": True}})
+        text = MetricsExporter(devices).render()
+        assert 'name="Den \\"big\\" \\\\ one\\nUE BOOM"' in text
+
+    def test_bluez_read_at_most_once_per_ttl(self):
+        now = [0.0]
+        table = {MAC: {"name": "UE MINI BOOM", "paired": True, "connected": True, "battery": 9}}
+        exporter = MetricsExporter(bluez_ttl=5, clock=lambda: now[0])
+        with patch(
+            "ue_mini_boom_controller.metrics.get_managed_devices", return_value=table
+        ) as read:
+            exporter.render()
+            now[0] = 4.9
+            assert "} 9" in exporter.render()
+            assert read.call_count == 1
+            now[0] = 5.0
+            exporter.render()
+            assert read.call_count == 2
+
+    def test_no_bluez(self):
+        with patch("ue_mini_boom_controller.metrics.get_managed_devices", return_value=None):
+            text = MetricsExporter().render()
+        assert "ueboom_speaker_connected{" not in text
+
+
+def _scrape(port: int, path: str = "/metrics"):
+    with urllib.request.urlopen(f"http://127.0.0.1:{port}{path}", timeout=5) as response:
+        return response.headers["Content-Type"], response.read().decode()
+
+
+class TestServing:
+    def test_scrape(self):
+        with MetricsServer(MetricsExporter(FakeDevices({})), 0) as server:
+            content_type, body = _scrape(server.port)
+            assert content_type == CONTENT_TYPE
+            assert body.endswith("# EOF\n")
+            with pytest.raises(urllib.error.HTTPError) as exc:
+                _scrape(server.port, "/other")
+            assert exc.value.code == 404
+
+    async def test_daemon_serves_metrics(self, tmp_path):
+        daemon = Daemon(tmp_path / "ueboomd.sock", metrics_port=0)
+        await daemon.start()
+        try:
+            assert get_latency_recorder().enabled
+            _, body = await asyncio.to_thread(_scrape, daemon.metrics.port)
+            assert "# TYPE ueboom_link_connects counter" in body
+        finally:
+            await daemon.close()
+        assert daemon.metrics is None
+
+    async def test_daemon_port_in_use(self, tmp_path):
+        with socket.socket() as taken:
+            taken.bind(("127.0.0.1", 0))
+            taken.listen()
+            daemon = Daemon(tmp_path / "ueboomd.sock", metrics_port=taken.getsockname()[1])
+            with pytest.raises(DaemonError, match="cannot serve metrics"):
+                await daemon.start()
+
+    def test_cli_serves_until_interrupted(self, capsys):
+        with (
+            patch.object(sys, "argv", ["ueboom", "--metrics-port", "0"]),
+            patch("ue_mini_boom_controller.cli.time.sleep", side_effect=KeyboardInterrupt),
+        ):
+            main()
+        assert "Serving metrics on http://127.0.0.1:" in capsys.readouterr().out
@@ -0,0 +1,101 @@
+"""Tests for adaptive command pacing."""
+
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from ue_mini_boom_controller import pacing
+from ue_mini_boom_controller.pacing import SpeakerPacing, get_pacer
+from ue_mini_boom_controller.protocol import UECommand
+from ue_mini_boom_controller.spp import SppSession
+
+MAC = "AA:BB:CC:DD:EE:FF"
+
+
+class TestSpeakerPacing:
+    def test_initial_values_before_any_sample(self):
+        p = SpeakerPacing()
+        assert p.timeout == pacing.INITIAL_TIMEOUT
+        assert p.gap == pacing.INITIAL_GAP
+
+    def test_first_sample(self):
+        p = SpeakerPacing()
+        p.observe(0.1)
+        assert p.srtt == pytest.approx(0.1)
+        assert p.rttvar == pytest.approx(0.05)
+        # SRTT + 4 * RTTVAR
+        assert p.timeout == pytest.approx(0.3)
+        assert p.gap == pytest.approx(0.05)
+
+    def test_fast_steady_speaker_tightens_to_floor(self):
+        p = SpeakerPacing()
+        for _ in range(50):
+            p.observe(0.02)
+        assert p.timeout == pacing.MIN_TIMEOUT
+        assert p.gap == pytest.approx(0.01, abs=1e-3)
+
+    def test_jittery_speaker_gets_more_room(self):
+        steady, jittery = SpeakerPacing(), SpeakerPacing()
+        for i in range(20):
+            steady.observe(0.3)
+            jittery.observe(0.1 if i % 2 else 0.5)
+        assert jittery.timeout > steady.timeout
+
+    def test_timeouts_back_off_until_next_answer(self):
+        p = SpeakerPacing()
+        p.observe(0.1)
+        base_timeout, base_gap = p.timeout, p.gap
+        p.timed_out()
+        p.timed_out()
+        assert p.timeout == pytest.approx(base_timeout * 4)
+        assert p.gap == pytest.approx(base_gap * 4)
+        for _ in range(10):
+            p.timed_out()
+        assert p.timeout == pacing.MAX_TIMEOUT
+        assert p.gap == pacing.MAX_GAP
+        p.observe(0.1)
+        assert p.timeout < 1.0
+
+    def test_shared_per_speaker(self):
+        assert get_pacer().for_speaker(MAC) is get_pacer().for_speaker(MAC.lower())
+
+
+class TestSessionPacing:
+    def _socket(self, recv_into):
+        mock_socket_mod = MagicMock()
+        mock_socket_mod.socket.return_value.recv_into.side_effect = recv_into
+        return patch("ue_mini_boom_controller.spp.socket", mock_socket_mod)
+
+    def test_answers_feed_the_estimator(self):
+        answer = bytes([0x03, 0x01, UECommand.EQ_PRESET, 0x02])
+
+        def recv_into(buffer):
+            buffer[: len(answer)] = answer
+            return len(answer)
+
+        with self._socket(recv_into), patch("ue_mini_boom_controller.spp.time.sleep") as sleep:
+            session = SppSession(MAC, channel=5)
+            try:
+                assert session.query([UECommand.EQ_PRESET] * 3) == {UECommand.EQ_PRESET: 2}
+            finally:
+                session.close()
+        p = get_pacer().for_speaker(MAC)
+        assert p.samples == 3
+        assert p.timeouts == 0
+        # Settle after connect at the cold default, then the learned gap.
+        assert sleep.call_args_list[0].args == (pacing.INITIAL_GAP,)
+        assert all(call.args[0] < pacing.INITIAL_GAP for call in sleep.call_args_list[1:])
+
+    def test_missing_answer_backs_off(self):
+        with self._socket(TimeoutError), patch("ue_mini_boom_controller.spp.time.sleep"):
+            with SppSession(MAC, channel=5) as session:
+                session.query([UECommand.EQ_PRESET])
+        p = get_pacer().for_speaker(MAC)
+        assert p.timeouts == 1
+        assert p.timeout == pacing.INITIAL_TIMEOUT * 2
+
+    def test_unanswered_send_is_not_a_timeout(self):
+        with self._socket(TimeoutError):
+            with SppSession(MAC, channel=5) as session:
+                assert session.send(b"\x02\x01\x0c") is None
+        assert get_pacer().for_speaker(MAC).timeouts == 0
@@ -0,0 +1,162 @@
+"""Tests for per-firmware pacing profiles."""
+
+import threading
+from unittest.mock import patch
+
+from ue_mini_boom_controller.aio import AsyncSppSession
+from ue_mini_boom_controller.emulator import EmulatorServer, emulated_transport
+from ue_mini_boom_controller.pacing import get_pacer
+from ue_mini_boom_controller.profiles import Profile, ProfileStore, get_profile_store
+from ue_mini_boom_controller.protocol import UECommand
+from ue_mini_boom_controller.ratelimit import get_rate_limiter
+from ue_mini_boom_controller.spp import SppSession
+
+MAC = "AA:BB:CC:DD:EE:FF"
+OTHER = "11:22:33:44:55:66"
+MODALIAS = "bluetooth:v000Dp1234d0100"
+_PROFILE = Profile(MODALIAS, 16.0, 4, 0.25, 0.02, 1700000000.0)
+
+
+class TestProfileStore:
+    def test_round_trip_through_file(self, tmp_path):
+        path = tmp_path / "profiles.json"
+        ProfileStore(path).put(_PROFILE, MAC.lower())
+        store = ProfileStore(path)
+        assert store.get(MODALIAS) == _PROFILE
+        assert store.for_speaker(MAC) == _PROFILE
+
+    def test_corrupt_file_is_ignored(self, tmp_path):
+        path = tmp_path / "profiles.json"
+        path.write_text("{not json")
+        assert ProfileStore(path).get(MODALIAS) is None
+
+    def test_no_bluez_lookup_without_profiles(self):
+        with patch("ue_mini_boom_controller.profiles.get_device_status") as status:
+            assert ProfileStore().for_speaker(MAC) is None
+        status.assert_not_called()
+
+    def test_unknown_speaker_looked_up_once_by_modalias(self):
+        store = ProfileStore()
+        store.put(_PROFILE)
+        with (
+            patch("ue_mini_boom_controller.profiles.get_managed_devices", return_value=None),
+            patch(
+                "ue_mini_boom_controller.profiles.get_device_status",
+                return_value={"modalias": MODALIAS},
+            ) as status,
+        ):
+            assert store.for_speaker(MAC) == _PROFILE
+            assert store.for_speaker(MAC) == _PROFILE
+            assert store.for_speaker(OTHER) == _PROFILE
+        assert status.call_count == 2
+
+    def test_other_model_gets_nothing(self):
+        store = ProfileStore()
+        store.put(_PROFILE)
+        with (
+            patch("ue_mini_boom_controller.profiles.get_managed_devices", return_value=None),
+            patch(
+                "ue_mini_boom_controller.profiles.get_device_status",
+                return_value={"modalias": "bluetooth:v000Dp9999d0001"},
+            ) as status,
+        ):
+            assert store.for_speaker(MAC) is None
+            assert store.for_speaker(MAC) is None
+        status.assert_called_once()
+
+    def test_one_snapshot_covers_every_speaker(self):
+        store = ProfileStore()
+        store.put(_PROFILE)
+        devices = {
+            MAC: {"modalias": MODALIAS},
+            OTHER: {"modalias": MODALIAS},
+            "00:1A:7D:00:00:01": {},
+        }
+        with (
+            patch(
+                "ue_mini_boom_controller.profiles.get_managed_devices", return_value=devices
+            ) as snapshot,
+            patch("ue_mini_boom_controller.profiles.get_device_status") as status,
+        ):
+            assert store.for_speaker(MAC) == _PROFILE
+            assert store.for_speaker(OTHER) == _PROFILE
+            assert store.for_speaker("00:1a:7d:00:00:01") is None
+            assert store.for_speaker("00:1A:7D:00:00:02") is None
+        assert snapshot.call_count == 2  # the last MAC was not in the first snapshot
+        status.assert_not_called()
+
+    def test_concurrent_callers_share_one_lookup(self):
+        store = ProfileStore()
+        store.put(_PROFILE)
+        started, release = threading.Event(), threading.Event()
+
+        def slow_snapshot():
+            started.set()
+            release.wait(5)
+            return {MAC: {"modalias": MODALIAS}}
+
+        results = []
+        with patch(
+            "ue_mini_boom_controller.profiles.get_managed_devices", side_effect=slow_snapshot
+        ) as snapshot:
+            threads = [
+                threading.Thread(target=lambda: results.append(store.for_speaker(MAC)))
+                for _ in range(3)
+            ]
+            threads[0].start()
+            started.wait(5)
+            for thread in threads[1:]:
+                thread.start()
+            assert not store.resolved(MAC)
+            release.set()
+            for thread in threads:
+                thread.join(5)
+        assert results == [_PROFILE] * 3
+        assert snapshot.call_count == 1
+        assert store.resolved(MAC)
+
+
+class TestTransportsUseProfiles:
+    def test_limiter_and_pacer_start_from_profile(self):
+        get_profile_store().put(_PROFILE, MAC)
+        bucket = get_rate_limiter().bucket(MAC)
+        assert (bucket.rate, bucket.burst) == (16.0, 4)
+        pacing = get_pacer().for_speaker(MAC)
+        assert (pacing.timeout, pacing.gap) == (0.25, 0.02)
+
+    def test_explicit_limit_beats_profile(self):
+        get_profile_store().put(_PROFILE, MAC)
+        get_rate_limiter().configure(rate=1.0, burst=1, mac_address=MAC)
+        assert get_rate_limiter().bucket(MAC).rate == 1.0
+
+    def test_sessions_look_up_the_profile_on_first_use(self):
+        get_profile_store().put(_PROFILE)
+        with patch(
+            "ue_mini_boom_controller.profiles.get_managed_devices",
+            return_value={MAC: {"modalias": MODALIAS}},
+        ) as snapshot:
+            sessions = [SppSession(MAC), AsyncSppSession(MAC)]
+            snapshot.assert_not_called()
+            assert [s.pacing.timeout for s in sessions] == [0.25, 0.25]
+        snapshot.assert_called_once()
+
+    async def test_async_connect_looks_up_off_the_event_loop(self):
+        get_profile_store().put(_PROFILE)
+        get_rate_limiter().configure(None, 1)
+        threads = []
+
+        def snapshot():
+            threads.append(threading.current_thread())
+            return {MAC: {"modalias": MODALIAS}}
+
+        with (
+            EmulatorServer() as server,
+            emulated_transport(server.address),
+            patch("ue_mini_boom_controller.profiles.get_managed_devices", side_effect=snapshot),
+        ):
+            server.add_speaker(MAC)
+            async with AsyncSppSession(MAC) as session:
+                await session.query([UECommand.EQ_PRESET])
+                assert session.pacing is get_pacer().for_speaker(MAC)
+        assert len(threads) == 1
+        assert threads[0] is not threading.main_thread()
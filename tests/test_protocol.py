@@ -11,6 +11,8 @@ from ue_mini_boom_controller.protocol import (
     BLE_SERVICE_UUID,
     COMMANDS,
     SPP_UUID,
+    Frame,
+    FrameDecoder,
     UECommand,
     build_spp_command,
 )
@@ -104,3 +106,48 @@ class TestUUIDConstants:
         ]:
             assert isinstance(uuid, str)
             assert len(uuid) > 0
+
+
+class TestFrameDecoder:
+    def test_single_frame(self):
+        decoder = FrameDecoder()
+        decoder.feed(build_spp_command(0x64, 0x02))
+        assert decoder.next_frame() == Frame(0x64, bytes([0x02]))
+        assert decoder.next_frame() is None
+
+    def test_partial_frame_waits_for_rest(self):
+        decoder = FrameDecoder()
+        decoder.feed(bytes([0x04, 0x01, 0xBB]))
+        assert decoder.next_frame() is None
+        decoder.feed(bytes([0x01, 0x01]))
+        assert decoder.next_frame() == Frame(0xBB, bytes([0x01, 0x01]))
+
+    def test_coalesced_frames(self):
+        decoder = FrameDecoder()
+        decoder.feed(build_spp_command(0x64, 0x01) + build_spp_command(0x6B))
+        assert decoder.next_frame() == Frame(0x64, bytes([0x01]))
+        assert decoder.next_frame() == Frame(0x6B, b"")
+        assert len(decoder) == 0
+
+    def test_resync_after_garbage(self):
+        decoder = FrameDecoder()
+        decoder.feed(bytes([0xFF, 0x00]) + build_spp_command(0x67, 0x01))
+        assert decoder.next_frame() == Frame(0x67, bytes([0x01]))
+
+    def test_recv_into_buffer(self):
+        decoder = FrameDecoder(size=8)
+        for _ in range(10):
+            packet = build_spp_command(0x72, *b"Boom")
+            buf = decoder.recv_buffer()
+            n = min(len(buf), len(packet))
+            buf[:n] = packet[:n]
+            decoder.commit(n)
+            if n < len(packet):
+                decoder.feed(packet[n:])
+            assert decoder.next_frame() == Frame(0x72, b"Boom")
+
+    def test_to_bytes_round_trip(self):
+        packet = build_spp_command(0xBB, 0x00, 0x01)
+        decoder = FrameDecoder()
+        decoder.feed(packet)
+        assert decoder.next_frame().to_bytes() == packet
@@ -0,0 +1,100 @@
+"""Tests for per-speaker rate limiting."""
+
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from ue_mini_boom_controller.protocol import UECommand
+from ue_mini_boom_controller.ratelimit import RateLimiter, TokenBucket, get_rate_limiter
+from ue_mini_boom_controller.spp import SppSession
+
+MAC = "AA:BB:CC:DD:EE:FF"
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestTokenBucket:
+    def test_burst_goes_out_without_delay(self):
+        bucket = TokenBucket(rate=2.0, burst=3, clock=_Clock())
+        assert [bucket.reserve() for _ in range(3)] == [0.0, 0.0, 0.0]
+
+    def test_sustained_rate_after_burst(self):
+        bucket = TokenBucket(rate=2.0, burst=1, clock=_Clock())
+        assert bucket.reserve() == 0.0
+        # Later callers queue behind each other at 1/rate.
+        assert bucket.reserve() == pytest.approx(0.5)
+        assert bucket.reserve() == pytest.approx(1.0)
+
+    def test_refills_over_time(self):
+        clock = _Clock()
+        bucket = TokenBucket(rate=2.0, burst=2, clock=clock)
+        bucket.reserve()
+        bucket.reserve()
+        clock.now += 0.5
+        assert bucket.reserve() == 0.0
+        clock.now += 10  # refill is capped at burst
+        assert [bucket.reserve() for _ in range(2)] == [0.0, 0.0]
+        assert bucket.reserve() > 0
+
+    def test_unlimited(self):
+        bucket = TokenBucket(rate=None, burst=1)
+        assert [bucket.reserve() for _ in range(100)] == [0.0] * 100
+
+    def test_rejects_empty_burst(self):
+        with pytest.raises(ValueError):
+            TokenBucket(rate=1.0, burst=0)
+
+
+class TestRateLimiter:
+    def test_buckets_are_per_speaker(self):
+        limiter = RateLimiter(rate=1.0, burst=1)
+        assert limiter.bucket(MAC) is limiter.bucket(MAC.lower())
+        assert limiter.bucket(MAC) is not limiter.bucket("11:22:33:44:55:66")
+
+    def test_per_speaker_override(self):
+        limiter = RateLimiter(rate=1.0, burst=1)
+        limiter.configure(rate=10.0, burst=5, mac_address=MAC)
+        limiter.configure(rate=3.0, burst=2)
+        assert (limiter.bucket(MAC).rate, limiter.bucket(MAC).burst) == (10.0, 5)
+        other = limiter.bucket("11:22:33:44:55:66")
+        assert (other.rate, other.burst) == (3.0, 2)
+
+    def test_wait_sleeps_only_when_over_the_limit(self):
+        limiter = RateLimiter(rate=4.0, burst=2)
+        with patch("ue_mini_boom_controller.ratelimit.time.sleep") as sleep:
+            limiter.wait(MAC)
+            limiter.wait(MAC)
+            sleep.assert_not_called()
+            limiter.wait(MAC)
+        sleep.assert_called_once()
+        assert 0 < sleep.call_args.args[0] <= 0.25
+        assert limiter.throttled == 1
+
+    async def test_wait_async(self):
+        limiter = RateLimiter(rate=50.0, burst=1)
+        assert await limiter.wait_async(MAC) == 0.0
+        assert await limiter.wait_async(MAC) > 0
+
+
+class TestSessionSends:
+    def test_every_send_goes_through_the_limiter(self):
+        limiter = get_rate_limiter()
+        limiter.configure(rate=1.0, burst=2)
+        mock_socket_mod = MagicMock()
+        mock_socket_mod.socket.return_value.recv_into.side_effect = TimeoutError
+        # spp and ratelimit share the time module, so this stubs both sleeps.
+        with (
+            patch("ue_mini_boom_controller.spp.socket", mock_socket_mod),
+            patch("ue_mini_boom_controller.spp.time.sleep"),
+        ):
+            with SppSession(MAC, channel=5) as session:
+                session.query([UECommand.EQ_PRESET, UECommand.DOUBLE_UP_MODE], timeout=0.01)
+                assert limiter.throttled == 0
+                session.query([UECommand.EQ_PRESET], window=2, timeout=0.01)
+        assert limiter.throttled == 1
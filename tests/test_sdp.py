@@ -0,0 +1,126 @@
+"""Tests for the in-process SDP client (pure parsing layer + mocked socket)."""
+
+import struct
+import uuid
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from ue_mini_boom_controller import sdp
+from ue_mini_boom_controller.protocol import SPP_UUID
+
+# AttributeLists of an SPP record as served by a UE speaker:
+# handle 0x00010003, ServiceClassIDList [SerialPort], protocols [L2CAP, RFCOMM ch 5],
+# ServiceName "LWACP".
+_SPP_ATTRIBUTE_LISTS = bytes.fromhex(
+    "35 2D 35 2B 09 00 00 0A 00 01 00 03 09 00 01 35 03 19 11 01 09 00 04 35 0C 35 03"
+    " 19 01 00 35 05 19 00 03 08 05 09 01 00 25 05 4C 57 41 43 50"
+)
+
+
+def _response(transaction_id: int, lists: bytes, continuation: bytes = b"") -> bytes:
+    params = struct.pack(">H", len(lists)) + lists + bytes([len(continuation)]) + continuation
+    return struct.pack(">BHH", 0x07, transaction_id, len(params)) + params
+
+
+class TestDataElements:
+    def test_uint_and_text(self):
+        assert sdp.parse_data_element(bytes([0x08, 0x05])) == 5
+        assert sdp.parse_data_element(bytes([0x0A, 0, 1, 0, 3])) == 0x00010003
+        assert sdp.parse_data_element(b"\x25\x05LWACP") == "LWACP"
+
+    def test_uuid16_expands(self):
+        assert sdp.parse_data_element(bytes([0x19, 0x11, 0x01])) == uuid.UUID(SPP_UUID)
+
+    def test_uuid128(self):
+        value = uuid.UUID(SPP_UUID)
+        assert sdp.parse_data_element(b"\x1c" + value.bytes) == value
+
+    def test_nested_sequence(self):
+        assert sdp.parse_data_element(bytes.fromhex("35 06 35 04 08 01 28 01")) == [[1, True]]
+
+    def test_truncated(self):
+        with pytest.raises(sdp.SdpError):
+            sdp.parse_data_element(bytes([0x35, 0x05, 0x08]))
+
+    def test_trailing_bytes(self):
+        with pytest.raises(sdp.SdpError):
+            sdp.parse_data_element(bytes([0x08, 0x05, 0x00]))
+
+
+class TestRecords:
+    def test_recorded_spp_record(self):
+        records = sdp.parse_attribute_lists(_SPP_ATTRIBUTE_LISTS)
+        assert len(records) == 1
+        assert records[0][0x0100] == "LWACP"
+        assert records[0][sdp.SERVICE_CLASS_ID_LIST] == [uuid.UUID(SPP_UUID)]
+        assert sdp.rfcomm_channel(records) == 5
+
+    def test_no_rfcomm_layer(self):
+        assert sdp.rfcomm_channel([{sdp.PROTOCOL_DESCRIPTOR_LIST: [[sdp.uuid16(0x0100)]]}]) is None
+
+
+class TestPdus:
+    def test_request_encoding(self):
+        pdu = sdp.build_search_attribute_request(
+            1, [uuid.UUID(SPP_UUID)], [sdp.PROTOCOL_DESCRIPTOR_LIST]
+        )
+        assert pdu == bytes.fromhex("06 0001 000D 3503191101 FFFF 3503090004 00")
+
+    def test_error_response(self):
+        with pytest.raises(sdp.SdpError, match="0x0003"):
+            sdp.parse_search_attribute_response(bytes.fromhex("01 0001 0002 0003"))
+
+    def test_continuation_is_followed(self):
+        exchange = sdp.search_transaction([uuid.UUID(SPP_UUID)], [sdp.PROTOCOL_DESCRIPTOR_LIST])
+        first = next(exchange)
+        assert first[-1] == 0  # no continuation state yet
+
+        second = exchange.send(_response(1, _SPP_ATTRIBUTE_LISTS[:20], b"\x01\x02"))
+        assert second.endswith(b"\x02\x01\x02")
+
+        with pytest.raises(StopIteration) as done:
+            exchange.send(_response(2, _SPP_ATTRIBUTE_LISTS[20:]))
+        assert sdp.rfcomm_channel(done.value.value) == 5
+
+    def test_transaction_id_mismatch(self):
+        exchange = sdp.search_transaction([uuid.UUID(SPP_UUID)], [sdp.PROTOCOL_DESCRIPTOR_LIST])
+        next(exchange)
+        with pytest.raises(sdp.SdpError):
+            exchange.send(_response(7, _SPP_ATTRIBUTE_LISTS))
+
+
+class TestFindRfcommChannel:
+    def _patch_socket(self, sock):
+        mock_socket_mod = MagicMock()
+        mock_socket_mod.socket.return_value.__enter__.return_value = sock
+        return patch("ue_mini_boom_controller.sdp.socket", mock_socket_mod)
+
+    def test_lookup(self):
+        sock = MagicMock()
+        sock.recv.return_value = _response(1, _SPP_ATTRIBUTE_LISTS)
+
+        with self._patch_socket(sock):
+            assert sdp.find_rfcomm_channel("AA:BB:CC:DD:EE:FF") == 5
+
+        sock.connect.assert_called_once_with(("AA:BB:CC:DD:EE:FF", sdp.SDP_PSM))
+
+    def test_connect_failure(self):
+        sock = MagicMock()
+        sock.connect.side_effect = TimeoutError
+
+        with self._patch_socket(sock):
+            assert sdp.find_rfcomm_channel("AA:BB:CC:DD:EE:FF") is None
+
+    def test_spp_prefers_native_lookup(self):
+        from ue_mini_boom_controller import spp
+
+        with (
+            patch.object(sdp, "is_available", return_value=True),
+            patch.object(sdp, "find_rfcomm_channel", return_value=3) as native,
+            patch("ue_mini_boom_controller.spp.subprocess.run") as run,
+        ):
+            assert spp._find_rfcomm_channel("AA:BB:CC:DD:EE:FF") == 3
+
+        native.assert_called_once()
+        run.assert_not_called()
@@ -1,11 +1,19 @@
 """Tests for SPP transport (mock-based)."""
 
+import queue
 import sys
+import threading
+import time
 from types import ModuleType
 from unittest.mock import MagicMock, patch
 
-from ue_mini_boom_controller.protocol import COMMANDS, UECommand, build_spp_command
-from ue_mini_boom_controller.spp import send_spp_command, set_speaker_name
+from ue_mini_boom_controller.protocol import COMMANDS, Frame, UECommand, build_spp_command
+from ue_mini_boom_controller.spp import (
+    SppSession,
+    query_spp_values,
+    send_spp_command,
+    set_speaker_name,
+)
 
 _TEST_CMD = COMMANDS["battery_announce"]
 
@@ -19,12 +27,26 @@ def _make_bluetooth_mock():
     return bt
 
 
+def _recv_into_chunks(*chunks):
+    """recv_into side effect that delivers chunks in order, then times out."""
+    pending = list(chunks)
+
+    def recv_into(buffer):
+        if not pending:
+            raise TimeoutError
+        chunk = pending.pop(0)
+        buffer[: len(chunk)] = chunk
+        return len(chunk)
+
+    return recv_into
+
+
 class TestSendSppNative:
     """Tests for the native AF_BLUETOOTH socket path."""
 
     def _mock_native_socket(self):
         mock_sock = MagicMock()
-        mock_sock.recv.side_effect = TimeoutError
+        mock_sock.recv_into.side_effect = TimeoutError
         return mock_sock
 
     def test_success(self):
@@ -139,7 +161,7 @@ class TestSendSppPybluezFallback:
 class TestSetSpeakerName:
     def test_encoding(self):
         mock_sock = MagicMock()
-        mock_sock.recv.side_effect = TimeoutError
+        mock_sock.recv_into.side_effect = TimeoutError
         mock_sdp = MagicMock()
         mock_sdp.stdout = "  Channel: 5\n"
         mock_sdp.returncode = 0
@@ -162,7 +184,7 @@ class TestSetSpeakerName:
 
     def test_truncation(self):
         mock_sock = MagicMock()
-        mock_sock.recv.side_effect = TimeoutError
+        mock_sock.recv_into.side_effect = TimeoutError
         mock_sdp = MagicMock()
         mock_sdp.stdout = "  Channel: 5\n"
         mock_sdp.returncode = 0
@@ -183,3 +205,407 @@ class TestSetSpeakerName:
         truncated_bytes = long_name.encode("utf-8")[:32]
         expected = build_spp_command(UECommand.SET_NAME, *truncated_bytes)
         assert sent_cmd == expected
+
+
+class TestSppSession:
+    """Tests for the persistent RFCOMM session."""
+
+    def _patch_socket(self, *socks):
+        mock_socket_mod = MagicMock()
+        mock_socket_mod.AF_BLUETOOTH = 31
+        mock_socket_mod.SOCK_STREAM = 1
+        mock_socket_mod.BTPROTO_RFCOMM = 3
+        mock_socket_mod.socket.side_effect = list(socks)
+        return patch("ue_mini_boom_controller.spp.socket", mock_socket_mod)
+
+    def _mock_sock(self):
+        mock_sock = MagicMock()
+        mock_sock.recv_into.side_effect = TimeoutError
+        return mock_sock
+
+    def test_commands_share_one_connection(self):
+        mock_sock = self._mock_sock()
+
+        with self._patch_socket(mock_sock), patch("ue_mini_boom_controller.spp.time.sleep"):
+            with SppSession("AA:BB:CC:DD:EE:FF", channel=5) as session:
+                assert send_spp_command("AA:BB:CC:DD:EE:FF", _TEST_CMD, False, session)
+                assert send_spp_command("AA:BB:CC:DD:EE:FF", _TEST_CMD, False, session)
+                mock_sock.close.assert_not_called()
+
+        mock_sock.connect.assert_called_once_with(("AA:BB:CC:DD:EE:FF", 5))
+        assert mock_sock.send.call_count == 2
+        mock_sock.close.assert_called_once()
+
+    def test_reconnects_when_link_drops(self):
+        dead_sock = self._mock_sock()
+        dead_sock.send.side_effect = ConnectionResetError("reset")
+        fresh_sock = self._mock_sock()
+
+        with (
+            self._patch_socket(dead_sock, fresh_sock),
+            patch("ue_mini_boom_controller.spp.time.sleep"),
+        ):
+            with SppSession("AA:BB:CC:DD:EE:FF", channel=5) as session:
+                assert send_spp_command("AA:BB:CC:DD:EE:FF", _TEST_CMD, False, session)
+
+        dead_sock.close.assert_called_once()
+        fresh_sock.connect.assert_called_once_with(("AA:BB:CC:DD:EE:FF", 5))
+        fresh_sock.send.assert_called_once_with(_TEST_CMD)
+
+    def test_query_over_session(self):
+        mock_sock = MagicMock()
+        mock_sock.recv_into.side_effect = _recv_into_chunks(
+            bytes([0x03, 0x01, UECommand.EQ_PRESET, 0x02])
+        )
+
+        with self._patch_socket(mock_sock), patch("ue_mini_boom_controller.spp.time.sleep"):
+            with SppSession("AA:BB:CC:DD:EE:FF", channel=5) as session:
+                values = query_spp_values("AA:BB:CC:DD:EE:FF", [UECommand.EQ_PRESET], session)
+                assert session.connected
+
+        assert values == {UECommand.EQ_PRESET: 0x02}
+        mock_sock.send.assert_called_once_with(bytes([0x02, 0x01, UECommand.EQ_PRESET]))
+
+    def test_query_reassembles_split_response(self):
+        mock_sock = MagicMock()
+        mock_sock.recv_into.side_effect = _recv_into_chunks(
+            bytes([0x03, 0x01]),
+            bytes([UECommand.EQ_PRESET, 0x01]),
+            bytes([0x03]),
+            bytes([0x01, UECommand.DOUBLE_UP_MODE, 0x00]),
+        )
+
+        with self._patch_socket(mock_sock), patch("ue_mini_boom_controller.spp.time.sleep"):
+            with SppSession("AA:BB:CC:DD:EE:FF", channel=5) as session:
+                values = session.query([UECommand.EQ_PRESET, UECommand.DOUBLE_UP_MODE])
+
+        assert values == {UECommand.EQ_PRESET: 0x01, UECommand.DOUBLE_UP_MODE: 0x00}
+
+    def test_query_ignores_command_id_in_length_byte(self):
+        """A length byte equal to the queried id must not be mistaken for the reply."""
+        mock_sock = MagicMock()
+        # A 0x64-byte packet for another command (0x64 is also the EQ id), then the reply.
+        noise = bytes([UECommand.EQ_PRESET, 0x01, UECommand.SONIFICATION]) + bytes(
+            [0x07] * (UECommand.EQ_PRESET - 2)
+        )
+        mock_sock.recv_into.side_effect = _recv_into_chunks(
+            noise + bytes([0x03, 0x01, UECommand.EQ_PRESET, 0x02])
+        )
+
+        with self._patch_socket(mock_sock), patch("ue_mini_boom_controller.spp.time.sleep"):
+            with SppSession("AA:BB:CC:DD:EE:FF", channel=5) as session:
+                values = session.query([UECommand.EQ_PRESET])
+
+        assert values == {UECommand.EQ_PRESET: 0x02}
+
+    def test_garbage_header_does_not_spill_into_next_exchange(self):
+        """A corrupt length byte after one reply must not swallow the next reply."""
+        mock_sock = MagicMock()
+        mock_sock.recv_into.side_effect = _recv_into_chunks(
+            # The EQ reply, then a header claiming a 254-byte packet that never comes.
+            bytes([0x03, 0x01, UECommand.EQ_PRESET, 0x02, 0xFE, 0x01]),
+            bytes([0x03, 0x01, UECommand.SONIFICATION, 0x01]),
+        )
+
+        with self._patch_socket(mock_sock), patch("ue_mini_boom_controller.spp.time.sleep"):
+            with SppSession("AA:BB:CC:DD:EE:FF", channel=5) as session:
+                values = session.query([UECommand.EQ_PRESET, UECommand.SONIFICATION])
+
+        assert values == {UECommand.EQ_PRESET: 0x02, UECommand.SONIFICATION: 0x01}
+
+
+class _FakeSpeakerSock:
+    """Socket stand-in that answers LWACP queries from a value table."""
+
+    def __init__(self, values, reverse=False):
+        self.values = values
+        self.reverse = reverse
+        self.outstanding = 0
+        self.max_outstanding = 0
+        self._unanswered = []
+        self._replies = queue.Queue()
+        self._timeout = None
+        self.timeout_setters = set()
+
+    def connect(self, addr):
+        pass
+
+    def settimeout(self, timeout):
+        self._timeout = timeout
+        self.timeout_setters.add(threading.current_thread())
+
+    def send(self, data):
+        command_id = data[2]
+        self.outstanding += 1
+        self.max_outstanding = max(self.max_outstanding, self.outstanding)
+        self._unanswered.append(command_id)
+        # In reverse mode, answer pairs out of order so two are genuinely in flight.
+        if not self.reverse or len(self._unanswered) == 2:
+            batch = self._unanswered[::-1] if self.reverse else self._unanswered
+            for cid in batch:
+                if cid in self.values:
+                    self._replies.put(build_spp_command(cid, self.values[cid]))
+            self._unanswered = []
+        return len(data)
+
+    def recv_into(self, buffer):
+        try:
+            data = self._replies.get(timeout=self._timeout)
+        except queue.Empty:
+            raise TimeoutError from None
+        self.outstanding -= 1
+        buffer[: len(data)] = data
+        return len(data)
+
+    def close(self):
+        pass
+
+
+class TestPipelinedQuery:
+    _IDS = [
+        UECommand.EQ_PRESET,
+        UECommand.SONIFICATION,
+        UECommand.DOUBLE_UP_MODE,
+        UECommand.DOUBLE_UP_ROLE,
+    ]
+
+    def _query(self, sock, window, timeout=2.0):
+        mock_socket_mod = MagicMock()
+        mock_socket_mod.socket.return_value = sock
+        with (
+            patch("ue_mini_boom_controller.spp.socket", mock_socket_mod),
+            patch("ue_mini_boom_controller.spp.time.sleep"),
+        ):
+            with SppSession("AA:BB:CC:DD:EE:FF", channel=5) as session:
+                return session.query(self._IDS, window=window, timeout=timeout)
+
+    def test_responses_matched_by_command_id(self):
+        values = {cid: i for i, cid in enumerate(self._IDS)}
+        sock = _FakeSpeakerSock(values, reverse=True)
+
+        results = self._query(sock, window=2)
+
+        assert results == values
+        assert sock.max_outstanding == 2
+
+    def test_window_limits_in_flight(self):
+        values = {cid: 1 for cid in self._IDS}
+        sock = _FakeSpeakerSock(values)
+
+        results = self._query(sock, window=3)
+
+        assert results == values
+        assert sock.max_outstanding <= 3
+
+    def test_missing_response_times_out(self):
+        values = {cid: 1 for cid in self._IDS if cid != UECommand.SONIFICATION}
+        sock = _FakeSpeakerSock(values)
+
+        results = self._query(sock, window=4, timeout=0.2)
+
+        assert results[UECommand.SONIFICATION] is None
+        assert results[UECommand.EQ_PRESET] == 1
+        assert results[UECommand.DOUBLE_UP_ROLE] == 1
+
+    def test_reader_stops_once_every_response_is_in(self):
+        values = {cid: 1 for cid in self._IDS}
+        sock = _FakeSpeakerSock(values)
+
+        started = time.monotonic()
+        results = self._query(sock, window=4, timeout=5.0)
+
+        assert results == values
+        # The reader does not sit in recv until the 5 s timeout.
+        assert time.monotonic() - started < 1.0
+        assert sock.timeout_setters == {threading.current_thread()}
+
+    def test_send_nowait_then_read_response(self):
+        values = {UECommand.EQ_PRESET: 2, UECommand.SONIFICATION: 1}
+        sock = _FakeSpeakerSock(values, reverse=True)
+        mock_socket_mod = MagicMock()
+        mock_socket_mod.socket.return_value = sock
+        with (
+            patch("ue_mini_boom_controller.spp.socket", mock_socket_mod),
+            patch("ue_mini_boom_controller.spp.time.sleep"),
+        ):
+            with SppSession("AA:BB:CC:DD:EE:FF", channel=5) as session:
+                session.send_nowait(build_spp_command(UECommand.EQ_PRESET))
+                session.send_nowait(build_spp_command(UECommand.SONIFICATION))
+                first = session.read_response(timeout=1.0)
+                second = session.read_response(UECommand.EQ_PRESET, timeout=1.0)
+                missing = session.read_response(timeout=0.05)
+                samples = session.pacing.samples
+
+        assert first == Frame(UECommand.SONIFICATION, b"\x01")
+        assert second == Frame(UECommand.EQ_PRESET, b"\x02")
+        assert missing is None
+        assert sock.max_outstanding == 2
+        assert samples == 2
+
+    def test_link_drop_fails_pending_queries(self):
+        values = {cid: 1 for cid in self._IDS}
+        sock = _FakeSpeakerSock(values)
+        replies = sock.recv_into
+
+        def recv_into(buffer):
+            if sock.outstanding < len(self._IDS):
+                raise ConnectionResetError
+            return replies(buffer)
+
+        sock.recv_into = recv_into
+        mock_socket_mod = MagicMock()
+        mock_socket_mod.socket.return_value = sock
+        with (
+            patch("ue_mini_boom_controller.spp.socket", mock_socket_mod),
+            patch("ue_mini_boom_controller.spp.time.sleep"),
+        ):
+            with SppSession("AA:BB:CC:DD:EE:FF", channel=5) as session:
+                results = session.query(self._IDS, window=4, timeout=5.0)
+                assert not session.connected
+
+        assert results == {cid: None for cid in self._IDS}
+
+
+class TestHappyEyeballs:
+    """Default-channel connect raced against the SDP lookup."""
+
+    def _sockets(self, refused):
+        created = []
+
+        def make_socket(*args):
+            sock = MagicMock()
+            sock.recv_into.side_effect = TimeoutError
+
+            def connect(addr):
+                if addr[1] in refused:
+                    raise ConnectionRefusedError(f"channel {addr[1]}")
+
+            sock.connect.side_effect = connect
+            created.append(sock)
+            return sock
+
+        mock_socket_mod = MagicMock()
+        mock_socket_mod.socket.side_effect = make_socket
+        return mock_socket_mod, created
+
+    def test_slow_sdp_does_not_delay_default_channel(self):
+        mock_socket_mod, created = self._sockets(refused=set())
+        release = threading.Event()
+
+        def slow_lookup(mac, on_start=None):
+            release.wait(5)
+            return None
+
+        with (
+            patch("ue_mini_boom_controller.spp.socket", mock_socket_mod),
+            patch("ue_mini_boom_controller.spp._find_rfcomm_channel", side_effect=slow_lookup),
+        ):
+            started = time.monotonic()
+            session = SppSession("AA:BB:CC:DD:EE:FF")
+            session.connect()
+            elapsed = time.monotonic() - started
+            release.set()
+            session.close()
+
+        assert elapsed < 1.0
+        assert session.channel == 5
+
+    def test_sdp_channel_wins_when_default_refused(self):
+        mock_socket_mod, created = self._sockets(refused={5})
+
+        with (
+            patch("ue_mini_boom_controller.spp.socket", mock_socket_mod),
+            patch("ue_mini_boom_controller.spp._find_rfcomm_channel", return_value=7),
+        ):
+            with SppSession("AA:BB:CC:DD:EE:FF") as session:
+                assert session.channel == 7
+
+        connected = [c.args[0] for sock in created for c in sock.connect.call_args_list]
+        assert sorted(connected) == [("AA:BB:CC:DD:EE:FF", 5), ("AA:BB:CC:DD:EE:FF", 7)]
+
+    def _slow_default_channel(self, connect_default):
+        """Sockets whose connect to channel 5 runs connect_default(sock) instead."""
+        created = []
+
+        def make_socket(*args):
+            sock = MagicMock()
+            sock.recv_into.side_effect = TimeoutError
+
+            def connect(addr):
+                if addr[1] == 5:
+                    connect_default(sock)
+
+            sock.connect.side_effect = connect
+            created.append(sock)
+            return sock
+
+        mock_socket_mod = MagicMock()
+        mock_socket_mod.socket.side_effect = make_socket
+        return mock_socket_mod, created
+
+    def test_winner_aborts_loser_still_connecting(self):
+        aborted = threading.Event()
+        gave_up = threading.Event()
+
+        def connect_default(sock):
+            sock.shutdown.side_effect = lambda how: aborted.set()
+            aborted.wait(5)
+            gave_up.set()
+            raise ConnectionAbortedError
+
+        mock_socket_mod, created = self._slow_default_channel(connect_default)
+        with (
+            patch("ue_mini_boom_controller.spp.socket", mock_socket_mod),
+            patch("ue_mini_boom_controller.spp._find_rfcomm_channel", return_value=7),
+        ):
+            with SppSession("AA:BB:CC:DD:EE:FF") as session:
+                assert session.channel == 7
+                assert gave_up.wait(1)
+
+        assert created[0].close.called
+
+    def test_loser_connecting_after_the_winner_is_closed(self):
+        release = threading.Event()
+        mock_socket_mod, created = self._slow_default_channel(lambda sock: release.wait(5))
+        with (
+            patch("ue_mini_boom_controller.spp.socket", mock_socket_mod),
+            patch("ue_mini_boom_controller.spp._find_rfcomm_channel", return_value=7),
+        ):
+            with SppSession("AA:BB:CC:DD:EE:FF") as session:
+                assert session.channel == 7
+                loser = created[0]
+                release.set()
+                for _ in range(100):
+                    if loser.close.called:
+                        break
+                    time.sleep(0.01)
+                assert loser.close.called
+                assert not created[1].close.called
+
+    def test_winner_aborts_sdp_lookup(self):
+        mock_socket_mod, _ = self._sockets(refused=set())
+        aborted = threading.Event()
+
+        def lookup(mac, on_start=None):
+            on_start(aborted.set)
+            aborted.wait(5)
+            return None
+
+        with (
+            patch("ue_mini_boom_controller.spp.socket", mock_socket_mod),
+            patch("ue_mini_boom_controller.spp._find_rfcomm_channel", side_effect=lookup),
+        ):
+            with SppSession("AA:BB:CC:DD:EE:FF") as session:
+                assert session.channel == 5
+                assert aborted.wait(1)
+
+    def test_all_attempts_fail(self):
+        mock_socket_mod, _ = self._sockets(refused={5, 7})
+
+        with (
+            patch("ue_mini_boom_controller.spp.socket", mock_socket_mod),
+            patch("ue_mini_boom_controller.spp._find_rfcomm_channel", return_value=7),
+        ):
+            result = send_spp_command("AA:BB:CC:DD:EE:FF", _TEST_CMD, verbose=False)
+
+        assert result is False
@@ -0,0 +1,139 @@
+"""Tests for the per-adapter worker supervisor."""
+
+import os
+import time
+
+import pytest
+
+from ue_mini_boom_controller import adapters
+from ue_mini_boom_controller.protocol import Frame, UECommand, build_spp_command
+from ue_mini_boom_controller.workers import DEFAULT_WORKER, Supervisor, WorkerError
+
+# A query for this id takes SLOW_SECONDS and answers with its (start, end) time.
+SLOW_QUERY = 0xFF
+SLOW_SECONDS = 0.3
+
+
+class FakeSession:
+    """Stands in for SppSession inside worker processes (imported there by name)."""
+
+    def __init__(self, mac_address, adapter=None):
+        self.mac_address = mac_address
+        self.adapter = adapter
+
+    def send(self, command):
+        if self.mac_address == "DE:AD:00:00:00:00":
+            os._exit(3)  # simulate a worker crash mid-request
+        if self.mac_address == "BA:D0:00:00:00:00":
+            raise OSError("Host is down")
+        return Frame(command[2], (self.adapter or "").encode())
+
+    def query(self, command_ids, window=1):
+        if command_ids == [SLOW_QUERY]:
+            started = time.time()
+            time.sleep(SLOW_SECONDS)
+            return {SLOW_QUERY: (started, time.time())}
+        return {cid: os.getpid() for cid in command_ids}
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def supervisor():
+    with Supervisor(["hci0", "hci1"], session_factory=FakeSession) as running:
+        yield running
+
+
+class TestSupervisor:
+    def test_single_worker_without_extra_adapters(self):
+        assert Supervisor(session_factory=FakeSession).workers == [DEFAULT_WORKER]
+
+    def test_requests_run_in_the_routed_worker(self, supervisor):
+        first, second = "88:C6:26:00:00:01", "88:C6:26:00:00:02"
+        # Without BlueZ placement, speakers spread evenly and stay put.
+        assert {supervisor.route(first), supervisor.route(second)} == {"hci0", "hci1"}
+        reply = supervisor.send_spp_command(first, build_spp_command(UECommand.BATTERY_ANNOUNCE))
+        assert reply == build_spp_command(
+            UECommand.BATTERY_ANNOUNCE, *supervisor.route(first).encode()
+        )
+
+        pid_one = supervisor.query_spp_values(first, [UECommand.EQ_PRESET])[UECommand.EQ_PRESET]
+        pid_two = supervisor.query_spp_values(second, [UECommand.EQ_PRESET])[UECommand.EQ_PRESET]
+        assert pid_one != pid_two != os.getpid()
+
+    def test_route_follows_adapter_pool(self, monkeypatch):
+        pool = adapters.AdapterPool()
+        pool.refresh(
+            {
+                "/org/bluez/hci0": {"org.bluez.Adapter1": {"Address": "00:1A:7D:DA:71:10"}},
+                "/org/bluez/hci1": {"org.bluez.Adapter1": {"Address": "00:1A:7D:DA:71:11"}},
+                "/org/bluez/hci1/dev_88_C6_26_00_00_01": {
+                    "org.bluez.Device1": {"Address": "88:C6:26:00:00:01", "Paired": True}
+                },
+            }
+        )
+        monkeypatch.setattr(adapters, "_default", pool)
+        supervisor = Supervisor(session_factory=FakeSession)
+        assert supervisor.workers == ["hci0", "hci1"]
+        assert supervisor.route("88:c6:26:00:00:01") == "hci1"
+
+    def test_errors_come_back_as_worker_errors(self, supervisor):
+        with pytest.raises(WorkerError, match="Host is down"):
+            supervisor.send_spp_command("BA:D0:00:00:00:00", b"\x02\x01\x0c", timeout=10)
+
+    def test_dead_worker_is_restarted(self, supervisor):
+        crash = "DE:AD:00:00:00:00"
+        name = supervisor.route(crash)
+        with pytest.raises(WorkerError, match="died"):
+            supervisor.send_spp_command(crash, b"\x02\x01\x0c", timeout=10)
+        assert supervisor.restarts[name] == 1
+
+        # The replacement serves the other speakers routed to it.
+        other = next(
+            f"88:C6:26:00:00:{n:02X}"
+            for n in range(10)
+            if supervisor.route(f"88:C6:26:00:00:{n:02X}") == name
+        )
+        assert supervisor.send_spp_command(other, b"\x02\x01\x0c", timeout=10) is not None
+
+    def test_restart_does_not_block_submit(self, supervisor, monkeypatch):
+        crash = "DE:AD:00:00:00:00"
+        name = supervisor.route(crash)
+        other = next(
+            f"88:C6:26:00:00:{n:02X}"
+            for n in range(10)
+            if supervisor.route(f"88:C6:26:00:00:{n:02X}") == name
+        )
+        spawn = supervisor._spawn
+        during = []
+
+        def spawn_and_submit(worker):
+            # submit() takes the supervisor lock; with it held this would deadlock.
+            during.append(supervisor.submit("send", other, b"\x02\x01\x0c"))
+            spawn(worker)
+
+        monkeypatch.setattr(supervisor, "_spawn", spawn_and_submit)
+        with pytest.raises(WorkerError, match="died"):
+            supervisor.send_spp_command(crash, b"\x02\x01\x0c", timeout=10)
+        deadline = time.monotonic() + 10
+        while not during and time.monotonic() < deadline:
+            time.sleep(0.01)
+        # Submitted while the replacement was starting, answered once it runs.
+        assert during[0].result(10) is not None
+
+    def test_submit_after_stop(self):
+        supervisor = Supervisor(session_factory=FakeSession)
+        with pytest.raises(WorkerError):
+            supervisor.submit("send", "88:C6:26:00:00:01", b"")
+
+    def test_one_worker_serves_speakers_concurrently(self):
+        first, second = "88:C6:26:00:00:01", "88:C6:26:00:00:02"
+        with Supervisor(session_factory=FakeSession) as single:
+            futures = [
+                single.submit("query", mac, ([SLOW_QUERY], 1)) for mac in (first, second, first)
+            ]
+            spans = [future.result(10)[SLOW_QUERY] for future in futures]
+        # Different speakers overlap; the same speaker's requests run in order.
+        assert spans[1][0] < spans[0][1]
+        assert spans[2][0] >= spans[0][1]